@@ -0,0 +1,286 @@
+"""
+Backtest hors ligne des règles de prédiction.
+
+Rejoue un fichier de messages du canal source à travers la même analyse
+(parse_game), la même règle de couleur (get_predicted_suit), le même
+déclenchement /ec (ec_decide) et la même vérification N+0 à N+R
+(PendingPredictions + settle) que le bot, sans client Telegram.
+
+Comme le pipeline du bot (GamePipeline.advance), une chute de plus de
+GAME_WRAP_GAP numéros ouvre une nouvelle série: la déduplication oublie
+les numéros de la veille (DEDUP_TTL dans le bot), les prédictions encore
+ouvertes sont abandonnées (❌ par PENDING_MAX_AGE dans le bot) et les
+messages en retard de la série précédente sont ignorés. Quand les
+messages sont horodatés (champ 'received' de l'enregistreur), les
+prédictions non vérifiées après PENDING_MAX_AGE secondes sont aussi
+abandonnées; sans horodatage (texte brut, sweep.py), seule la remise à
+zéro les clôt.
+
+Formats acceptés (lecture en flux, .gz accepté):
+- JSONL: {"text": "...", "edited": false} par ligne (enregistreur inclus)
+- Texte: un message par ligne
+
+Utilisation:
+    python backtest.py historique.jsonl --a 1 --r 2 --ec 3,4,5
+"""
+import argparse
+import gzip
+import json
+import sys
+import time
+from config import (
+    A_OFFSET_DEFAULT, R_OFFSET_DEFAULT, VERIFICATION_EMOJIS, PENDING_EXPIRY_GRACE, PENDING_MAX_AGE, DEDUP_CAPACITY
+)
+from game_parser import parse_game, get_predicted_suit, SUIT_BITS
+from pending_store import PendingPredictions
+from pipeline import GamePipeline
+from dedup import BoundedDedup
+from strategy import ec_decide, settle, SETTLE_HIT, SETTLE_MISS
+
+class Backtest:
+    """Simulation d'une configuration (A, R, écarts /ec) sur un flux de messages."""
+
+    def __init__(self, a_offset: int = A_OFFSET_DEFAULT, r_offset: int = R_OFFSET_DEFAULT, ec_gaps: list = None):
+        self.a_offset = a_offset
+        self.r_offset = r_offset
+        self.ec_gaps = list(ec_gaps or [])
+        self.ec_gap_index = 0
+        self.ec_last_source_game = 0
+        self.ec_first_trigger_done = False
+
+        self.pending = PendingPredictions()
+        self.processed_predictions = BoundedDedup(DEDUP_CAPACITY)
+        self.processed_verifications = BoundedDedup(DEDUP_CAPACITY)
+        self.current_game_number = 0
+        self.series = GamePipeline(None) # suivi des séries de numéros (advance seulement)
+
+        self.messages = 0
+        self.games = 0
+        self.predictions = 0
+        self.hits = [0] * (max(VERIFICATION_EMOJIS) + 1)
+        self.misses = 0
+        self.expired = 0
+        self.abandoned = 0
+        self.loss_streak = 0
+        self.max_loss_streak = 0
+        self.loss_streaks = {} # longueur -> nombre de séries
+
+    # --- Flux ---
+
+    def feed(self, message_text: str, edited: bool = False, received: float = None):
+        """
+        Traite un message source comme handle_message / handle_edited_message.
+        `received`: horodatage de réception (secondes), pour l'abandon des
+        prédictions après PENDING_MAX_AGE comme le balayage du bot.
+        """
+        self.messages += 1
+        if received is not None:
+            self._abandon(len(self.pending.pop_aged(received)))
+        parsed = parse_game(message_text)
+        if parsed is None:
+            return
+        if not edited:
+            self._predict(parsed, received)
+        self._verify(parsed)
+
+    def finish(self):
+        """Clôt la série de pertes en cours (fin du flux)."""
+        self._close_streak()
+
+    # --- Séries de numéros (miroir de GamePipeline.advance et du balayage) ---
+
+    def _advance(self, game_number: int) -> bool:
+        """
+        Suit la remise à zéro quotidienne; False pour un message en retard de
+        la série précédente. Sans effet pour un jeu déjà vu (appels répétés).
+        """
+        series = self.series.series
+        game_series = self.series.advance(game_number)
+        if game_series > series:
+            self.processed_predictions.clear()
+            self.processed_verifications.clear()
+            self._abandon(len(self.pending))
+            self.pending.clear()
+        return game_series == self.series.series
+
+    def _abandon(self, count: int):
+        """Prédictions closes sans vérification (❌, comme pop_aged dans le bot)."""
+        self.abandoned += count
+        self.misses += count
+        self.loss_streak += count
+
+    # --- Prédiction (miroir de process_prediction) ---
+
+    def _predict(self, parsed, received: float = None):
+        game_number = parsed.game_number
+        if not self._advance(game_number):
+            return
+        self.current_game_number = game_number
+        if not self.processed_predictions.add(game_number):
+            return
+
+        predicted_suit = None
+        if parsed.group_count >= 2:
+            card_value, base_suit = parsed.first_card(parsed.second_group)
+            if base_suit:
+                predicted_suit = get_predicted_suit(base_suit, card_value, game_number)
+        self.predict_game(game_number, predicted_suit, received)
+
+    def predict_game(self, game_number: int, predicted_suit, received: float = None):
+        """Premier message d'un jeu (après déduplication); couleur prédite ou None."""
+        if not self._advance(game_number):
+            return
+        self.games += 1
+        if predicted_suit is None:
+            return
+
+        if self.ec_gaps:
+            should_trigger, self.ec_gap_index, self.ec_last_source_game, self.ec_first_trigger_done, _ = ec_decide(
+                game_number, self.ec_gaps, self.ec_gap_index, self.ec_last_source_game, self.ec_first_trigger_done
+            )
+            if not should_trigger:
+                return
+
+        target_game = game_number + self.a_offset
+        if target_game not in self.pending and target_game > game_number:
+            self.pending[target_game] = {
+                'suit': predicted_suit,
+                'base_game': game_number,
+                'r_offset': self.r_offset,
+                'verification_attempt': 0,
+                'expires_at': received + PENDING_MAX_AGE if received is not None else None,
+            }
+            self.predictions += 1
+
+    # --- Vérification (miroir de process_verification) ---
+
+    def _verify(self, parsed):
+        if not parsed.finalized:
+            return
+        game_number = parsed.game_number
+        if not self._advance(game_number):
+            return
+        if not self.processed_verifications.add((game_number, parsed.fingerprint())):
+            return
+        if parsed.group_count < 1:
+            return
+        self.verify_game(game_number, parsed.first_group_mask())
+
+    def verify_game(self, game_number: int, suit_mask: int):
+        """Jeu finalisé (après déduplication); suit_mask = couleurs du 1er groupe."""
+        if not self._advance(game_number):
+            return
+        for pred_game_number, pred in self.pending.covering(game_number):
+            found = bool(suit_mask & SUIT_BITS[pred['suit']])
+            outcome = settle(pred_game_number, pred['r_offset'], game_number, found)
+            if outcome == SETTLE_HIT:
+                self.pending.pop(pred_game_number)
+                self.hits[game_number - pred_game_number] += 1
+                self._close_streak()
+            elif outcome == SETTLE_MISS:
+                self.pending.pop(pred_game_number)
+                self.misses += 1
+                self.loss_streak += 1
+            else:
+                pred['verification_attempt'] += 1
+
+        for _ in self.pending.pop_expired(game_number - PENDING_EXPIRY_GRACE):
+            self.expired += 1
+            self.misses += 1
+            self.loss_streak += 1
+
+    def _close_streak(self):
+        if self.loss_streak:
+            self.loss_streaks[self.loss_streak] = self.loss_streaks.get(self.loss_streak, 0) + 1
+            if self.loss_streak > self.max_loss_streak:
+                self.max_loss_streak = self.loss_streak
+            self.loss_streak = 0
+
+    # --- Rapport ---
+
+    def result(self) -> dict:
+        settled = sum(self.hits) + self.misses
+        return {
+            'a_offset': self.a_offset,
+            'r_offset': self.r_offset,
+            'ec_gaps': self.ec_gaps,
+            'messages': self.messages,
+            'games': self.games,
+            'predictions': self.predictions,
+            'settled': settled,
+            'open': len(self.pending),
+            'hits': sum(self.hits),
+            'hits_by_index': {i: n for i, n in enumerate(self.hits) if i <= self.r_offset},
+            'misses': self.misses,
+            'expired': self.expired,
+            'abandoned': self.abandoned,
+            'hit_rate': sum(self.hits) / settled if settled else 0.0,
+            'max_loss_streak': self.max_loss_streak,
+            'loss_streaks': dict(sorted(self.loss_streaks.items())),
+        }
+
+def iter_source_messages(path: str):
+    """Lit un historique en flux et produit (texte, édité, horodatage de réception ou None)."""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('{'):
+                record = json.loads(line)
+                yield record.get('text', ''), bool(record.get('edited', False)), record.get('received')
+            else:
+                yield line.rstrip('\n'), False, None
+
+def run_backtest(path: str, a_offset: int = A_OFFSET_DEFAULT, r_offset: int = R_OFFSET_DEFAULT, ec_gaps: list = None) -> dict:
+    """Exécute un backtest complet et retourne le rapport (avec le débit)."""
+    backtest = Backtest(a_offset, r_offset, ec_gaps)
+    feed = backtest.feed
+    started = time.perf_counter()
+    for message_text, edited, received in iter_source_messages(path):
+        feed(message_text, edited, received)
+    backtest.finish()
+    elapsed = time.perf_counter() - started
+
+    result = backtest.result()
+    result['elapsed_seconds'] = elapsed
+    result['messages_per_second'] = backtest.messages / elapsed if elapsed else 0.0
+    return result
+
+def parse_gaps(value: str) -> list:
+    """'3,4,5' -> [3, 4, 5] (entiers positifs)."""
+    gaps = [int(g.strip()) for g in value.split(',') if g.strip()]
+    if any(g <= 0 for g in gaps):
+        raise argparse.ArgumentTypeError("Les écarts doivent être des entiers positifs.")
+    return gaps
+
+def format_report(result: dict) -> str:
+    lines = [
+        f"📊 Backtest A={result['a_offset']} R={result['r_offset']} EC={','.join(map(str, result['ec_gaps'])) or '-'}",
+        f"• Messages: {result['messages']} - Jeux: {result['games']} - Prédictions: {result['predictions']}",
+        f"• Réussites: {result['hits']} / {result['settled']} ({result['hit_rate'] * 100:.2f}%) - Échecs: {result['misses']} (dont {result['expired']} expirés, {result['abandoned']} abandonnés) - Ouvertes: {result['open']}",
+    ]
+    for index, count in result['hits_by_index'].items():
+        lines.append(f"  {VERIFICATION_EMOJIS.get(index, index)} : {count}")
+    lines.append(f"• Plus longue série de pertes: {result['max_loss_streak']}")
+    if result['loss_streaks']:
+        lines.append("• Séries de pertes: " + ", ".join(f"{k}x{v}" for k, v in result['loss_streaks'].items()))
+    lines.append(f"• Débit: {result['messages_per_second']:.0f} messages/s ({result['elapsed_seconds']:.2f}s)")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest des prédictions sur un historique du canal source.")
+    parser.add_argument('history', help="Fichier d'historique (JSONL ou texte, .gz accepté)")
+    parser.add_argument('--a', type=int, default=A_OFFSET_DEFAULT, help="Offset de prédiction (/a)")
+    parser.add_argument('--r', type=int, default=R_OFFSET_DEFAULT, choices=range(0, 11), metavar='0-10', help="Essais de vérification (/r)")
+    parser.add_argument('--ec', type=parse_gaps, default=None, help="Écarts /ec (ex: 3,4,5)")
+    parser.add_argument('--json', action='store_true', help="Sortie JSON")
+    args = parser.parse_args(argv)
+
+    result = run_backtest(args.history, args.a, args.r, args.ec)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(result))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""
+Banc d'essai de bout en bout et micro-benchmarks.
+
+Chaque scénario s'exécute dans un processus séparé (état vierge): le vrai
+main.py tourne avec le client local (fake_telegram.py), alimenté par
+synthetic_source.py. Mesures:
+- réception du message source -> publication de la prédiction (p50/p95/p99)
+- édition finalisée -> édition du statut (p50/p95/p99)
+- débit soutenu (messages/s jusqu'à la vidange du pipeline et de la file d'envoi)
+
+Chaque scénario est répété (--repeat, processus distincts) et chaque mesure
+retenue est la médiane des exécutions. Les résultats sont écrits en JSON;
+avec --baseline, le code de sortie est 1 si une mesure régresse au-delà du
+seuil (--short-threshold pour les scénarios de moins d'une seconde, dont
+les mesures sont plus bruitées).
+
+Utilisation:
+    python bench.py --output bench.json
+    python bench.py --baseline bench.json --threshold 0.2 --repeat 5
+    python bench.py --scenarios quiet,ec --scale 0.5
+"""
+import argparse
+import asyncio
+import json
+import math
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+# Scénarios: jeux injectés, jeux/s (0 = maximum), A_OFFSET, R_OFFSET, écarts /ec, jeux périmés ignorés
+SCENARIOS = {
+    # Table calme (rythme compressé): latence de base
+    'quiet': {'games': 300, 'rate': 50, 'a': 1, 'r': 2, 'ec': [], 'stale': True},
+    # Rafale après reconnexion: tout l'arriéré d'un coup, règle des jeux périmés active
+    'burst': {'games': 3000, 'rate': 0, 'a': 1, 'r': 2, 'ec': [], 'stale': True},
+    # /a 10 + /r 10: une dizaine de prédictions ouvertes, jusqu'à 11 essais chacune
+    'r10': {'games': 1000, 'rate': 200, 'a': 10, 'r': 10, 'ec': [], 'stale': True},
+    # Mode /ec
+    'ec': {'games': 1000, 'rate': 200, 'a': 1, 'r': 2, 'ec': [2, 3, 4], 'stale': True},
+    # Débit maximal: tous les jeux passent par la prédiction
+    'throughput': {'games': 20000, 'rate': 0, 'a': 1, 'r': 2, 'ec': [], 'stale': False},
+}
+
+# Durée (référence) en deçà de laquelle un scénario utilise --short-threshold
+SHORT_SCENARIO_SECONDS = 1.0
+
+_PREDICTION_RE = re.compile(r"📲Game:(\d+):.* statut :(.+)$")
+
+def percentiles(values: list) -> dict:
+    """p50/p95/p99/max en millisecondes."""
+    if not values:
+        return {'count': 0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+    values = sorted(values)
+    n = len(values)
+
+    def pick(p):
+        return values[max(0, math.ceil(p * n) - 1)] * 1000
+
+    return {'count': n, 'p50': pick(0.50), 'p95': pick(0.95), 'p99': pick(0.99), 'max': values[-1] * 1000}
+
+# --- Scénario (processus enfant) ---
+
+def run_scenario(name: str, scale: float = 1.0) -> dict:
+    from synthetic_source import SyntheticSource, import_bot, start_bot, stop_bot
+    spec = SCENARIOS[name]
+    games = max(1, int(spec['games'] * scale))
+    bot = import_bot()
+    from config import VERIFICATION_EMOJIS
+    status_index = {emoji: index for index, emoji in VERIFICATION_EMOJIS.items()}
+
+    # Mesure du code du bot, pas de la limite d'envoi Telegram
+    bot.outbox.rate = bot.outbox.burst = 1e9
+    engine = bot.registry.default
+    engine.a_offset = spec['a']
+    engine.r_offset = spec['r']
+    if spec['ec']:
+        engine.ec_active = True
+        engine.ec_gaps = list(spec['ec'])
+    if not spec['stale']:
+        engine.pipeline.stale_games = games
+
+    perf = time.perf_counter
+    received_at = {}  # jeu -> réception du premier message
+    finalized_at = {} # jeu -> réception de l'édition finalisée
+    prediction_latency = []
+    status_latency = []
+
+    def on_call(kind, chat_id, message):
+        if chat_id != engine.prediction_channel_id:
+            return
+        match = _PREDICTION_RE.match(message.message)
+        if match is None:
+            return
+        now = perf()
+        target = int(match.group(1))
+        status = match.group(2)
+        if kind == 'send':
+            started = received_at.get(target - engine.a_offset)
+            if started is not None:
+                prediction_latency.append(now - started)
+            return
+        index = status_index.get(status)
+        verification_game = target + (index if index is not None else engine.r_offset)
+        started = finalized_at.get(verification_game)
+        if started is not None:
+            status_latency.append(now - started)
+
+    bot.client.on_call = on_call
+
+    async def run():
+        await start_bot(bot)
+        source = SyntheticSource(seed=1)
+        loop = asyncio.get_running_loop()
+        messages = 0
+        max_open = 0
+        started = perf()
+        clock = loop.time()
+        for i, (game_number, game_messages) in enumerate(source.iter_games(games)):
+            if spec['rate'] > 0:
+                delay = i / spec['rate'] - (loop.time() - clock)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            received_at[game_number] = perf()
+            message = await bot.client.inject_message(engine.source_channel_id, game_messages[0][0])
+            for text, _ in game_messages[1:]:
+                if text[0] != '⏰':
+                    finalized_at[game_number] = perf()
+                await bot.client.inject_edit(message, text)
+            messages += len(game_messages)
+            max_open = max(max_open, len(engine.pending_predictions))
+        while engine.pipeline.stats()['depth'] or bot.outbox.backlog:
+            await asyncio.sleep(0.001)
+        elapsed = perf() - started
+        await stop_bot(bot)
+        stats = engine.pipeline.stats()
+        return {
+            'games': games,
+            'messages': messages,
+            'elapsed_seconds': elapsed,
+            'messages_per_second': messages / elapsed if elapsed else 0.0,
+            'prediction_latency_ms': percentiles(prediction_latency),
+            'status_latency_ms': percentiles(status_latency),
+            'predictions_sent': bot.client.sent,
+            'status_edits': bot.client.edited,
+            'max_open_predictions': max_open,
+            'pipeline_dropped': stats['dropped'],
+            'pipeline_stale': stats['stale'],
+        }
+
+    return asyncio.run(run())
+
+# --- Micro-benchmarks ---
+
+def run_micro(number: int = 20000, repeat: int = 5) -> dict:
+    """Temps par appel (ns, meilleur de `repeat`) des fonctions pures du parseur."""
+    from game_parser import (
+        extract_game_number, extract_parentheses_groups, suit_in_group,
+        get_predicted_suit, parse_game, is_message_finalized
+    )
+    message = "#N1234. ✅5(K♠️10❤️3♦️) - 3(A♣️4♦️) #T8"
+    group = "K♠️10❤️3♦️"
+    parsed = parse_game(message)
+    cases = {
+        'extract_game_number': lambda: extract_game_number(message),
+        'extract_parentheses_groups': lambda: extract_parentheses_groups(message),
+        'suit_in_group': lambda: suit_in_group(group, '♦'),
+        'get_predicted_suit': lambda: get_predicted_suit('♠', 'A', 1234),
+        'is_message_finalized': lambda: is_message_finalized(message),
+        'parse_game': lambda: parse_game(message),
+        'parse_game_non_game': lambda: parse_game("Bienvenue sur le canal des résultats"),
+        'fingerprint': lambda: parsed.fingerprint(),
+    }
+    results = {}
+    for name, func in cases.items():
+        best = min(timeit.repeat(func, number=number, repeat=repeat))
+        results[name] = best / number * 1e9
+    return results
+
+def merge_runs(runs: list) -> dict:
+    """Médiane de chaque mesure numérique sur plusieurs exécutions d'un scénario."""
+    merged = {}
+    for key, value in runs[0].items():
+        if isinstance(value, dict):
+            merged[key] = merge_runs([run[key] for run in runs])
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            merged[key] = statistics.median(run[key] for run in runs)
+        else:
+            merged[key] = value
+    return merged
+
+# --- Comparaison avec une référence ---
+
+def flatten_metrics(results: dict) -> dict:
+    """Mesures comparables: nom -> (valeur, plus_grand_est_mieux)."""
+    metrics = {}
+    for name, scenario in results.get('scenarios', {}).items():
+        for key in ('prediction_latency_ms', 'status_latency_ms'):
+            for p in ('p50', 'p95', 'p99'):
+                metrics[f"{name}.{key}.{p}"] = (scenario[key][p], False)
+        metrics[f"{name}.messages_per_second"] = (scenario['messages_per_second'], True)
+    for name, ns in results.get('micro', {}).items():
+        metrics[f"micro.{name}_ns"] = (ns, False)
+    return metrics
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta_ms: float = 1.0,
+            short_threshold: float = None) -> list:
+    """
+    Retourne les régressions [(mesure, référence, actuel, écart relatif)].
+    Les latences doivent aussi se dégrader d'au moins min_delta_ms (bruit des queues sub-ms).
+    Les scénarios de moins de SHORT_SCENARIO_SECONDS dans la référence sont
+    jugés avec short_threshold (par défaut le même seuil).
+    """
+    current = flatten_metrics(results)
+    short = {f"{name}." for name, scenario in baseline.get('scenarios', {}).items()
+             if scenario.get('elapsed_seconds', SHORT_SCENARIO_SECONDS) < SHORT_SCENARIO_SECONDS}
+    regressions = []
+    for name, (old, higher_is_better) in flatten_metrics(baseline).items():
+        if name not in current or old <= 0:
+            continue
+        new = current[name][0]
+        change = (old - new) / old if higher_is_better else (new - old) / old
+        if '_latency_ms.' in name and new - old < min_delta_ms:
+            continue
+        limit = threshold
+        if short_threshold is not None and name[:name.index('.') + 1] in short:
+            limit = max(threshold, short_threshold)
+        if change > limit:
+            regressions.append((name, old, new, change))
+    return regressions
+
+def format_summary(results: dict) -> str:
+    lines = []
+    for name, s in results.get('scenarios', {}).items():
+        p, v = s['prediction_latency_ms'], s['status_latency_ms']
+        lines.append(f"{name:<11} {s['messages_per_second']:>9.0f} msg/s | prédiction p50 {p['p50']:.2f} p95 {p['p95']:.2f} "
+                     f"p99 {p['p99']:.2f} ms | statut p50 {v['p50']:.2f} p95 {v['p95']:.2f} p99 {v['p99']:.2f} ms "
+                     f"| ouvertes max {s['max_open_predictions']}")
+    for name, ns in results.get('micro', {}).items():
+        lines.append(f"micro {name:<28} {ns:>9.0f} ns")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai du pipeline de messages.")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="Scénarios (séparés par des virgules)")
+    parser.add_argument('--scale', type=float, default=1.0, help="Facteur appliqué au nombre de jeux")
+    parser.add_argument('--no-micro', action='store_true', help="Sans micro-benchmarks")
+    parser.add_argument('--micro-only', action='store_true', help="Micro-benchmarks uniquement")
+    parser.add_argument('--output', help="Fichier JSON des résultats")
+    parser.add_argument('--baseline', help="Résultats de référence (JSON)")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Régression tolérée (0.2 = 20%%)")
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help="Dégradation minimale d'une latence (ms)")
+    parser.add_argument('--short-threshold', type=float, default=0.5,
+                        help=f"Régression tolérée pour les scénarios de moins de {SHORT_SCENARIO_SECONDS:g}s")
+    parser.add_argument('--repeat', type=int, default=3, help="Exécutions par scénario (médiane retenue)")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_scenario(args.child, args.scale)))
+        return 0
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': args.scale,
+        'repeat': args.repeat,
+        'scenarios': {},
+    }
+    if not args.micro_only:
+        for name in filter(None, args.scenarios.split(',')):
+            if name not in SCENARIOS:
+                parser.error(f"Scénario inconnu: {name}")
+            runs = []
+            for _ in range(max(1, args.repeat)):
+                output = subprocess.run(
+                    [sys.executable, __file__, '--child', name, '--scale', str(args.scale)],
+                    check=True, capture_output=True, text=True
+                ).stdout
+                runs.append(json.loads(output.strip().splitlines()[-1]))
+            results['scenarios'][name] = merge_runs(runs)
+    if not args.no_micro:
+        results['micro'] = run_micro()
+
+    print(format_summary(results))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms, args.short_threshold)
+        for name, old, new, change in regressions:
+            print(f"❌ Régression {name}: {old:.3f} -> {new:.3f} (+{change * 100:.0f}%)")
+        if regressions:
+            return 1
+        print(f"✅ Aucune régression au-delà de {args.threshold * 100:.0f}%")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
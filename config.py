@@ -4,8 +4,7 @@ Configuration du bot Telegram de prédiction Baccarat
 import os
 import json # NOUVEAU
 
-def parse_channel_id(env_var: str, default: str) -> int:
-    value = os.getenv(env_var) or default
+def normalize_channel_id(value: str) -> int:
     if value.startswith('-100'):
         return int(value)
     try:
@@ -16,13 +15,25 @@ def parse_channel_id(env_var: str, default: str) -> int:
     except ValueError:
         return 0
 
+def parse_channel_id(env_var: str, default: str) -> int:
+    return normalize_channel_id(os.getenv(env_var) or default)
+
+def parse_channel_ids(env_var: str, default: str) -> list:
+    """Liste d'ids séparés par des virgules (ex: plusieurs canaux de prédiction)."""
+    value = os.getenv(env_var) or default
+    return [normalize_channel_id(part.strip()) for part in value.split(',') if part.strip()]
+
 SOURCE_CHANNEL_ID = parse_channel_id('SOURCE_CHANNEL_ID', '-1003464313784')
-PREDICTION_CHANNEL_ID = parse_channel_id('PREDICTION_CHANNEL_ID', '-1003300736833')
+# Chaque prédiction est publiée dans tous ces canaux (le premier est le canal principal)
+PREDICTION_CHANNEL_IDS = parse_channel_ids('PREDICTION_CHANNEL_ID', '-1003300736833')
+PREDICTION_CHANNEL_ID = PREDICTION_CHANNEL_IDS[0] if PREDICTION_CHANNEL_IDS else 0
 ADMIN_ID = int(os.getenv('ADMIN_ID') or '0')
 API_ID = int(os.getenv('API_ID') or '0')
 API_HASH = os.getenv('API_HASH') or ''
 BOT_TOKEN = os.getenv('BOT_TOKEN') or ''
 PORT = int(os.getenv('PORT') or '10000')
+# Client Telegram: 'telethon' (production) ou 'fake' (client local, tests de charge)
+TELEGRAM_CLIENT = os.getenv('TELEGRAM_CLIENT') or 'telethon'
 
 SUIT_MAPPING_EVEN = {'♠': '♣', '♣': '♠', '♦': '♥', '♥': '♦'}
 SUIT_MAPPING_ODD = {'♠': '♥', '♣': '♦', '♦': '♣', '♥': '♠'}
@@ -32,9 +43,113 @@ SUIT_NORMALIZE = {'❤️': '♥', '❤': '♥', '♥️': '♥', '♠️': '♠
 
 # --- NOUVELLES CONFIGURATIONS ---
 
+# Tables servies par le processus: fichier JSON [{"name", "source", "prediction"}].
+# "prediction" peut être une liste de canaux; chaque entrée est un id ou
+# {"id", "rate", "burst"} pour fixer le débit d'envoi de ce canal.
+# Sans fichier, une seule table (DEFAULT_TABLE) sur SOURCE/PREDICTION_CHANNEL_ID.
+# Les fichiers d'état de la première table gardent leur nom; ceux des
+# suivantes sont suffixés par le nom de la table (bot_state.vip.db, ...).
+TABLES_FILE = os.getenv('TABLES_FILE') or 'tables.json'
+DEFAULT_TABLE = 'main'
+CONFIG_FILE = os.getenv('BOT_CONFIG_FILE') or 'bot_config.json' # Offsets et état /ec
+SCHEDULE_FILE = os.getenv('SCHEDULE_FILE') or 'bot_schedule.json' # Tâches planifiées persistantes (blocages /time)
+
 # Offsets par défaut
 A_OFFSET_DEFAULT = 1 # Décalage de prédiction (N -> N + A_OFFSET)
 R_OFFSET_DEFAULT = 0 # Nombre d'essais de vérification (N+0 à N+R_OFFSET)
+R_OFFSET_MAX = 10 # Borne de /r (un émoji de succès par essai)
+
+# Marge (en jeux) avant de clore une fenêtre de vérification dont le dernier jeu a été manqué
+PENDING_EXPIRY_GRACE = 5
+
+# File d'envoi Telegram: débit par chat (messages/seconde), rafale et essais
+OUTBOX_CHAT_RATE = 1.0
+OUTBOX_CHAT_BURST = 5
+OUTBOX_MAX_RETRIES = 3
+
+# Pipeline d'ingestion: taille de la file, retard (en jeux) au-delà duquel
+# un jeu ne déclenche plus de prédiction, seuil d'alerte d'attente (secondes)
+PIPELINE_MAX_SIZE = 1000
+PIPELINE_STALE_GAMES = 3
+PIPELINE_WAIT_WARN = 1.0
+
+# Remise à zéro quotidienne des numéros de jeu: un numéro inférieur de plus
+# de GAME_WRAP_GAP au dernier jeu reçu ouvre une nouvelle série (#1440 -> #1)
+GAME_WRAP_GAP = 500
+
+# Rattrapage au démarrage et après une reconnexion: messages source lus
+# par requête (par id), messages déjà vus relus (éditions pendant la
+# coupure), plafond et période de surveillance de la connexion (secondes)
+CATCHUP_BATCH = 100
+CATCHUP_OVERLAP = 30
+CATCHUP_MAX_MESSAGES = 3000
+CATCHUP_POLL_INTERVAL = 1.0
+
+# Nombre maximal d'entrées mémorisées pour la déduplication (prédiction et vérification)
+DEDUP_CAPACITY = 1000
+
+# Expiration incrémentale (à la place des resets globaux): âge maximal d'une
+# prédiction en attente et d'une entrée de déduplication (secondes, horloge
+# murale pour survivre aux redémarrages), période et taille des balayages
+PENDING_MAX_AGE = 3600
+DEDUP_TTL = 2 * 3600
+EXPIRY_SWEEP_INTERVAL = 10.0
+EXPIRY_SWEEP_BATCH = 50
+
+# Messages source récents suivis pour filtrer les éditions (date, empreinte, finalisation)
+EDIT_CACHE_CAPACITY = 500
+
+# Magasin d'état persistant (SQLite WAL) et intervalle d'écriture par lots (secondes)
+STATE_DB_FILE = os.getenv('STATE_DB_FILE') or 'bot_state.db'
+STATE_FLUSH_INTERVAL = 0.5
+STATE_REOPEN_INTERVAL = 5.0 # Nouvelle tentative d'ouverture après un échec (secondes)
+
+# Délai de regroupement des écritures de bot_config.json (secondes)
+CONFIG_SAVE_DELAY = 1.0
+
+# Historique compact des jeux (enregistrements binaires + index par jour)
+HISTORY_FILE = os.getenv('HISTORY_FILE') or 'game_history.bin'
+HISTORY_FLUSH_INTERVAL = 2.0
+
+# Enregistreur des événements bruts du canal source (segments gzip + index)
+RECORDER_ENABLED = (os.getenv('RECORDER_ENABLED') or '1') != '0'
+RECORDER_DIR = os.getenv('RECORDER_DIR') or 'recordings'
+RECORDER_FLUSH_INTERVAL = 1.0
+RECORDER_SEGMENT_BYTES = 4 * 1024 * 1024 # Rotation au-delà de cette taille compressée
+RECORDER_SEGMENT_SECONDS = 3600          # ... ou de cette durée
+RECORDER_MAX_SEGMENTS = 500              # Segments conservés (les plus anciens sont supprimés)
+
+# Surveillance de la boucle asyncio et disponibilité (/ready)
+LOOP_PROBE_INTERVAL = 0.25      # Période de la sonde de retard (secondes)
+LOOP_LAG_WINDOW = 60            # Fenêtre du retard maximal récent (secondes)
+LOOP_LAG_READY_MAX = 1.0        # Retard maximal toléré par /ready (secondes)
+SLOW_CALLBACK_THRESHOLD = 0.1   # Au-delà, le blocage est enregistré avec sa pile (secondes)
+SOURCE_SILENCE_MAX = int(os.getenv('SOURCE_SILENCE_MAX') or '600') # Silence toléré du canal source (secondes)
+OUTBOX_BACKLOG_READY_MAX = 200  # File d'envoi maximale tolérée par /ready
+LOOP_DEBUG = (os.getenv('LOOP_DEBUG') or '0') == '1' # Mode debug asyncio (rappels lents nommés, coûteux)
+
+# Traces par jeu (spans du message source à l'édition du canal)
+TRACE_ENABLED = (os.getenv('TRACE_ENABLED') or '1') != '0'
+TRACE_FILE = os.getenv('TRACE_FILE') or 'traces.jsonl'
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE') or '0.1') # Part des traces écrites sur disque
+TRACE_SLOW_MS = 1000          # Traces plus longues toujours écrites (ms)
+TRACE_RING_SIZE = 500         # Traces récentes gardées en mémoire (/trace)
+TRACE_IDLE_SECONDS = 10       # Trace terminée après ce délai sans nouveau span
+TRACE_MAX_BYTES = 5 * 1024 * 1024 # Rotation du fichier de traces
+TRACE_BACKUP_COUNT = 3
+
+# Journalisation (file + thread d'écriture, modifiable par /log)
+LOG_LEVEL = os.getenv('LOG_LEVEL') or 'INFO'
+LOG_FORMAT = os.getenv('LOG_FORMAT') or 'json' # 'json' ou 'text'
+LOG_QUEUE_SIZE = 10000        # Au-delà (stdout bloqué), les messages sont perdus
+# Messages répétitifs: au plus un par intervalle (secondes, 0 = sans limite)
+LOG_RATE_LIMITS = {
+    'ec_skip': 60,
+    'prediction_blocked': 60,
+    'prediction_skipped': 0,
+    'verification_pending': 0,
+    'game_ignored': 0,
+}
 
 # Emojis de vérification selon l'offset (N+0, N+1, N+2, etc.)
 VERIFICATION_EMOJIS = {
@@ -0,0 +1,136 @@
+"""
+Persistance de bot_config.json en écriture différée.
+
+Le chemin critique marque seulement la configuration comme modifiée;
+les écritures rapprochées sont fusionnées puis faites hors de la boucle
+(fichier temporaire + fsync + renommage atomique) avec un numéro de
+génération croissant. Une écriture échouée est retentée après le même
+délai, sans attendre le prochain changement. close() attend l'écriture
+en cours et écrit les derniers changements à l'arrêt.
+"""
+import asyncio
+import json
+import logging
+import os
+from config import CONFIG_SAVE_DELAY
+
+logger = logging.getLogger(__name__)
+
+class ConfigWriter:
+    """Écriture atomique et différée d'un fichier de configuration JSON."""
+
+    def __init__(self, path: str, snapshot, delay: float = CONFIG_SAVE_DELAY):
+        self.path = path
+        self.snapshot = snapshot # fonction -> dict à sauvegarder
+        self.delay = delay
+        self.generation = 0
+        self._dirty = False
+        self._handle = None
+        self._writing = None
+        self._flush_task = None
+
+    def load(self):
+        """Lit le fichier (None s'il n'existe pas). Lève une erreur s'il est illisible."""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        self.generation = config.get('generation', 0)
+        return config
+
+    def mark_dirty(self):
+        """Planifie une écriture; les appels rapprochés sont fusionnés."""
+        self._dirty = True
+        if self._handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Pas de boucle (démarrage/outils): écriture immédiate
+            self.flush_sync()
+            return
+        self._handle = loop.call_later(self.delay, self._schedule_flush)
+
+    def _schedule_flush(self):
+        self._handle = None
+        self._flush_task = asyncio.ensure_future(self.flush())
+        self._flush_task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task):
+        if self._flush_task is task:
+            self._flush_task = None
+        if not task.cancelled() and task.exception() is not None:
+            # Erreur hors écriture (ex: instantané de la configuration)
+            logger.error("Erreur écriture différée de %s: %s", self.path, task.exception(),
+                         exc_info=task.exception())
+
+    def _prepare(self) -> dict:
+        self._dirty = False
+        self.generation += 1
+        config = dict(self.snapshot())
+        config['generation'] = self.generation
+        return config
+
+    def _write(self, config: dict):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(config, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        # Rend le renommage durable
+        dir_fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    async def flush(self):
+        """Écrit la configuration si elle est modifiée (dans un thread)."""
+        if self._writing is not None:
+            # Une écriture est en cours: on attend puis on réécrit si nécessaire
+            await self._writing
+        if not self._dirty:
+            return
+        config = self._prepare()
+        loop = asyncio.get_running_loop()
+        self._writing = loop.run_in_executor(None, self._write, config)
+        try:
+            await self._writing
+            logger.info("⚙️ Configuration sauvegardée (génération %d).", config['generation'])
+        except Exception as e:
+            logger.error("Erreur sauvegarde config (nouvel essai dans %gs): %s", self.delay, e)
+            self.mark_dirty() # réarme l'écriture différée
+        finally:
+            self._writing = None
+
+    async def close(self):
+        """Annule l'écriture différée, attend celle en cours et écrit les derniers changements."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._flush_task is not None:
+            await asyncio.wait((self._flush_task,))
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error("Erreur écriture de %s à l'arrêt: %s", self.path, e, exc_info=True)
+        if self._handle is not None:
+            # Dernière écriture échouée: pas de nouvel essai après l'arrêt
+            self._handle.cancel()
+            self._handle = None
+        if self._dirty:
+            logger.error("❌ Changements de %s perdus à l'arrêt", self.path)
+
+    def flush_sync(self):
+        """Écriture synchrone (hors boucle asyncio)."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        config = self._prepare()
+        try:
+            self._write(config)
+            logger.info("⚙️ Configuration sauvegardée (génération %d).", config['generation'])
+        except Exception as e:
+            self._dirty = True
+            logger.error("Erreur sauvegarde config: %s", e)
@@ -0,0 +1,142 @@
+"""
+Structures de déduplication bornées.
+
+Dictionnaire ordonné utilisé comme LRU: insertion, test et éviction en
+temps constant, avec un plafond mémoire fixe (aucun tri ni vidage global).
+Avec une durée de vie, chaque entrée porte sa dernière date d'utilisation;
+les entrées périmées sont retirées par petits lots depuis la tête.
+EditCache applique le même principe aux éditions des messages source.
+"""
+import time
+from collections import OrderedDict
+
+class BoundedDedup:
+    """Ensemble borné à éviction LRU (et durée de vie optionnelle)."""
+    __slots__ = ('capacity', 'ttl', '_entries', 'hits', 'expired')
+
+    def __init__(self, capacity: int, ttl: float = None):
+        self.capacity = capacity
+        self.ttl = ttl  # secondes depuis la dernière utilisation (None = sans limite)
+        self._entries = OrderedDict() # clé -> date de dernière utilisation (None sans ttl)
+        self.hits = 0
+        self.expired = 0
+
+    def add(self, key) -> bool:
+        """
+        Ajoute une clé. Retourne False si elle était déjà présente
+        (doublon), True sinon. La plus ancienne clé est évincée au-delà
+        de la capacité; une clé périmée compte comme absente.
+        """
+        entries = self._entries
+        now = time.time() if self.ttl is not None else None
+        if key in entries:
+            entries.move_to_end(key)
+            stamp = entries[key]
+            entries[key] = now
+            if stamp is not None and now - stamp > self.ttl:
+                self.expired += 1
+                return True
+            self.hits += 1
+            return False
+        entries[key] = now
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+        return True
+
+    def expire(self, now: float = None, limit: int = None) -> int:
+        """Retire jusqu'à `limit` entrées périmées (les plus anciennes sont en tête)."""
+        if self.ttl is None:
+            return 0
+        cutoff = (time.time() if now is None else now) - self.ttl
+        entries = self._entries
+        count = 0
+        while entries and (limit is None or count < limit):
+            key = next(iter(entries))
+            if entries[key] > cutoff:
+                break
+            del entries[key]
+            count += 1
+        self.expired += count
+        return count
+
+    def discard(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+# Décision d'EditCache.classify pour une édition
+EDIT_PARSE = 0         # à analyser et traiter
+EDIT_INTERMEDIATE = 1  # non finalisée (⏰): état mémorisé, ni analyse ni traitement
+EDIT_UNCHANGED = 2     # texte identique à la dernière version vue
+EDIT_FINALIZED = 3     # message déjà finalisé, texte identique
+EDIT_OUTDATED = 4      # édition plus ancienne que la dernière vue
+
+class _MessageState:
+    __slots__ = ('edit_date', 'digest', 'game_number', 'finalized')
+
+    def __init__(self, edit_date, digest: int, game_number: int, finalized: bool):
+        self.edit_date = edit_date
+        self.digest = digest
+        self.game_number = game_number
+        self.finalized = finalized
+
+class EditCache:
+    """
+    État des messages source récents (id -> date d'édition, empreinte du
+    texte, numéro de jeu, finalisation), borné à éviction LRU. Les éditions
+    sans effet sont écartées en temps constant, sans analyse du texte:
+    éditions en retard, textes inchangés et éditions ⏰ d'une rafale (seule
+    la version finale est analysée). Une correction d'un jeu déjà finalisé
+    (texte modifié) passe: la déduplication des vérifications (jeu, cartes)
+    décide ensuite.
+    """
+    __slots__ = ('capacity', '_entries')
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._entries = OrderedDict()
+
+    def remember(self, message_id: int, edit_date, text: str, game_number: int, finalized: bool):
+        """Note l'état d'un message analysé."""
+        entries = self._entries
+        entries[message_id] = _MessageState(edit_date, hash(text), game_number, finalized)
+        entries.move_to_end(message_id)
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+
+    def classify(self, message_id: int, edit_date, text: str, finalized: bool) -> tuple:
+        """
+        Décide du sort d'une édition: (EDIT_*, numéro de jeu connu ou None).
+        `finalized` vient du test rapide du texte (marques ✅/🔰 sans ⏰).
+        Une édition intermédiaire d'un message connu met à jour l'état
+        mémorisé: seule la dernière version d'une rafale sera analysée.
+        """
+        state = self._entries.get(message_id)
+        if state is None:
+            return (EDIT_PARSE if finalized else EDIT_INTERMEDIATE), None
+        if edit_date is not None and state.edit_date is not None and edit_date < state.edit_date:
+            return EDIT_OUTDATED, state.game_number
+        digest = hash(text)
+        if digest == state.digest:
+            return (EDIT_FINALIZED if state.finalized else EDIT_UNCHANGED), state.game_number
+        state.edit_date = edit_date
+        state.digest = digest
+        if not finalized:
+            return EDIT_INTERMEDIATE, state.game_number
+        return EDIT_PARSE, state.game_number
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
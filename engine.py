@@ -0,0 +1,843 @@
+"""
+Moteur de prédiction d'une table (paire canal source / canal de prédiction).
+
+Chaque PredictionEngine possède l'état et la configuration d'une table:
+prédictions en attente, déduplication, offsets /a et /r, mode /ec,
+blocage /time, ainsi que sa persistance (bot_config.json, magasin
+SQLite, historique, enregistrement brut, traces) et son pipeline ordonné.
+Le client Telegram, la file d'envoi et le serveur web restent partagés
+par le processus.
+
+EngineRegistry aiguille les messages source vers le moteur de leur chat:
+un seul processus et une seule connexion MTProto servent plusieurs tables.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import time as time_module
+from datetime import datetime
+from config import (
+    SOURCE_CHANNEL_ID, PREDICTION_CHANNEL_IDS, SUIT_DISPLAY, VERIFICATION_EMOJIS,
+    A_OFFSET_DEFAULT, R_OFFSET_DEFAULT, R_OFFSET_MAX, PENDING_EXPIRY_GRACE, DEDUP_CAPACITY, EDIT_CACHE_CAPACITY,
+    DEDUP_TTL, PENDING_MAX_AGE, EXPIRY_SWEEP_BATCH,
+    CONFIG_FILE, STATE_DB_FILE, HISTORY_FILE, TRACE_FILE, RECORDER_DIR, RECORDER_ENABLED,
+    TABLES_FILE, DEFAULT_TABLE, CATCHUP_BATCH, CATCHUP_OVERLAP, CATCHUP_MAX_MESSAGES,
+    normalize_channel_id
+)
+from game_parser import parse_game, is_odd, get_predicted_suit
+from pending_store import PendingPredictions
+from outbox import PRIORITY_PREDICTION, PRIORITY_STATUS
+from pipeline import GamePipeline, wrapped
+from dedup import BoundedDedup, EditCache
+from state_store import StateStore
+from config_store import ConfigWriter
+from strategy import ec_decide, settle, SETTLE_HIT, SETTLE_MISS
+from history_store import HistoryWriter, FLAG_FIRST
+from recorder import EventRecorder
+import tracing
+import logging_setup
+from metrics import PREDICTIONS_SENT, VERIFICATION_HITS, VERIFICATION_MISSES
+
+logger = logging.getLogger(__name__)
+
+_VERIFICATION_HITS = [VERIFICATION_HITS.labels(i) for i in range(R_OFFSET_MAX + 1)] # index N+i
+_MISSES_FINAL = VERIFICATION_MISSES.labels('final')
+_MISSES_EXPIRED = VERIFICATION_MISSES.labels('expired')
+_MISSES_ABANDONED = VERIFICATION_MISSES.labels('abandoned')
+
+_SPAN_EDITED = {False: {'edited': False}, True: {'edited': True}} # attributs partagés (chemin critique)
+
+# Noms de table: identifiant lisible, distinct des arguments des commandes
+_TABLE_NAME = re.compile(r'^[A-Za-z][\w-]{0,31}$')
+_RESERVED_NAMES = {'off', 'stop', 'level', 'format', 'limit'}
+
+def table_path(path: str, table: str) -> str:
+    """Fichier d'une table secondaire: bot_state.db -> bot_state.vip.db"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{table}{ext}"
+
+def _parse_destinations(value) -> tuple:
+    """Canaux de prédiction d'une table: (ids, {id: (débit, rafale)})."""
+    entries = value if isinstance(value, list) else [value]
+    destinations, limits = [], {}
+    for entry in entries:
+        if isinstance(entry, dict):
+            chat_id = normalize_channel_id(str(entry['id']))
+            if 'rate' in entry:
+                limits[chat_id] = (float(entry['rate']), entry.get('burst'))
+        else:
+            chat_id = normalize_channel_id(str(entry))
+        if chat_id in destinations:
+            raise ValueError(f"Canal de prédiction en double: {chat_id}")
+        destinations.append(chat_id)
+    if not destinations:
+        raise ValueError("Aucun canal de prédiction")
+    return destinations, limits
+
+def load_tables(path: str = TABLES_FILE) -> list:
+    """
+    Tables à servir: [{'name', 'source', 'prediction', 'limits'}], où
+    'prediction' est la liste des canaux de publication. Sans fichier,
+    une seule table issue de SOURCE_CHANNEL_ID / PREDICTION_CHANNEL_ID.
+    """
+    if not os.path.exists(path):
+        return [{'name': DEFAULT_TABLE, 'source': SOURCE_CHANNEL_ID, 'prediction': list(PREDICTION_CHANNEL_IDS), 'limits': {}}]
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    tables = []
+    for entry in entries:
+        name = str(entry['name'])
+        if not _TABLE_NAME.match(name) or name.lower() in _RESERVED_NAMES:
+            raise ValueError(f"Nom de table invalide: {name!r}")
+        destinations, limits = _parse_destinations(entry['prediction'])
+        tables.append({
+            'name': name,
+            'source': normalize_channel_id(str(entry['source'])),
+            'prediction': destinations,
+            'limits': limits,
+        })
+    if not tables:
+        raise ValueError(f"Aucune table dans {path}")
+    return tables
+
+class PredictionEngine:
+    """État, configuration et traitement d'une table."""
+
+    def __init__(self, name: str, source_channel_id: int, prediction_channel_ids: list, outbox,
+                 config_file: str = CONFIG_FILE, state_db_file: str = STATE_DB_FILE,
+                 history_file: str = HISTORY_FILE, trace_file: str = TRACE_FILE, recorder_dir: str = RECORDER_DIR):
+        self.name = name
+        self.source_channel_id = source_channel_id
+        self.prediction_channel_ids = list(prediction_channel_ids) # Destinations de chaque prédiction
+        self.outbox = outbox
+
+        self.pending_predictions = PendingPredictions()
+        self.processed_predictions = BoundedDedup(DEDUP_CAPACITY, DEDUP_TTL)   # clé: numéro de jeu
+        self.processed_verifications = BoundedDedup(DEDUP_CAPACITY, DEDUP_TTL) # clé: (numéro de jeu, empreinte des cartes)
+        self.edits = EditCache(EDIT_CACHE_CAPACITY) # État des messages source récents (filtre des éditions)
+        self.state_store = StateStore(state_db_file) # Prédictions et état de jeu (SQLite WAL)
+        self.history = HistoryWriter(history_file)   # Historique binaire des jeux source
+        self.recorder = EventRecorder(recorder_dir)  # Flux brut des événements source (rejeu d'incidents)
+        self.tracer = tracing.Tracer(trace_file)     # Traces par jeu (/trace)
+        self.config_writer = ConfigWriter(config_file, self._config_snapshot)
+        self.pipeline = GamePipeline(self.process_source_message) # File ordonnée de la table
+
+        self.current_game_number = 0
+        self.last_source_message_id = 0 # Dernier message source vu (point de départ du rattrapage)
+        self._catch_up_task = None
+        self._catch_up_from = None # Trou signalé pendant un rattrapage (id du dernier message vu avant)
+        self.source_channel_ok = False
+        self.reachable_destinations = set() # Canaux de prédiction accessibles (vérifiés au démarrage)
+        self.a_offset = A_OFFSET_DEFAULT
+        self.r_offset = R_OFFSET_DEFAULT
+        self.prediction_blocked = False # Blocage /time (levé par le planificateur)
+
+        # Commande /ec (Écart Personnalisé)
+        self.ec_active = False
+        self.ec_gaps = []  # Liste des écarts [3, 4, 5, ...]
+        self.ec_gap_index = 0
+        self.ec_last_source_game = 0 # Le numéro de jeu source (N) qui a déclenché la dernière prédiction
+        self.ec_first_trigger_done = False # Vrai après la première prédiction P1
+
+        # Contexte des logs (champ 'table') et catégories des messages répétitifs
+        self._log = {'table': name}
+        self._log_ec_skip = logging_setup.category('ec_skip', table=name)
+        self._log_blocked = logging_setup.category('prediction_blocked', table=name)
+        self._log_skipped = logging_setup.category('prediction_skipped', table=name)
+        self._log_pending = logging_setup.category('verification_pending', table=name)
+        self._log_ignored = logging_setup.category('game_ignored', table=name)
+
+    @property
+    def prediction_channel_id(self) -> int:
+        """Canal de prédiction principal (premier de la liste)."""
+        return self.prediction_channel_ids[0] if self.prediction_channel_ids else 0
+
+    @property
+    def prediction_channel_ok(self) -> bool:
+        return bool(self.reachable_destinations)
+
+    # --- Persistance ---
+
+    def _config_snapshot(self) -> dict:
+        """Configuration persistante (A, R et état EC)."""
+        return {
+            'a_offset': self.a_offset,
+            'r_offset': self.r_offset,
+            # Sauvegarde EC
+            'ec_active': self.ec_active,
+            'ec_gaps': self.ec_gaps,
+            'ec_gap_index': self.ec_gap_index,
+            'ec_last_source_game': self.ec_last_source_game,
+            'ec_first_trigger_done': self.ec_first_trigger_done
+        }
+
+    def load_config(self):
+        """Charge la configuration depuis le fichier JSON de la table."""
+        try:
+            config = self.config_writer.load()
+        except Exception as e:
+            logger.error("Erreur chargement config: %s", e, extra=self._log)
+            self.a_offset = A_OFFSET_DEFAULT
+            self.r_offset = R_OFFSET_DEFAULT
+            # En cas d'erreur de chargement, on s'assure que EC est désactivé
+            self.ec_active = False
+            self.ec_gaps = []
+            self.ec_gap_index = 0
+            self.ec_last_source_game = 0
+            self.ec_first_trigger_done = False
+            return
+
+        if config is None:
+            logger.info("⚙️ Fichier %s non trouvé. Utilisation des valeurs par défaut.", self.config_writer.path, extra=self._log)
+            self.save_config() # Sauvegarde les valeurs par défaut si le fichier n'existe pas
+            return
+
+        self.a_offset = config.get('a_offset', A_OFFSET_DEFAULT)
+        self.r_offset = config.get('r_offset', R_OFFSET_DEFAULT)
+        if not isinstance(self.r_offset, int) or not 0 <= self.r_offset <= R_OFFSET_MAX:
+            # Fichier modifié à la main: /r n'accepte que 0..R_OFFSET_MAX
+            logger.warning("⚠️ R_OFFSET=%r invalide dans %s, valeur par défaut %d utilisée",
+                           self.r_offset, self.config_writer.path, R_OFFSET_DEFAULT, extra=self._log)
+            self.r_offset = R_OFFSET_DEFAULT
+        # Chargement EC
+        self.ec_active = config.get('ec_active', False)
+        self.ec_gaps = config.get('ec_gaps', [])
+        self.ec_gap_index = config.get('ec_gap_index', 0)
+        self.ec_last_source_game = config.get('ec_last_source_game', 0)
+        self.ec_first_trigger_done = config.get('ec_first_trigger_done', False)
+
+        logger.info("⚙️ Configuration chargée (génération %d): A_OFFSET=%d, R_OFFSET=%d, EC_ACTIVE=%s",
+                    self.config_writer.generation, self.a_offset, self.r_offset, self.ec_active, extra=self._log)
+
+    def save_config(self):
+        """
+        Marque la configuration comme modifiée. L'écriture (atomique, hors
+        boucle) est différée et fusionnée avec les modifications voisines.
+        """
+        self.config_writer.mark_dirty()
+
+    def _processed_predictions_snapshot(self):
+        return list(self.processed_predictions)
+
+    def _processed_verifications_snapshot(self):
+        return [list(key) for key in self.processed_verifications]
+
+    def restore_state(self):
+        """Recharge les prédictions en attente et l'état de jeu depuis le magasin."""
+        started = time_module.perf_counter()
+        try:
+            predictions, values = self.state_store.load()
+        except Exception as e:
+            logger.error("Erreur chargement état: %s", e, extra=self._log)
+            return
+
+        for game_number, pred in sorted(predictions.items()):
+            if 'destinations' not in pred:
+                # Ancien format: un seul message dans le canal principal
+                pred['destinations'] = [self.prediction_channel_id]
+                pred['message_ids'] = [pred.pop('message_id', 0)]
+                pred.pop('message', None)
+            if 'expires_at' not in pred:
+                # Ancien format: date limite déduite de la création
+                try:
+                    created = datetime.fromisoformat(pred['created_at']).timestamp()
+                except (KeyError, TypeError, ValueError):
+                    created = time_module.time()
+                pred['expires_at'] = created + PENDING_MAX_AGE
+            pred['r_offset'] = min(max(pred.get('r_offset', R_OFFSET_DEFAULT), 0), R_OFFSET_MAX)
+            self.pending_predictions[game_number] = pred
+        self.current_game_number = values.get('current_game_number', 0)
+        self.last_source_message_id = values.get('last_source_message_id', 0)
+        for game_number in values.get('processed_predictions', []):
+            self.processed_predictions.add(game_number)
+        for game_number, fingerprint in values.get('processed_verifications', []):
+            self.processed_verifications.add((game_number, fingerprint))
+
+        elapsed_ms = (time_module.perf_counter() - started) * 1000
+        logger.info("♻️ État restauré en %.1fms: %d prédictions en attente, jeu actuel #%d",
+                    elapsed_ms, len(self.pending_predictions), self.current_game_number, extra=self._log)
+
+    # --- Cycle de vie ---
+
+    async def verify_channels(self, client):
+        """Vérifie l'accès aux canaux de la table."""
+        if self.source_channel_id:
+            try:
+                entity = await client.get_entity(self.source_channel_id)
+                self.source_channel_ok = True
+                logger.info("✅ Accès au canal source: %s", getattr(entity, 'title', self.source_channel_id), extra=self._log)
+            except Exception as e:
+                logger.error("❌ Impossible d'accéder au canal source: %s", e, extra=self._log)
+
+        # Canaux de prédiction vérifiés ensemble (un seul aller-retour)
+        destinations = [chat_id for chat_id in self.prediction_channel_ids if chat_id]
+        results = await asyncio.gather(*(client.get_entity(chat_id) for chat_id in destinations), return_exceptions=True)
+        for chat_id, result in zip(destinations, results):
+            if isinstance(result, Exception):
+                logger.error("❌ Impossible d'accéder au canal de prédiction %s: %s", chat_id, result, extra=self._log)
+                continue
+            self.reachable_destinations.add(chat_id)
+            logger.info("✅ Accès au canal de prédiction: %s", getattr(result, 'title', chat_id), extra=self._log)
+
+    def start(self):
+        """Démarre les tâches de fond de la table (écritures par lots, pipeline, traces)."""
+        self.state_store.start()
+        self.history.start()
+        self.pipeline.start()
+        self.tracer.start()
+        if RECORDER_ENABLED:
+            self.recorder.start()
+
+    async def close(self):
+        await self.config_writer.close()
+        await self.state_store.close()
+        await self.history.close()
+        self.recorder.stop()
+        await self.tracer.close()
+
+    # --- Logique de Prédiction (Immédiate) ---
+
+    @tracing.traced('send_prediction_to_channel')
+    async def send_prediction_to_channel(self, target_game: int, predicted_suit: str, base_game: int, base_suit: str):
+        """Envoie la prédiction au canal de prédiction."""
+        try:
+            display_suit = SUIT_DISPLAY.get(predicted_suit, predicted_suit)
+
+            prediction_msg = f"📲Game:{target_game}:{display_suit} statut :⏳"
+
+            # Canaux de publication et id du message dans chacun (mêmes positions)
+            destinations = [chat_id for chat_id in self.prediction_channel_ids if chat_id in self.reachable_destinations]
+            pred = {
+                'destinations': destinations,
+                'message_ids': [0] * len(destinations),
+                'messages': None,
+                'suit': predicted_suit,
+                'base_game': base_game,
+                'base_suit': base_suit,
+                'status': '⏳',
+                'r_offset': self.r_offset,
+                'verification_attempt': 0,
+                'created_at': datetime.now().isoformat(),
+                'expires_at': time_module.time() + PENDING_MAX_AGE # Abandon si jamais vérifiée
+            }
+
+            if destinations:
+                trace = tracing.current()
+                queued_at = time_module.perf_counter()
+                # Une voie par canal dans la file d'envoi: les publications partent
+                # en parallèle, chacune au débit de son canal. Les ids des messages
+                # sont renseignés à la publication effective.
+                pred['messages'] = [
+                    self.outbox.send(chat_id, prediction_msg, PRIORITY_PREDICTION,
+                                     on_sent=self._on_published(pred, target_game, index, trace, queued_at))
+                    for index, chat_id in enumerate(destinations)
+                ]
+            else:
+                logger.warning("⚠️ Canal de prédiction non accessible", extra=self._log)
+
+            self.pending_predictions[target_game] = pred
+            self.state_store.put_prediction(target_game, pred)
+
+            logger.info("Prédiction active: Jeu #%d - %s (basé sur #%d)", target_game, display_suit, base_game, extra=self._log)
+            return pred['messages']
+
+        except Exception as e:
+            logger.error("Erreur envoi prédiction: %s", e, extra=self._log)
+            return None
+
+    def _on_published(self, pred: dict, target_game: int, index: int, trace, queued_at: float):
+        """Rappel de publication d'une prédiction dans un de ses canaux."""
+        chat_id = pred['destinations'][index]
+
+        def on_sent(msg_id):
+            if trace is not None:
+                trace.add('telegram_send', queued_at, time_module.perf_counter(), {'target': target_game, 'chat': chat_id}, 1)
+            PREDICTIONS_SENT.inc()
+            pred['message_ids'][index] = msg_id
+            self.state_store.put_prediction(target_game, pred)
+            logger.info("✅ Prédiction envoyée au canal %s: Jeu #%d", chat_id, target_game, extra=self._log)
+        return on_sent
+
+    @tracing.traced('update_prediction_status')
+    async def update_prediction_status(self, game_number: int, new_status: str, verification_game_number: int = None,
+                                       pred: dict = None, batch: int = None):
+        """Met à jour le message de prédiction dans le canal."""
+        try:
+            if pred is None:
+                pred = self.pending_predictions.get(game_number)
+            if pred is None:
+                return False
+
+            suit = pred['suit']
+            display_suit = SUIT_DISPLAY.get(suit, suit)
+
+            # Calcul de l'index de vérification (N+0, N+1, N+2, ...)
+            verification_index = 0
+            if verification_game_number is not None:
+                verification_index = verification_game_number - game_number
+
+            if new_status == '✅':
+                # Utilise l'emoji basé sur l'index de vérification
+                status_emoji = VERIFICATION_EMOJIS.get(verification_index, '✅')
+                updated_msg = f"📲Game:{game_number}:{display_suit} statut :{status_emoji}"
+            else:
+                # Message de statut SIMPLE pour l'échec
+                updated_msg = f"📲Game:{game_number}:{display_suit} statut :{new_status}"
+
+            # Un lot d'éditions (une par canal), envoyées en parallèle par la file
+            messages = pred.get('messages') or pred['message_ids']
+            trace = tracing.current()
+            queued_at = time_module.perf_counter()
+            edits = 0
+            for chat_id, message in zip(pred['destinations'], messages):
+                if not message:
+                    continue
+                on_sent = None
+                if trace is not None:
+                    on_sent = self._on_edited(trace, queued_at, game_number, new_status, chat_id)
+                self.outbox.edit(chat_id, message, updated_msg, PRIORITY_STATUS, on_sent=on_sent, batch=batch)
+                edits += 1
+            if edits:
+                logger.info("✅ Prédiction #%d mise à jour: %s (Essai N+%s, %d canal(aux))",
+                            game_number, new_status, verification_index, edits, extra=self._log)
+
+            pred['status'] = new_status
+            self.state_store.put_prediction(game_number, pred)
+
+            if new_status in ['✅', '❌']:
+                # La prédiction est terminée
+                self.pending_predictions.pop(game_number)
+                self.state_store.delete_prediction(game_number)
+                logger.info("Prédiction #%d terminée: %s", game_number, new_status, extra=self._log)
+
+            return True
+
+        except Exception as e:
+            logger.error("Erreur mise à jour prédiction: %s", e, extra=self._log)
+            return False
+
+    @staticmethod
+    def _on_edited(trace, queued_at: float, game_number: int, new_status: str, chat_id: int):
+        def on_sent(msg_id):
+            trace.add('telegram_edit', queued_at, time_module.perf_counter(),
+                      {'prediction': game_number, 'status': new_status, 'chat': chat_id}, 1)
+        return on_sent
+
+    # --- Traitement des Messages ---
+
+    @tracing.traced('process_prediction')
+    async def process_prediction(self, parsed, catch_up_until: int = None):
+        """
+        PRÉDICTION: Se fait immédiatement dès qu'un numéro est détecté.
+        Gère la logique de blocage /time et la logique de séquence /ec.
+        En rattrapage (catch_up_until), l'état avance normalement mais les
+        prédictions visant un jeu déjà joué ne sont pas publiées.
+        """
+        try:
+            should_trigger = False
+            log_mode = ""
+
+            game_number = parsed.game_number
+            self.current_game_number = game_number
+            self.state_store.set('current_game_number', game_number)
+
+            # Éviter les doublons de prédiction (structure bornée, éviction LRU)
+            if not self.processed_predictions.add(game_number):
+                return
+            self.state_store.set('processed_predictions', self._processed_predictions_snapshot)
+            self.history.append(parsed, FLAG_FIRST)
+
+            if parsed.group_count < 2:
+                logger.info("Jeu #%d: Pas assez de groupes pour prédiction", game_number, extra=self._log_ignored)
+                return
+
+            # Extraction de la valeur ET de la couleur
+            card_value, base_suit = parsed.first_card(parsed.second_group)
+
+            if not base_suit:
+                logger.info("Jeu #%d: Pas de couleur trouvée dans le 2nd groupe.", game_number, extra=self._log_ignored)
+                return
+
+            predicted_suit = get_predicted_suit(base_suit, card_value, game_number)
+
+            # --- LOGIQUE DE DÉCLENCHEMENT DE LA PRÉDICTION ---
+
+            if self.ec_active and self.ec_gaps:
+                # Mode EC activé: Priorité, ignore le blocage /time
+                should_trigger, self.ec_gap_index, self.ec_last_source_game, self.ec_first_trigger_done, current_gap = ec_decide(
+                    game_number, self.ec_gaps, self.ec_gap_index, self.ec_last_source_game, self.ec_first_trigger_done
+                )
+
+                if not should_trigger:
+                    # Sauter: N_current est trop bas, attendre.
+                    logger.info("EC: Skip prediction for #%d. Waiting for source game #%d (Gap %d). Last anchor: #%d",
+                                game_number, self.ec_last_source_game + current_gap, current_gap, self.ec_last_source_game,
+                                extra=self._log_ec_skip)
+                    return # Sauter la prédiction
+
+                if current_gap is None:
+                    log_mode = "EC (P1 Initial) N + A_OFFSET"
+                else:
+                    log_mode = f"EC (Next P) N + A_OFFSET, Gap {current_gap} satisfied by N={game_number}"
+
+                # Sauvegarde l'état EC avant l'envoi, juste au cas où l'envoi échoue
+                self.save_config()
+
+            else:
+                # Mode A_OFFSET standard (et vérification du blocage /time)
+                if self.prediction_blocked:
+                    logger.info("⏳ PRÉDICTION BLOQUÉE par /time. Ignoré pour Jeu #%d",
+                                game_number, extra=self._log_blocked)
+                    return
+
+                should_trigger = True
+                log_mode = f"A_OFFSET (N+{self.a_offset})"
+
+            # --- Déclenchement de la Prédiction ---
+            if should_trigger:
+                target_game = game_number + self.a_offset
+
+                if catch_up_until is not None and (target_game <= catch_up_until or wrapped(target_game, catch_up_until)):
+                    logger.info("⏪ Rattrapage: prédiction #%d non publiée (jeu déjà joué)", target_game, extra=self._log_skipped)
+
+                elif target_game not in self.pending_predictions and target_game > self.current_game_number:
+
+                    if logger.isEnabledFor(logging.INFO):
+                        parity = "impair" if is_odd(game_number) else "pair"
+                        logger.info("🎯 Jeu #%d (%s): Carte %s%s -> Prédiction #%d: %s (%s)", game_number, parity, card_value or '',
+                                    SUIT_DISPLAY.get(base_suit, base_suit), target_game, predicted_suit, log_mode, extra=self._log)
+
+                    await self.send_prediction_to_channel(target_game, predicted_suit, game_number, base_suit)
+
+                else:
+                    logger.info("Prédiction #%d déjà active ou cible trop proche de l'actuel (%d)",
+                                target_game, self.current_game_number, extra=self._log_skipped)
+
+        except Exception as e:
+            logger.error("Erreur traitement prédiction: %s", e, exc_info=True, extra=self._log)
+
+    @tracing.traced('process_verification')
+    async def process_verification(self, parsed):
+        """
+        VÉRIFICATION: Attend que le message soit finalisé.
+        Vérifie si le costume prédit est dans le PREMIER groupe.
+        Gère la vérification sur N+0 à N+R_OFFSET.
+        """
+        try:
+            if not parsed.finalized:
+                return
+
+            current_game_number = parsed.game_number
+
+            # Éviter les doublons de vérification (même jeu, mêmes cartes)
+            if not self.processed_verifications.add((current_game_number, parsed.fingerprint())):
+                return
+            self.state_store.set('processed_verifications', self._processed_verifications_snapshot)
+            self.history.append(parsed, 0)
+
+            if parsed.group_count < 1:
+                return
+
+            # --- LOGIQUE DE VÉRIFICATION SUR R_OFFSET ESSAIS ---
+
+            # Règlements de ce message: (jeu prédit, statut, jeu de vérification, prédiction)
+            settlements = []
+
+            # Seules les prédictions dont la fenêtre (N+0 à N+r_offset) couvre ce jeu
+            for pred_game_number, pred in self.pending_predictions.covering(current_game_number):
+                target_suit = pred['suit']
+                r_offset = pred['r_offset']
+
+                # Vérifier si la couleur prédite est dans le PREMIER groupe
+                outcome = settle(pred_game_number, r_offset, current_game_number, parsed.first_group_has(target_suit))
+                if outcome == SETTLE_HIT:
+                    # SUCCÈS
+                    logger.info("✅ Jeu #%d: %s trouvé dans le 1er groupe! (Prédiction #%d)",
+                                current_game_number, SUIT_DISPLAY.get(target_suit, target_suit), pred_game_number, extra=self._log)
+                    _VERIFICATION_HITS[current_game_number - pred_game_number].inc()
+                    settlements.append((pred_game_number, '✅', current_game_number, pred))
+
+                elif outcome == SETTLE_MISS:
+                    # ÉCHEC (Dernier essai atteint)
+                    logger.info("❌ Jeu #%d: %s NON trouvé après %d essais. (Prédiction #%d)",
+                                current_game_number, SUIT_DISPLAY.get(target_suit, target_suit), r_offset, pred_game_number, extra=self._log)
+                    _MISSES_FINAL.inc()
+                    settlements.append((pred_game_number, '❌', None, pred))
+
+                else:
+                    # ÉCHEC (Essai non final), on incrémente le compteur pour le prochain jeu
+                    pred['verification_attempt'] += 1
+                    self.state_store.put_prediction(pred_game_number, pred)
+                    # Note: On ne met pas à jour le statut du message ici, on attend soit le succès, soit l'échec final.
+                    logger.info("⏳ Jeu #%d: %s non trouvé. Continue vérification pour #%d (Essai: %d)", current_game_number,
+                                SUIT_DISPLAY.get(target_suit, target_suit), pred_game_number, pred['verification_attempt'],
+                                extra=self._log_pending)
+
+            # Fenêtres expirées sans résultat (jeu de vérification final manqué)
+            for pred_game_number, pred in self.pending_predictions.pop_expired(current_game_number - PENDING_EXPIRY_GRACE):
+                logger.info("❌ Prédiction #%d: fenêtre N+0 à N+%d expirée sans vérification (Jeu actuel #%d)",
+                            pred_game_number, pred['r_offset'], current_game_number, extra=self._log)
+                _MISSES_EXPIRED.inc()
+                settlements.append((pred_game_number, '❌', None, pred))
+
+            if settlements:
+                # État mis à jour tout de suite; les éditions partent en un seul lot
+                batch = self.outbox.new_batch()
+                for pred_game_number, status, verification_game_number, pred in settlements:
+                    await self.update_prediction_status(pred_game_number, status, verification_game_number, pred=pred, batch=batch)
+
+        except Exception as e:
+            logger.error("Erreur traitement vérification: %s", e, exc_info=True, extra=self._log)
+
+    async def submit(self, parsed, message_text: str, received_at: float, edited: bool = False):
+        """Dépose un message source analysé dans le pipeline de la table."""
+        trace = self.tracer.begin(parsed.game_number, received_at)
+        if trace is not None:
+            trace.add('parse', received_at, time_module.perf_counter(), _SPAN_EDITED[edited], 0)
+        await self.pipeline.submit(parsed, message_text, edited=edited)
+
+    async def process_source_message(self, parsed, message_text: str, edited: bool, predict: bool):
+        """Traitement ordonné d'un message source (consommateur du pipeline)."""
+        trace = self.tracer.begin(parsed.game_number)
+        if trace is None:
+            await self._process_source_message(parsed, edited, predict)
+            return
+        now = time_module.perf_counter()
+        trace.add('pipeline_wait', now - self.pipeline.last_wait, now, _SPAN_EDITED[edited])
+        token = tracing.activate(trace)
+        try:
+            await self._process_source_message(parsed, edited, predict)
+        finally:
+            tracing.deactivate(token)
+
+    async def _process_source_message(self, parsed, edited: bool, predict: bool):
+        if not edited and predict:
+            # Prédiction immédiate (n'attend pas la finalisation)
+            await self.process_prediction(parsed)
+
+        # Vérification (attend la finalisation)
+        if parsed.finalized:
+            await self.process_verification(parsed)
+
+    # --- Rattrapage ---
+
+    def source_message_seen(self, message_id: int) -> int:
+        """
+        Note l'id d'un message source. Retourne l'id du dernier message vu
+        avant lui si des messages ont été manqués (0 sinon).
+        """
+        last = self.last_source_message_id
+        if message_id <= last:
+            return 0
+        self.last_source_message_id = message_id
+        gap = last > 0 and message_id > last + 1
+        if gap or self.catching_up:
+            # Point de reprise persisté seulement après le rattrapage
+            return last if gap else 0
+        self.state_store.set('last_source_message_id', message_id)
+        return 0
+
+    @property
+    def catching_up(self) -> bool:
+        return self._catch_up_task is not None and not self._catch_up_task.done()
+
+    def start_catch_up(self, client, after_id: int = None, until_id: int = None) -> asyncio.Task:
+        """
+        Lance un rattrapage en tâche de fond (un seul à la fois) depuis
+        after_id (par défaut le dernier message vu) et retourne sa tâche.
+        Un trou signalé pendant un rattrapage est relu à sa suite.
+        """
+        if after_id is None:
+            after_id = self.last_source_message_id
+        if self.catching_up:
+            if self._catch_up_from is None or after_id < self._catch_up_from:
+                self._catch_up_from = after_id
+            return self._catch_up_task
+        # Les messages reçus entre-temps attendent dans la file du pipeline
+        self.pipeline.pause()
+        self._catch_up_task = asyncio.create_task(self.catch_up(client, after_id, until_id))
+        return self._catch_up_task
+
+    async def catch_up(self, client, after_id: int = None, until_id: int = None) -> int:
+        """
+        Relit les messages source publiés ou édités pendant une coupure
+        (redémarrage, reconnexion, trou dans les ids) après after_id et les
+        rejoue dans leur ordre de publication: vérifications et état (jeu
+        actuel, ancres /ec, déduplication), sans publier de prédiction pour
+        un jeu déjà joué. Le pipeline est suspendu pendant le rattrapage et
+        le point de reprise n'est persisté qu'à la fin. Retourne le nombre
+        de jeux rejoués.
+        """
+        self.pipeline.pause()
+        try:
+            if after_id is None:
+                after_id = self.last_source_message_id
+            replayed = 0
+            while after_id and self.source_channel_id:
+                self._catch_up_from = None
+                replayed += await self._replay_since(client, after_id, until_id)
+                # Trou signalé par un message en direct pendant la relecture
+                after_id, until_id = self._catch_up_from, None
+            self.state_store.set('last_source_message_id', self.last_source_message_id)
+            return replayed
+        except Exception as e:
+            logger.error("Erreur rattrapage: %s", e, exc_info=True, extra=self._log)
+            return 0
+        finally:
+            self._catch_up_from = None
+            self.pipeline.resume()
+
+    async def _replay_since(self, client, after_id: int, until_id: int = None) -> int:
+        """Relit et rejoue les messages source après after_id (recouvrement compris)."""
+        started = time_module.perf_counter()
+        messages = await self._fetch_since(client, max(0, after_id - CATCHUP_OVERLAP), until_id)
+
+        games = []
+        for message in messages:
+            if message.id > self.last_source_message_id:
+                self.last_source_message_id = message.id
+            parsed = parse_game(getattr(message, 'message', None) or '')
+            if parsed is not None:
+                games.append((message.id, parsed))
+        if not games:
+            return 0
+        # Ordre de publication (ids des messages): les numéros de jeu
+        # repartent de #1 chaque jour, l'ordre des numéros ne suffit pas
+        games.sort(key=lambda game: game[0])
+        newest_game = games[-1][1].game_number
+        self.pipeline.advance(newest_game)
+
+        for _, parsed in games:
+            await self.process_prediction(parsed, catch_up_until=newest_game)
+            if parsed.finalized:
+                await self.process_verification(parsed)
+
+        logger.info("⏪ Rattrapage: %d messages source relus après #%d, %d jeux rejoués jusqu'au #%d en %.0fms",
+                    len(messages), after_id, len(games), newest_game, (time_module.perf_counter() - started) * 1000,
+                    extra=self._log)
+        return len(games)
+
+    async def _fetch_since(self, client, after_id: int, until_id: int = None) -> list:
+        """
+        Messages du canal source après after_id, par lots d'ids consécutifs
+        (get_messages par id est permis aux bots, contrairement à
+        l'historique). S'arrête sur un lot entièrement vide (fin du canal;
+        des ids isolés peuvent manquer, messages supprimés) ou une fois
+        until_id atteint (message en direct qui a révélé le trou).
+        """
+        messages = []
+        next_id = after_id + 1
+        while len(messages) < CATCHUP_MAX_MESSAGES:
+            ids = list(range(next_id, next_id + CATCHUP_BATCH))
+            batch = [message for message in await client.get_messages(self.source_channel_id, ids=ids) if message is not None]
+            messages.extend(batch)
+            next_id += CATCHUP_BATCH
+            if not batch or (until_id is not None and next_id > until_id):
+                break
+        return messages
+
+    # --- Expiration ---
+
+    async def sweep(self, now: float = None, limit: int = EXPIRY_SWEEP_BATCH) -> int:
+        """
+        Balayage incrémental: clôt au plus `limit` prédictions dont la date
+        limite est dépassée (statut ❌, un seul lot d'éditions) et retire les
+        entrées de déduplication périmées. Retourne le nombre d'entrées retirées.
+        """
+        if now is None:
+            now = time_module.time()
+        aged = self.pending_predictions.pop_aged(now, limit)
+        if aged:
+            batch = self.outbox.new_batch()
+            for pred_game_number, pred in aged:
+                logger.info("❌ Prédiction #%d abandonnée: aucune vérification depuis %ds (Jeu actuel #%d)",
+                            pred_game_number, PENDING_MAX_AGE, self.current_game_number, extra=self._log)
+                _MISSES_ABANDONED.inc()
+                await self.update_prediction_status(pred_game_number, '❌', pred=pred, batch=batch)
+
+        expired_predictions = self.processed_predictions.expire(now, limit)
+        if expired_predictions:
+            self.state_store.set('processed_predictions', self._processed_predictions_snapshot)
+        expired_verifications = self.processed_verifications.expire(now, limit)
+        if expired_verifications:
+            self.state_store.set('processed_verifications', self._processed_verifications_snapshot)
+        return len(aged) + expired_predictions + expired_verifications
+
+    # --- Reset ---
+
+    def reset(self) -> int:
+        """Efface les prédictions et l'état de jeu; retourne le nombre de prédictions effacées."""
+        count = len(self.pending_predictions)
+        self.pending_predictions.clear()
+        self.processed_predictions.clear()
+        self.processed_verifications.clear()
+        self.edits.clear()
+        self.current_game_number = 0
+        self.pipeline.reset()
+
+        self.state_store.clear_predictions()
+        self.state_store.set('current_game_number', 0)
+        self.state_store.set('processed_predictions', [])
+        self.state_store.set('processed_verifications', [])
+
+        logger.info("🔄 Reset effectué - %d prédictions effacées", count, extra=self._log)
+        return count
+
+class EngineRegistry:
+    """Moteurs par nom et par canal source (aiguillage des messages)."""
+
+    def __init__(self):
+        self._engines = {}   # nom -> moteur (ordre de déclaration)
+        self._by_source = {} # canal source -> moteur
+
+    @classmethod
+    def from_tables(cls, tables: list, outbox) -> 'EngineRegistry':
+        """
+        Crée un moteur par table. La première garde les fichiers par défaut
+        (compatibilité avec un déploiement à une seule table); les suivantes
+        utilisent des fichiers suffixés par leur nom.
+        """
+        registry = cls()
+        for i, table in enumerate(tables):
+            name = table['name']
+            paths = (CONFIG_FILE, STATE_DB_FILE, HISTORY_FILE, TRACE_FILE, RECORDER_DIR)
+            if i > 0:
+                paths = tuple(table_path(path, name) for path in paths)
+            registry.add(PredictionEngine(name, table['source'], table['prediction'], outbox, *paths))
+            for chat_id, (rate, burst) in table.get('limits', {}).items():
+                outbox.set_chat_rate(chat_id, rate, burst)
+        return registry
+
+    def add(self, engine: PredictionEngine):
+        if engine.name in self._engines:
+            raise ValueError(f"Table en double: {engine.name}")
+        if engine.source_channel_id in self._by_source:
+            raise ValueError(f"Canal source {engine.source_channel_id} déjà utilisé par la table {self._by_source[engine.source_channel_id].name}")
+        self._engines[engine.name] = engine
+        self._by_source[engine.source_channel_id] = engine
+
+    def route(self, chat_id: int):
+        """Moteur du canal source (None si le chat n'est pas une table)."""
+        return self._by_source.get(chat_id)
+
+    def get(self, name: str):
+        return self._engines.get(name)
+
+    @property
+    def default(self) -> PredictionEngine:
+        """Table utilisée par les commandes sans argument de table."""
+        return next(iter(self._engines.values()))
+
+    def source_chats(self) -> list:
+        return list(self._by_source)
+
+    def names(self) -> list:
+        return list(self._engines)
+
+    def __iter__(self):
+        return iter(list(self._engines.values()))
+
+    def __len__(self) -> int:
+        return len(self._engines)
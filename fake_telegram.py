@@ -0,0 +1,208 @@
+"""
+Client Telegram local (TELEGRAM_CLIENT=fake) pour les tests de charge.
+
+Même interface que la partie de TelegramClient utilisée par le bot:
+gestionnaires d'événements (@client.on), envoi et édition de messages,
+entités, fichiers et historique. Les envois et éditions sont conservés
+en mémoire; la latence réseau et les FloodWait peuvent être simulés.
+Les messages du canal source sont injectés par inject_message /
+inject_edit, qui appellent les gestionnaires enregistrés.
+"""
+import asyncio
+import itertools
+import logging
+import random
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from telethon import events
+from telethon.errors import FloodWaitError, MessageNotModifiedError, MessageIdInvalidError
+
+logger = logging.getLogger(__name__)
+
+class FakeMessage:
+    """Message conservé par le client local."""
+    __slots__ = ('id', 'chat_id', 'message', 'date', 'edit_date', 'out', 'sender_id')
+
+    def __init__(self, message_id: int, chat_id: int, text: str, out: bool, sender_id: int = None):
+        self.id = message_id
+        self.chat_id = chat_id
+        self.message = text
+        self.date = datetime.now(timezone.utc)
+        self.edit_date = None
+        self.out = out
+        self.sender_id = sender_id
+
+    @property
+    def raw_text(self) -> str:
+        return self.message
+
+class FakeEvent:
+    """Événement minimal (NewMessage / MessageEdited) passé aux gestionnaires."""
+    __slots__ = ('message', 'chat_id', 'sender_id', 'is_private')
+
+    def __init__(self, message: FakeMessage, is_private: bool):
+        self.message = message
+        self.chat_id = message.chat_id
+        self.sender_id = message.sender_id
+        self.is_private = is_private
+
+    @property
+    def raw_text(self) -> str:
+        return self.message.message
+
+def _chat_set(chats):
+    if chats is None:
+        return None
+    if isinstance(chats, (list, tuple, set, frozenset)):
+        return set(chats)
+    return {chats}
+
+class FakeTelegramClient:
+    """Client en mémoire, interchangeable avec TelegramClient dans main.py."""
+
+    def __init__(self, latency: float = 0.0, flood_probability: float = 0.0, flood_seconds: int = 1,
+                 seed: int = None, keep_history: bool = True):
+        self.latency = latency                     # délai simulé par appel réseau (secondes)
+        self.flood_probability = flood_probability # probabilité de FloodWait par envoi/édition
+        self.flood_seconds = flood_seconds
+        self.keep_history = keep_history           # conserver les messages (iter_messages)
+        self._random = random.Random(seed)
+        self._handlers = [] # (builder, chats, callback)
+        self._ids = {}      # chat -> compteur d'ids
+        self._messages = {} # chat -> {id: FakeMessage}
+        self._disconnected = None
+        self.on_call = None # observateur optionnel: fonction(type, chat, message) après chaque envoi/édition
+        self.sent = 0
+        self.edited = 0
+        self.floods = 0
+        self.files = []
+
+    # --- Gestionnaires ---
+
+    def on(self, event_builder):
+        def decorator(callback):
+            self.add_event_handler(callback, event_builder)
+            return callback
+        return decorator
+
+    def add_event_handler(self, callback, event_builder):
+        self._handlers.append((event_builder, _chat_set(event_builder.chats), callback))
+
+    async def _dispatch(self, message: FakeMessage, edited: bool, is_private: bool):
+        event = FakeEvent(message, is_private)
+        for builder, chats, callback in self._handlers:
+            # MessageEdited hérite de NewMessage: le type exact décide
+            if isinstance(builder, events.MessageEdited) != edited:
+                continue
+            if chats is not None and message.chat_id not in chats:
+                continue
+            if builder.outgoing and not message.out or builder.incoming and message.out:
+                continue
+            if builder.func is not None and not builder.func(event):
+                continue
+            await callback(event)
+
+    # --- Injection (canal source, messages privés) ---
+
+    def _new_message(self, chat_id: int, text: str, out: bool, sender_id: int = None) -> FakeMessage:
+        counter = self._ids.get(chat_id)
+        if counter is None:
+            counter = self._ids[chat_id] = itertools.count(1)
+        message = FakeMessage(next(counter), chat_id, text, out, sender_id)
+        if self.keep_history:
+            self._messages.setdefault(chat_id, {})[message.id] = message
+        return message
+
+    async def inject_message(self, chat_id: int, text: str, sender_id: int = None, private: bool = False) -> FakeMessage:
+        """Simule un message entrant et appelle les gestionnaires NewMessage."""
+        message = self._new_message(chat_id, text, out=False, sender_id=sender_id)
+        await self._dispatch(message, edited=False, is_private=private)
+        return message
+
+    async def inject_edit(self, message: FakeMessage, text: str) -> FakeMessage:
+        """Simule l'édition d'un message entrant et appelle les gestionnaires MessageEdited."""
+        message.message = text
+        message.edit_date = datetime.now(timezone.utc)
+        await self._dispatch(message, edited=True, is_private=False)
+        return message
+
+    # --- Appels réseau simulés ---
+
+    async def _network(self):
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        if self.flood_probability and self._random.random() < self.flood_probability:
+            self.floods += 1
+            raise FloodWaitError(request=None, capture=self.flood_seconds)
+
+    async def send_message(self, entity, message: str = '', **kwargs) -> FakeMessage:
+        await self._network()
+        self.sent += 1
+        sent = self._new_message(entity, message, out=True)
+        if self.on_call is not None:
+            self.on_call('send', entity, sent)
+        return sent
+
+    async def edit_message(self, entity, message, text: str = None, **kwargs) -> FakeMessage:
+        await self._network()
+        message_id = getattr(message, 'id', message)
+        stored = self._messages.get(entity, {}).get(message_id)
+        if stored is None:
+            if self.keep_history:
+                raise MessageIdInvalidError(request=None)
+            stored = FakeMessage(message_id, entity, None, out=True)
+        if stored.message == text:
+            raise MessageNotModifiedError(request=None)
+        stored.message = text
+        stored.edit_date = datetime.now(timezone.utc)
+        self.edited += 1
+        if self.on_call is not None:
+            self.on_call('edit', entity, stored)
+        return stored
+
+    async def send_file(self, entity, file, caption: str = None, **kwargs) -> FakeMessage:
+        await self._network()
+        self.files.append((entity, file, caption))
+        return self._new_message(entity, caption or '', out=True)
+
+    async def get_entity(self, entity):
+        return SimpleNamespace(id=entity, title=f"Fake {entity}")
+
+    async def get_me(self):
+        return SimpleNamespace(id=1, username='fake_bot')
+
+    async def iter_messages(self, entity, limit: int = None, min_id: int = 0, reverse: bool = False):
+        """Historique d'un chat (du plus récent au plus ancien, comme Telethon)."""
+        messages = [m for m in self._messages.get(entity, {}).values() if m.id > min_id]
+        messages.sort(key=lambda m: m.id, reverse=not reverse)
+        for message in messages[:limit]:
+            yield message
+
+    async def get_messages(self, entity, ids=None, **kwargs) -> list:
+        """Messages par id (None pour un id absent), comme Telethon avec ids=[...]."""
+        await self._network()
+        stored = self._messages.get(entity, {})
+        return [stored.get(message_id) for message_id in ids]
+
+    def messages(self, chat_id: int) -> list:
+        """Messages conservés d'un chat, dans l'ordre d'envoi."""
+        return list(self._messages.get(chat_id, {}).values())
+
+    # --- Cycle de vie ---
+
+    async def start(self, bot_token: str = None, **kwargs):
+        self._disconnected = asyncio.Event()
+        logger.info("🧪 Client Telegram local (fake) démarré")
+        return self
+
+    async def run_until_disconnected(self):
+        if self._disconnected is None:
+            self._disconnected = asyncio.Event()
+        await self._disconnected.wait()
+
+    async def disconnect(self):
+        if self._disconnected is not None:
+            self._disconnected.set()
+
+    def is_connected(self) -> bool:
+        return self._disconnected is not None and not self._disconnected.is_set()
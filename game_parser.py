@@ -0,0 +1,225 @@
+"""
+Analyse des messages du canal source (Baccarat).
+
+Un seul passage compilé sur le texte produit un ParsedGame consommé par
+la prédiction ET la vérification. Les fonctions historiques sont
+conservées pour les outils et la compatibilité.
+"""
+import re
+from config import SUIT_NORMALIZE
+
+# --- Expressions compilées une seule fois ---
+
+# Jetons reconnus en un seul balayage: numéro de jeu, parenthèses,
+# cartes (valeur optionnelle + couleur) et marqueurs d'état.
+_TOKEN_RE = re.compile(
+    r"#N\s*(\d+)"
+    r"|(\()"
+    r"|(\))"
+    r"|(10|[A2-9JQKT])?([♠♥♦♣❤])\ufe0f?"
+    r"|([⏰✅🔰])",
+    re.IGNORECASE
+)
+_GAME_RE = re.compile(r"#N\s*(\d+)\.?", re.IGNORECASE)
+_GROUPS_RE = re.compile(r"\(([^)]*)\)")
+_SUIT_RE = re.compile(r'[♠♥♦♣]|♠️|♥️|♦️|♣️|❤️|❤')
+_CARD_RE = re.compile(r'([A2-9JQKT]|10)?([♠♥♦♣]|♠️|♥️|♦️|♣️|❤️|❤)', re.IGNORECASE)
+
+CARD_VALUES_ODD = {'A', '3', '5', '7', '9', 'J', 'K'}
+CARD_VALUES_EVEN = {'2', '4', '6', '8', 'T', '10', 'Q'}
+
+# Mappings de transformation selon la parité du jeu (N)
+H = '♥' # Coeur (❤️)
+S = '♠' # Pique (♠️)
+D = '♦' # Carreau (♦️)
+C = '♣' # Trèfle (♣️)
+
+# N PAIR: Swap Red/Black (♠️<->♣️ et ❤️<->♦️)
+MAPPING_EVEN = {S: C, C: S, H: D, D: H}
+# N IMPAIR: Swap Pique/Coeur et Carreau/Trèfle (♠️<->❤️ et ♦️<->♣️)
+MAPPING_ODD = {S: H, H: S, D: C, C: D}
+
+_SUIT_CANON = {'♠': S, '♥': H, '❤': H, '♦': D, '♣': C}
+
+# Codes compacts et stables des cartes (valeur inconnue = '')
+CARD_VALUES = ('', 'A', '2', '3', '4', '5', '6', '7', '8', '9', 'T', 'J', 'Q', 'K')
+SUITS = (S, H, D, C)
+_VALUE_INDEX = {value: i for i, value in enumerate(CARD_VALUES)}
+_SUIT_INDEX = {suit: i for i, suit in enumerate(SUITS)}
+SUIT_BITS = {suit: 1 << i for i, suit in enumerate(SUITS)} # masque de couleurs
+
+# (valeur brute, couleur brute) -> carte normalisée partagée (aucune allocation par carte)
+_RAW_VALUES = {'': ''}
+for _value in CARD_VALUES[1:] + ('10',):
+    _RAW_VALUES[_value] = _RAW_VALUES[_value.lower()] = 'T' if _value == '10' else _value
+_CARDS = {(raw, suit): (value, _SUIT_CANON[suit]) for raw, value in _RAW_VALUES.items() for suit in _SUIT_CANON}
+
+def card_code(value: str, suit: str) -> int:
+    """Code entier d'une carte: 1 + index valeur * 4 + index couleur (0 = aucune)."""
+    return 1 + _VALUE_INDEX.get(value, 0) * 4 + _SUIT_INDEX[suit]
+
+_CARD_CODES = {card: card_code(*card) for card in _CARDS.values()}
+
+# --- Résultat d'analyse ---
+
+class ParsedGame:
+    """Message source analysé: numéro, finalisation et cartes des deux groupes."""
+    __slots__ = ('game_number', 'finalized', 'group_count', 'first_group', 'second_group')
+
+    def __init__(self, game_number: int, finalized: bool, group_count: int,
+                 first_group: list, second_group: list):
+        self.game_number = game_number
+        self.finalized = finalized
+        self.group_count = group_count
+        # Chaque groupe est une liste de (valeur, couleur) normalisées
+        self.first_group = first_group
+        self.second_group = second_group
+
+    def first_card(self, group: list):
+        """Retourne (valeur, couleur) de la première carte d'un groupe."""
+        if group:
+            return group[0]
+        return None, None
+
+    def first_group_has(self, suit: str) -> bool:
+        """Vérifie si une couleur (normalisée) est dans le premier groupe."""
+        for _, card_suit in self.first_group:
+            if card_suit == suit:
+                return True
+        return False
+
+    def first_group_mask(self) -> int:
+        """Masque des couleurs présentes dans le premier groupe (SUIT_BITS)."""
+        mask = 0
+        for _, card_suit in self.first_group:
+            mask |= SUIT_BITS[card_suit]
+        return mask
+
+    def fingerprint(self) -> int:
+        """
+        Empreinte stable du contenu (cartes des deux groupes) pour la
+        déduplication; identique d'un redémarrage à l'autre.
+        """
+        codes = _CARD_CODES
+        fp = 0
+        for card in self.first_group:
+            fp = (fp << 6) | codes[card]
+        fp = (fp << 6) | 63 # séparateur des groupes
+        for card in self.second_group:
+            fp = (fp << 6) | codes[card]
+        return fp
+
+    def __repr__(self):
+        return (f"ParsedGame(#{self.game_number}, finalized={self.finalized}, "
+                f"g1={self.first_group}, g2={self.second_group})")
+
+def parse_game(message: str):
+    """
+    Analyse un message source en un seul passage.
+    Retourne None si le message n'est pas un message de jeu.
+    """
+    # Pré-filtre: aucun regex pour les messages sans numéro de jeu
+    if '#' not in message:
+        return None
+
+    game_number = None
+    has_clock = False
+    has_final_mark = False
+    groups = []
+    current = None
+
+    # findall: un tuple (numéro, '(', ')', valeur, couleur, marqueur) par jeton
+    for number, opening, closing, value, suit, flag in _TOKEN_RE.findall(message):
+        if suit:
+            if current is not None:
+                current.append(_CARDS[value, suit])
+        elif opening:
+            # Même comportement que \(([^)]*)\): une parenthèse ouvrante
+            # à l'intérieur d'un groupe fait partie du groupe.
+            if current is None:
+                current = []
+        elif closing:
+            if current is not None:
+                groups.append(current)
+                current = None
+        elif number:
+            if game_number is None:
+                game_number = int(number)
+        elif flag == '⏰':
+            has_clock = True
+        else:
+            has_final_mark = True
+
+    if game_number is None:
+        return None
+
+    return ParsedGame(
+        game_number,
+        has_final_mark and not has_clock,
+        len(groups),
+        groups[0] if groups else [],
+        groups[1] if len(groups) > 1 else []
+    )
+
+# --- Fonctions d'Analyse ---
+
+def normalize_suit(suit: str) -> str:
+    """Normalise un symbole de couleur."""
+    return SUIT_NORMALIZE.get(suit, suit)
+
+def extract_game_number(message: str):
+    """Extrait le numéro de jeu du message."""
+    match = _GAME_RE.search(message)
+    if match:
+        return int(match.group(1))
+    return None
+
+def extract_parentheses_groups(message: str):
+    """Extrait le contenu entre parenthèses."""
+    return _GROUPS_RE.findall(message)
+
+def is_odd(number: int) -> bool:
+    """Vérifie si un numéro est impair."""
+    return number % 2 != 0
+
+def is_message_finalized(message: str) -> bool:
+    """Vérifie si le message est un résultat final."""
+    if '⏰' in message:
+        return False
+    return '✅' in message or '🔰' in message
+
+def suit_in_group(group_str: str, target_suit: str) -> bool:
+    """Vérifie si une couleur est présente dans un groupe."""
+    normalized_target = normalize_suit(target_suit)
+    for match in _SUIT_RE.findall(group_str):
+        if normalize_suit(match) == normalized_target:
+            return True
+    return False
+
+# --- Fonctions d'Extraction Avancée et de Logique de Carte ---
+
+def is_card_value_odd(card_value: str) -> bool:
+    """Détermine si la valeur de la carte est impaire (A, 3, 5, 7, 9, J, K)."""
+    normalized_value = card_value.upper().replace('10', 'T')
+    return normalized_value in CARD_VALUES_ODD
+
+def extract_first_card_details(group_str: str):
+    """Extrait la valeur et la couleur de la première carte d'un groupe."""
+    match = _CARD_RE.search(group_str)
+    if match:
+        value = match.group(1) if match.group(1) else ''
+        suit = normalize_suit(match.group(2))
+        return value, suit
+    return None, None
+
+def get_predicted_suit(base_suit: str, card_value: str, game_number: int) -> str:
+    """
+    Applique la transformation selon la règle simple que nous avons établie :
+    La prédiction dépend UNIQUEMENT de la parité du numéro de jeu (N),
+    et ignore la parité de la carte.
+    """
+    normalized_suit = normalize_suit(base_suit)
+    if not is_odd(game_number): # Jeux PAIRS
+        return MAPPING_EVEN.get(normalized_suit, normalized_suit)
+    else: # Jeux IMPAIRS
+        return MAPPING_ODD.get(normalized_suit, normalized_suit)
@@ -0,0 +1,167 @@
+"""
+Surveillance de la boucle asyncio et disponibilité du bot.
+
+Une sonde mesure en continu le retard d'ordonnancement de la boucle
+(sommeil demandé vs réveil effectif). Un thread de garde surveille le
+battement de la sonde: si la boucle est bloquée, il capture la pile du
+thread de la boucle pendant le blocage, ce qui nomme le code fautif
+(sauvegarde, zip de /deploy, journalisation synchrone...). Avec
+LOOP_DEBUG=1, les rappels lents signalés par le mode debug d'asyncio
+sont aussi conservés.
+
+readiness() combine ce retard, la connexion Telegram, le silence du
+canal source et la file d'envoi pour la route /ready.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from config import (
+    LOOP_PROBE_INTERVAL, LOOP_LAG_WINDOW, LOOP_LAG_READY_MAX, SLOW_CALLBACK_THRESHOLD,
+    SOURCE_SILENCE_MAX, OUTBOX_BACKLOG_READY_MAX, LOOP_DEBUG
+)
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG_SECONDS = REGISTRY.histogram(
+    'bot_loop_lag_seconds', "Retard d'ordonnancement de la boucle asyncio",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+
+class _SlowCallbackHandler(logging.Handler):
+    """Capture les avertissements « Executing ... took X seconds » du mode debug."""
+
+    def __init__(self, monitor):
+        super().__init__(logging.WARNING)
+        self.monitor = monitor
+
+    def emit(self, record):
+        message = record.getMessage()
+        if message.startswith('Executing'):
+            self.monitor.slow_events.append((time.time(), None, message))
+
+class LoopMonitor:
+    """Sonde de retard, capture des blocages et état de disponibilité."""
+
+    def __init__(self, client, backlog=lambda: 0, storage_errors=dict, interval: float = LOOP_PROBE_INTERVAL,
+                 window: float = LOOP_LAG_WINDOW, slow_threshold: float = SLOW_CALLBACK_THRESHOLD):
+        self.client = client
+        self.backlog = backlog # fonction -> taille de la file d'envoi
+        self.storage_errors = storage_errors # fonction -> {table: erreur du magasin d'état}
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.started_at = time.monotonic()
+        self.last_source = None         # dernier message du canal source (monotonic)
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._lags = deque(maxlen=max(1, int(window / interval))) # retards récents
+        self.slow_events = deque(maxlen=20) # (horodatage, durée ou None, description)
+        self._heartbeat = time.monotonic()
+        self._beat = 0
+        self._stacks = {} # battement bloqué -> pile capturée par le thread de garde
+        self._loop_thread_id = None
+        self._task = None
+        self._stop = threading.Event()
+        self._watchdog = None
+
+    # --- Chemin critique ---
+
+    def source_seen(self):
+        self.last_source = time.monotonic()
+
+    # --- Sonde ---
+
+    def start(self):
+        if self._task is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        if LOOP_DEBUG:
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.slow_threshold
+            logging.getLogger('asyncio').addHandler(_SlowCallbackHandler(self))
+        self._task = asyncio.create_task(self._probe())
+        self._watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _probe(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            beat = self._beat
+            self._beat = beat + 1
+            self._heartbeat = time.monotonic()
+
+            self.last_lag = lag
+            self._lags.append(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+            LOOP_LAG_SECONDS.observe(lag)
+            if lag >= self.slow_threshold:
+                stack = self._stacks.pop(beat, None)
+                self.slow_events.append((time.time(), lag, stack or "(pile non capturée)"))
+                logger.warning("🐌 Boucle asyncio bloquée %.0fms", lag * 1000)
+            elif self._stacks:
+                self._stacks.clear()
+
+    def _watch(self):
+        """Thread de garde: capture la pile de la boucle pendant un blocage."""
+        period = max(self.slow_threshold / 2, 0.01)
+        while not self._stop.wait(period):
+            beat = self._beat
+            if beat in self._stacks:
+                continue
+            stalled = time.monotonic() - self._heartbeat - self.interval
+            if stalled < self.slow_threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                self._stacks[beat] = ''.join(traceback.format_stack(frame, limit=12))
+
+    # --- État ---
+
+    def recent_max_lag(self) -> float:
+        return max(self._lags, default=0.0)
+
+    def source_silence(self) -> float:
+        """Secondes depuis le dernier message source (depuis le démarrage s'il n'y en a pas eu)."""
+        return time.monotonic() - (self.last_source if self.last_source is not None else self.started_at)
+
+    def readiness(self) -> tuple:
+        """Retourne (prêt, détails des contrôles)."""
+        lag = self.recent_max_lag()
+        silence = self.source_silence()
+        backlog = self.backlog()
+        connected = bool(self.client.is_connected())
+        storage_errors = self.storage_errors()
+        checks = {
+            'loop_lag': {'ok': lag <= LOOP_LAG_READY_MAX, 'value': round(lag, 4), 'max': LOOP_LAG_READY_MAX},
+            'telegram': {'ok': connected},
+            'source_silence': {'ok': silence <= SOURCE_SILENCE_MAX, 'value': round(silence, 1), 'max': SOURCE_SILENCE_MAX},
+            'outbox_backlog': {'ok': backlog <= OUTBOX_BACKLOG_READY_MAX, 'value': backlog, 'max': OUTBOX_BACKLOG_READY_MAX},
+            'state_store': {'ok': not storage_errors, 'errors': storage_errors},
+        }
+        return all(check['ok'] for check in checks.values()), checks
+
+    def slow_report(self, limit: int = 5) -> str:
+        """Derniers blocages (texte pour /debug)."""
+        if not self.slow_events:
+            return "Aucun blocage enregistré"
+        lines = []
+        for timestamp, duration, description in list(self.slow_events)[-limit:]:
+            moment = time.strftime('%H:%M:%S', time.gmtime(timestamp))
+            took = f"{duration * 1000:.0f}ms" if duration is not None else "debug"
+            # Fin de la pile: fichier, ligne et code qui bloquaient
+            where = [line.strip() for line in description.strip().splitlines() if line.strip()]
+            lines.append(f"{moment} UTC {took}: {' | '.join(where[-2:])[:200] if where else '?'}")
+        return "\n".join(lines)
@@ -0,0 +1,208 @@
+"""
+Historique compact des jeux du canal source.
+
+Chaque jeu est ajouté sous forme d'enregistrements de 16 octets
+(jeu, horodatage, drapeaux, nombre de groupes, 3 + 3 codes de cartes)
+dans un fichier en ajout seul, projetable en mémoire (mmap). Un petit
+index (jour UTC -> premier enregistrement) permet de retrouver un jeu
+sans analyser de texte ni charger tout l'historique en objets Python.
+"""
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import HISTORY_FILE, HISTORY_FLUSH_INTERVAL
+from game_parser import CARD_VALUES, CARD_VALUES_ODD, SUITS, card_code
+
+logger = logging.getLogger(__name__)
+
+# jeu, horodatage (s), drapeaux, nombre de groupes, 3 cartes du 1er groupe, 3 du 2nd
+RECORD = struct.Struct('<IIBB6B')
+# jour UTC, index du premier enregistrement du jour
+INDEX = struct.Struct('<II')
+
+# Un premier message déjà finalisé produit deux enregistrements (FIRST puis vérification)
+FLAG_FIRST = 1     # Premier message du jeu (source de la prédiction)
+FLAG_FINALIZED = 2 # Message finalisé (source de la vérification)
+FLAG_SECOND_ODD = 4 # 1ère carte du 2nd groupe impaire (entrée de la règle de couleur)
+
+CARDS_PER_GROUP = 3
+_EMPTY_GROUP = (0,) * CARDS_PER_GROUP
+
+def _encode_group(group: list) -> tuple:
+    codes = tuple(card_code(value, suit) for value, suit in group[:CARDS_PER_GROUP])
+    return codes + _EMPTY_GROUP[len(codes):]
+
+def decode_card(code: int):
+    """Code -> (valeur, couleur); la valeur vaut '' si elle était absente."""
+    code -= 1
+    return CARD_VALUES[code // 4], SUITS[code % 4]
+
+def decode_group(codes) -> list:
+    return [decode_card(code) for code in codes if code]
+
+class HistoryRecord:
+    """Enregistrement décodé (usage ponctuel: requêtes admin, analyses)."""
+    __slots__ = ('game_number', 'timestamp', 'flags', 'group_count', 'first_group', 'second_group')
+
+    def __init__(self, game_number, timestamp, flags, group_count, *codes):
+        self.game_number = game_number
+        self.timestamp = timestamp
+        self.flags = flags
+        self.group_count = group_count
+        self.first_group = decode_group(codes[:CARDS_PER_GROUP])
+        self.second_group = decode_group(codes[CARDS_PER_GROUP:])
+
+    @property
+    def finalized(self) -> bool:
+        return bool(self.flags & FLAG_FINALIZED)
+
+class HistoryWriter:
+    """Ajout en mémoire sur la boucle, écriture groupée dans un thread."""
+
+    def __init__(self, path: str = HISTORY_FILE, flush_interval: float = HISTORY_FLUSH_INTERVAL):
+        self.path = path
+        self.index_path = f"{path}.idx"
+        self.flush_interval = flush_interval
+        self._buffer = bytearray()
+        self._index_buffer = bytearray()
+        self._task = None
+        # Un seul thread: les ajouts restent dans l'ordre
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='history-store')
+        self.count = 0
+        self.last_day = None
+        self._open_existing()
+
+    def _open_existing(self):
+        if os.path.exists(self.path):
+            size = os.path.getsize(self.path)
+            self.count = size // RECORD.size
+            if size % RECORD.size:
+                # Enregistrement partiel (arrêt brutal): on tronque
+                with open(self.path, 'r+b') as f:
+                    f.truncate(self.count * RECORD.size)
+        if os.path.exists(self.index_path):
+            size = os.path.getsize(self.index_path)
+            entries = size // INDEX.size
+            if entries:
+                with open(self.index_path, 'rb') as f:
+                    f.seek((entries - 1) * INDEX.size)
+                    self.last_day, _ = INDEX.unpack(f.read(INDEX.size))
+
+    def append(self, parsed, flags: int, timestamp: float = None):
+        """Ajoute un enregistrement pour un jeu analysé (aucune E/S)."""
+        timestamp = int(timestamp if timestamp is not None else time.time())
+        day = timestamp // 86400
+        if day != self.last_day:
+            self._index_buffer += INDEX.pack(day, self.count)
+            self.last_day = day
+        if parsed.finalized:
+            flags |= FLAG_FINALIZED
+        if parsed.group_count >= 2 and parsed.first_card(parsed.second_group)[0] in CARD_VALUES_ODD:
+            flags |= FLAG_SECOND_ODD
+        self._buffer += RECORD.pack(
+            parsed.game_number, timestamp, flags, min(parsed.group_count, 255),
+            *_encode_group(parsed.first_group), *_encode_group(parsed.second_group)
+        )
+        self.count += 1
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Erreur écriture historique: %s", e)
+
+    def _write(self, records: bytes, index: bytes):
+        # Les enregistrements d'abord: l'index ne pointe jamais au-delà du fichier
+        with open(self.path, 'ab') as f:
+            f.write(records)
+        if index:
+            with open(self.index_path, 'ab') as f:
+                f.write(index)
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        records, index = bytes(self._buffer), bytes(self._index_buffer)
+        self._buffer.clear()
+        self._index_buffer.clear()
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._write, records, index)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        await self.flush()
+        self._executor.shutdown(wait=True)
+
+class HistoryReader:
+    """Lecture de l'historique projeté en mémoire (lecture seule)."""
+
+    def __init__(self, path: str = HISTORY_FILE):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.path.getsize(path)
+        self.count = size // RECORD.size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._days = self._load_index(f"{path}.idx")
+        self._games_by_day = {}
+
+    def _load_index(self, index_path: str) -> list:
+        """Retourne [(jour, début, fin)] dans l'ordre du fichier."""
+        entries = []
+        if os.path.exists(index_path):
+            with open(index_path, 'rb') as f:
+                data = f.read()
+            entries = [entry for entry in INDEX.iter_unpack(data[:len(data) - len(data) % INDEX.size])
+                       if entry[1] < self.count]
+        days = []
+        for i, (day, start) in enumerate(entries):
+            end = entries[i + 1][1] if i + 1 < len(entries) else self.count
+            days.append((day, start, end))
+        return days
+
+    def __len__(self) -> int:
+        return self.count
+
+    def raw(self, start: int = 0, end: int = None):
+        """Itère sur les tuples bruts (jeu, horodatage, drapeaux, groupes, 6 codes)."""
+        end = self.count if end is None else min(end, self.count)
+        if start >= end:
+            return iter(())
+        return RECORD.iter_unpack(memoryview(self._map)[start * RECORD.size:end * RECORD.size])
+
+    def record(self, index: int) -> HistoryRecord:
+        return HistoryRecord(*RECORD.unpack_from(self._map, index * RECORD.size))
+
+    def days(self) -> list:
+        return [day for day, _, _ in self._days]
+
+    def find(self, game_number: int, day: int = None) -> list:
+        """Index des enregistrements d'un jeu (jour UTC donné, ou le plus récent)."""
+        if not self._days:
+            return []
+        for entry_day, start, end in reversed(self._days):
+            if day is None or entry_day == day:
+                break
+        else:
+            return []
+        games = self._games_by_day.get(entry_day)
+        if games is None:
+            games = {}
+            for offset, record in enumerate(self.raw(start, end)):
+                games.setdefault(record[0], []).append(start + offset)
+            self._games_by_day[entry_day] = games
+        return games.get(game_number, [])
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
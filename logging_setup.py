@@ -0,0 +1,176 @@
+"""
+Journalisation non bloquante.
+
+Les appels logger.* ne font qu'empiler l'enregistrement dans une file
+(QueueHandler); un thread (QueueListener) le met en forme et l'écrit sur
+stdout. Avec des arguments %-style, le message n'est construit que dans
+ce thread: sur le chemin critique, passer des valeurs immuables
+(nombres, chaînes), pas des dictionnaires susceptibles de changer.
+
+Sortie en JSON (une ligne par événement) ou en texte; le champ 'table'
+(extra) identifie le moteur à l'origine du message. Les messages
+répétitifs portent une catégorie (extra={'category': ...}); une limite
+par catégorie n'en laisse passer qu'un par intervalle, le suivant
+indiquant combien ont été écartés. Niveau, format et limites sont
+modifiables à chaud (commande /log).
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+from config import LOG_LEVEL, LOG_FORMAT, LOG_QUEUE_SIZE, LOG_RATE_LIMITS
+
+LOG_FORMATS = ('json', 'text')
+
+def category(name: str, **fields) -> dict:
+    """Argument extra= d'un message d'une catégorie (à créer une fois, hors du chemin critique)."""
+    return {'category': name, **fields}
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        table = getattr(record, 'table', None)
+        if table:
+            entry['table'] = table
+        category_name = getattr(record, 'category', None)
+        if category_name:
+            entry['category'] = category_name
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            entry['suppressed'] = suppressed
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s - %(levelname)s - %(table_prefix)s%(message)s')
+
+    def format(self, record) -> str:
+        table = getattr(record, 'table', None)
+        record.table_prefix = f"[{table}] " if table else ''
+        text = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            text += f" (+{suppressed} similaires écartés)"
+        return text
+
+class CategoryRateLimit(logging.Filter):
+    """Au plus un message par intervalle pour chaque catégorie limitée."""
+
+    def __init__(self, intervals: dict):
+        super().__init__()
+        self.intervals = dict(intervals) # catégorie -> secondes (0 = sans limite)
+        self._last = {}
+        self._pending = {}               # catégorie -> écartés depuis le dernier message
+        self.suppressed = {}             # catégorie -> total écarté
+
+    def filter(self, record) -> bool:
+        category_name = getattr(record, 'category', None)
+        if category_name is None:
+            return True
+        interval = self.intervals.get(category_name)
+        if not interval:
+            return True
+        now = time.monotonic()
+        last = self._last.get(category_name)
+        if last is not None and now - last < interval:
+            self._pending[category_name] = self._pending.get(category_name, 0) + 1
+            self.suppressed[category_name] = self.suppressed.get(category_name, 0) + 1
+            return False
+        self._last[category_name] = now
+        record.suppressed = self._pending.pop(category_name, 0)
+        return True
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """File bornée; mise en forme différée au thread d'écriture."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # QueueHandler.prepare() formate dans le thread appelant: on garde
+        # l'enregistrement tel quel (même processus, aucun pickle)
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1 # stdout bloqué: ne jamais bloquer la boucle
+
+class LogSetup:
+    """Installation de la file de journalisation et réglages à chaud."""
+
+    def __init__(self, level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, rate_limits: dict = LOG_RATE_LIMITS,
+                 queue_size: int = LOG_QUEUE_SIZE, stream=None):
+        self.stream_handler = logging.StreamHandler(stream or sys.stdout)
+        self.format = None
+        self.set_format(fmt)
+        self.rate_limit = CategoryRateLimit(rate_limits)
+        self.queue_handler = _QueueHandler(queue.Queue(queue_size))
+        self.queue_handler.addFilter(self.rate_limit)
+        self.listener = logging.handlers.QueueListener(self.queue_handler.queue, self.stream_handler)
+        self.level = level.upper()
+        self._started = False
+
+    def start(self):
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self.queue_handler)
+        root.setLevel(self.level)
+        self.listener.start()
+        self._started = True
+        atexit.register(self.stop)
+        return self
+
+    def stop(self):
+        """Vide la file et arrête le thread d'écriture."""
+        if self._started:
+            self._started = False
+            self.listener.stop()
+
+    # --- Réglages à chaud ---
+
+    def set_level(self, level: str):
+        level = level.upper()
+        if not isinstance(logging.getLevelName(level), int):
+            raise ValueError(f"Niveau inconnu: {level}")
+        self.level = level
+        logging.getLogger().setLevel(level)
+
+    def set_format(self, fmt: str):
+        fmt = fmt.lower()
+        if fmt not in LOG_FORMATS:
+            raise ValueError(f"Format inconnu: {fmt}")
+        self.format = fmt
+        self.stream_handler.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+
+    def set_interval(self, category_name: str, seconds: float):
+        if seconds < 0:
+            raise ValueError("Intervalle négatif")
+        self.rate_limit.intervals[category_name] = seconds
+
+    def status(self) -> str:
+        lines = [
+            f"Niveau: {self.level} | Format: {self.format}",
+            f"File: {self.queue_handler.queue.qsize()} en attente, {self.queue_handler.dropped} perdus",
+        ]
+        for category_name, interval in sorted(self.rate_limit.intervals.items()):
+            limit = f"1 / {interval:g}s" if interval else "sans limite"
+            lines.append(f"• {category_name}: {limit}, {self.rate_limit.suppressed.get(category_name, 0)} écartés")
+        return "\n".join(lines)
+
+def configure(**kwargs) -> LogSetup:
+    return LogSetup(**kwargs).start()
@@ -1,685 +1,366 @@
 import os
 import asyncio
-import re
 import logging
-import sys
 import zipfile
 import shutil
 import json
-from datetime import datetime, timedelta, timezone, time
+import time as time_module
+from datetime import datetime, timezone, time
 from telethon import TelegramClient, events
 from telethon.sessions import StringSession
 from aiohttp import web
 from config import (
-    API_ID, API_HASH, BOT_TOKEN, ADMIN_ID,
-    SOURCE_CHANNEL_ID, PREDICTION_CHANNEL_ID, PORT,
-    SUIT_DISPLAY, SUIT_NORMALIZE,
-    A_OFFSET_DEFAULT, R_OFFSET_DEFAULT, VERIFICATION_EMOJIS
+    API_ID, API_HASH, BOT_TOKEN, ADMIN_ID, TELEGRAM_CLIENT, PORT,
+    SUIT_DISPLAY, A_OFFSET_DEFAULT, R_OFFSET_DEFAULT, R_OFFSET_MAX, VERIFICATION_EMOJIS, CONFIG_FILE,
+    CATCHUP_POLL_INTERVAL, EXPIRY_SWEEP_INTERVAL
+)
+from game_parser import parse_game, is_message_finalized
+from outbox import Outbox, PRIORITY_ADMIN
+from history_store import HistoryReader
+from engine import EngineRegistry, load_tables
+from health import LoopMonitor
+from scheduler import Scheduler
+import logging_setup
+from dedup import EDIT_PARSE, EDIT_INTERMEDIATE, EDIT_UNCHANGED, EDIT_FINALIZED, EDIT_OUTDATED
+from metrics import (
+    REGISTRY, MESSAGES_RECEIVED, MESSAGES_PARSED, TELEGRAM_CALL_SECONDS, TELEGRAM_ERRORS, EDITS_FILTERED
 )
 
 # --- Configuration et Initialisation ---
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# File de journalisation: l'écriture sur stdout se fait hors de la boucle
+log_setup = logging_setup.configure()
 logger = logging.getLogger(__name__)
 
-# Vérifications de la configuration
-if not API_ID or API_ID == 0:
-    logger.error("API_ID manquant")
-    exit(1)
-if not API_HASH:
-    logger.error("API_HASH manquant")
-    exit(1)
-if not BOT_TOKEN:
-    logger.error("BOT_TOKEN manquant")
-    exit(1)
-
-logger.info(f"Configuration: SOURCE_CHANNEL={SOURCE_CHANNEL_ID}, PREDICTION_CHANNEL={PREDICTION_CHANNEL_ID}")
+# Vérifications de la configuration (inutiles avec le client local)
+if TELEGRAM_CLIENT != 'fake':
+    if not API_ID or API_ID == 0:
+        logger.error("API_ID manquant")
+        exit(1)
+    if not API_HASH:
+        logger.error("API_HASH manquant")
+        exit(1)
+    if not BOT_TOKEN:
+        logger.error("BOT_TOKEN manquant")
+        exit(1)
 
 # Initialisation du client Telegram
-session_string = os.getenv('TELEGRAM_SESSION', '')
-client = TelegramClient(StringSession(session_string), API_ID, API_HASH)
-
-# --- Variables Globales d'État ---
-pending_predictions = {}
-processed_predictions = set()
-processed_verifications = set()
-current_game_number = 0
-source_channel_ok = False
-prediction_channel_ok = False
+if TELEGRAM_CLIENT == 'fake':
+    from fake_telegram import FakeTelegramClient
+    client = FakeTelegramClient()
+else:
+    session_string = os.getenv('TELEGRAM_SESSION', '')
+    client = TelegramClient(StringSession(session_string), API_ID, API_HASH)
+
+# File d'envoi centralisée (aucun gestionnaire n'attend Telegram)
+outbox = Outbox(client)
+
+# Retard de la boucle, blocages et disponibilité (/ready)
+loop_monitor = LoopMonitor(client, lambda: outbox.backlog,
+                           lambda: {engine.name: engine.state_store.error for engine in registry if engine.state_store.error})
+
+# --- Tables ---
+# Un moteur par paire canal source / canal de prédiction (tables.json)
+registry = EngineRegistry.from_tables(load_tables(), outbox)
+scheduler = Scheduler() # Toutes les tâches temporelles (/time, balayages, surveillance)
+for _engine in registry:
+    logger.info("Configuration [%s]: SOURCE_CHANNEL=%s, PREDICTION_CHANNELS=%s",
+                _engine.name, _engine.source_channel_id, _engine.prediction_channel_ids)
 transfer_enabled = True
-A_OFFSET = A_OFFSET_DEFAULT
-R_OFFSET = R_OFFSET_DEFAULT
-CONFIG_FILE = 'bot_config.json'
-prediction_block_until = None 
-
-# Variables pour la commande /ec (Écart Personnalisé)
-ec_active = False
-ec_gaps = []  # Liste des écarts [3, 4, 5, ...]
-ec_gap_index = 0
-ec_last_source_game = 0 # Le numéro de jeu source (N) qui a déclenché la dernière prédiction
-ec_first_trigger_done = False # Vrai après la première prédiction P1
-
-# --- Fonctions de Persistance ---
-
-def load_config():
-    """Charge la configuration depuis le fichier JSON."""
-    global A_OFFSET, R_OFFSET, ec_active, ec_gaps, ec_gap_index, ec_last_source_game, ec_first_trigger_done
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                A_OFFSET = config.get('a_offset', A_OFFSET_DEFAULT)
-                R_OFFSET = config.get('r_offset', R_OFFSET_DEFAULT)
-                # Chargement EC
-                ec_active = config.get('ec_active', False)
-                ec_gaps = config.get('ec_gaps', [])
-                ec_gap_index = config.get('ec_gap_index', 0)
-                ec_last_source_game = config.get('ec_last_source_game', 0)
-                ec_first_trigger_done = config.get('ec_first_trigger_done', False)
-                
-            logger.info(f"⚙️ Configuration chargée: A_OFFSET={A_OFFSET}, R_OFFSET={R_OFFSET}, EC_ACTIVE={ec_active}")
-        except Exception as e:
-            logger.error(f"Erreur chargement config: {e}")
-            A_OFFSET = A_OFFSET_DEFAULT
-            R_OFFSET = R_OFFSET_DEFAULT
-            # En cas d'erreur de chargement, on s'assure que EC est désactivé
-            ec_active = False
-            ec_gaps = []
-            ec_gap_index = 0
-            ec_last_source_game = 0
-            ec_first_trigger_done = False
-    else:
-        logger.info("⚙️ Fichier config.json non trouvé. Utilisation des valeurs par défaut.")
-        save_config() # Sauvegarde les valeurs par défaut si le fichier n'existe pas
-
-def save_config():
-    """Sauvegarde la configuration dans le fichier JSON."""
-    try:
-        config = {
-            'a_offset': A_OFFSET,
-            'r_offset': R_OFFSET,
-            # Sauvegarde EC
-            'ec_active': ec_active,
-            'ec_gaps': ec_gaps,
-            'ec_gap_index': ec_gap_index,
-            'ec_last_source_game': ec_last_source_game,
-            'ec_first_trigger_done': ec_first_trigger_done
-        }
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=4)
-        logger.info("⚙️ Configuration sauvegardée.")
-    except Exception as e:
-        logger.error(f"Erreur sauvegarde config: {e}")
-
-# --- Fonctions d'Analyse ---
-
-def normalize_suit(suit: str) -> str:
-    """Normalise un symbole de couleur."""
-    return SUIT_NORMALIZE.get(suit, suit)
-
-def extract_game_number(message: str):
-    """Extrait le numéro de jeu du message."""
-    match = re.search(r"#N\s*(\d+)\.?", message, re.IGNORECASE)
-    if match:
-        return int(match.group(1))
-    return None
-
-def extract_parentheses_groups(message: str):
-    """Extrait le contenu entre parenthèses."""
-    return re.findall(r"\(([^)]*)\)", message)
-
-def is_odd(number: int) -> bool:
-    """Vérifie si un numéro est impair."""
-    return number % 2 != 0
-
-def is_message_finalized(message: str) -> bool:
-    """Vérifie si le message est un résultat final."""
-    if '⏰' in message:
-        return False
-    return '✅' in message or '🔰' in message
-
-def suit_in_group(group_str: str, target_suit: str) -> bool:
-    """Vérifie si une couleur est présente dans un groupe."""
-    normalized_target = normalize_suit(target_suit)
-    suit_pattern = r'[♠♥♦♣]|♠️|♥️|♦️|♣️|❤️|❤'
-    matches = re.findall(suit_pattern, group_str)
-    for match in matches:
-        if normalize_suit(match) == normalized_target:
-            return True
-    return False
-
-# --- Fonctions d'Extraction Avancée et de Logique de Carte (RÈGLES COMPLEXES) ---
-
-CARD_VALUES_ODD = {'A', '3', '5', '7', '9', 'J', 'K'}
-CARD_VALUES_EVEN = {'2', '4', '6', '8', 'T', '10', 'Q'} 
-
-def is_card_value_odd(card_value: str) -> bool:
-    """Détermine si la valeur de la carte est impaire (A, 3, 5, 7, 9, J, K)."""
-    normalized_value = card_value.upper().replace('10', 'T') 
-    return normalized_value in CARD_VALUES_ODD
-
-def extract_first_card_details(group_str: str):
-    """Extrait la valeur et la couleur de la première carte d'un groupe."""
-    value_pattern = r'([A2-9JQKT]|10)?'
-    suit_pattern = r'([♠♥♦♣]|♠️|♥️|♦️|♣️|❤️|❤)'
-    
-    match = re.search(value_pattern + suit_pattern, group_str, re.IGNORECASE)
-    
-    if match:
-        value = match.group(1) if match.group(1) else ''
-        suit = normalize_suit(match.group(2))
-        return value, suit
-    return None, None
-
-def get_predicted_suit(base_suit: str, card_value: str, game_number: int) -> str:
-    """
-    Applique la transformation selon la règle simple que nous avons établie :
-    La prédiction dépend UNIQUEMENT de la parité du numéro de jeu (N),
-    et ignore la parité de la carte.
-    """
-    normalized_suit = normalize_suit(base_suit)
-    is_odd_game = is_odd(game_number)
+DEPLOY_MODULES = ['main.py', 'config.py', 'engine.py', 'game_parser.py', 'pending_store.py', 'outbox.py', 'pipeline.py', 'dedup.py', 'state_store.py', 'config_store.py', 'strategy.py', 'history_store.py', 'recorder.py', 'fake_telegram.py', 'synthetic_source.py', 'metrics.py', 'health.py', 'tracing.py', 'logging_setup.py', 'scheduler.py'] # Fichiers copiés par /deploy
+
+# Valeurs lues au scrape de /metrics (toutes tables confondues)
+REGISTRY.gauge_func('bot_pending_predictions', "Prédictions en attente de vérification",
+                    lambda: sum(len(engine.pending_predictions) for engine in registry))
+REGISTRY.counter_func('bot_dedup_hits_total', "Doublons écartés (prédiction et vérification)",
+                      lambda: sum(engine.processed_predictions.hits + engine.processed_verifications.hits for engine in registry))
+REGISTRY.gauge_func('bot_pipeline_depth', "Messages source en attente de traitement",
+                    lambda: sum(engine.pipeline.depth for engine in registry))
+REGISTRY.gauge_func('bot_outbox_backlog', "Envois et éditions Telegram en attente", lambda: outbox.backlog)
+REGISTRY.gauge_func('bot_current_game', "Dernier numéro de jeu traité (table par défaut)",
+                    lambda: registry.default.current_game_number)
 
-    H = '♥' # Coeur (❤️)
-    S = '♠' # Pique (♠️)
-    D = '♦' # Carreau (♦️)
-    C = '♣' # Trèfle (♣️)
-    
-    # --- Mappings Simples Basés sur N Parité ---
-    
-    # N PAIR (is_odd_game est False): Swap Red/Black (♠️<->♣️ et ❤️<->♦️)
-    # Ceci correspond à SUIT_MAPPING_EVEN: {'♠': '♣', '♣': '♠', '♦': '♥', '♥': '♦'}
-    MAPPING_EVEN = {S: C, C: S, H: D, D: H}
-    
-    # N IMPAIR (is_odd_game est True): Swap Pique/Coeur et Carreau/Trèfle (♠️<->❤️ et ♦️<->♣️)
-    # Ceci correspond à SUIT_MAPPING_ODD: {'♠': '♥', '♣': '♦', '♦': '♣', '♥': '♠'}
-    MAPPING_ODD = {S: H, H: S, D: C, C: D}
-
-    if not is_odd_game: # Jeux PAIRS
-        return MAPPING_EVEN.get(normalized_suit, normalized_suit)
-    else: # Jeux IMPAIRS
-        return MAPPING_ODD.get(normalized_suit, normalized_suit)
-
-# --- Logique de Prédiction (Immédiate) ---
-
-async def send_prediction_to_channel(target_game: int, predicted_suit: str, base_game: int, base_suit: str):
-    """Envoie la prédiction au canal de prédiction."""
-    global R_OFFSET
-    try:
-        display_suit = SUIT_DISPLAY.get(predicted_suit, predicted_suit)
-        
-        prediction_msg = f"📲Game:{target_game}:{display_suit} statut :⏳"
-
-        msg_id = 0
+async def transfer_to_admin(message_text: str):
+    """Transfère le message à l'admin si activé."""
+    if transfer_enabled and ADMIN_ID and ADMIN_ID != 0:
+        outbox.send(ADMIN_ID, f"📨 Message:\n\n{message_text}", PRIORITY_ADMIN)
 
-        if PREDICTION_CHANNEL_ID and PREDICTION_CHANNEL_ID != 0 and prediction_channel_ok:
-            try:
-                pred_msg = await client.send_message(PREDICTION_CHANNEL_ID, prediction_msg)
-                msg_id = pred_msg.id
-                logger.info(f"✅ Prédiction envoyée au canal: Jeu #{target_game} -> {display_suit}")
-            except Exception as e:
-                logger.error(f"❌ Erreur envoi prédiction au canal: {e}")
-        else:
-            logger.warning(f"⚠️ Canal de prédiction non accessible")
-
-        pending_predictions[target_game] = {
-            'message_id': msg_id,
-            'suit': predicted_suit,
-            'base_game': base_game,
-            'base_suit': base_suit,
-            'status': '⏳',
-            'r_offset': R_OFFSET, 
-            'verification_attempt': 0, 
-            'created_at': datetime.now().isoformat()
-        }
+# --- Gestion des Messages Telegram ---
 
-        logger.info(f"Prédiction active: Jeu #{target_game} - {display_suit} (basé sur #{base_game})")
-        return msg_id
+# Séries de métriques du chemin critique (références préallouées)
+_RECEIVED_NEW = MESSAGES_RECEIVED.labels('new')
+_RECEIVED_EDITED = MESSAGES_RECEIVED.labels('edited')
+_PARSED_NEW = MESSAGES_PARSED.labels('new')
+_PARSED_EDITED = MESSAGES_PARSED.labels('edited')
+_EDITS_FILTERED = {
+    EDIT_UNCHANGED: EDITS_FILTERED.labels('unchanged'),
+    EDIT_FINALIZED: EDITS_FILTERED.labels('finalized'),
+    EDIT_OUTDATED: EDITS_FILTERED.labels('outdated'),
+    EDIT_INTERMEDIATE: EDITS_FILTERED.labels('intermediate'),
+}
 
-    except Exception as e:
-        logger.error(f"Erreur envoi prédiction: {e}")
-        return None
+# Les canaux source sont filtrés à l'enregistrement (ids résolus une seule
+# fois par Telethon): aucun appel get_chat par message. Chaque message est
+# aiguillé vers le moteur de sa table par l'id du chat.
 
-async def update_prediction_status(game_number: int, new_status: str, verification_game_number: int = None):
-    """Met à jour le message de prédiction dans le canal."""
+@client.on(events.NewMessage(chats=registry.source_chats()))
+async def handle_message(event):
+    """Gère les nouveaux messages des canaux source."""
     try:
-        if game_number not in pending_predictions:
-            return False
-
-        pred = pending_predictions[game_number]
-        suit = pred['suit']
-        display_suit = SUIT_DISPLAY.get(suit, suit)
-        
-        # Calcul de l'index de vérification (N+0, N+1, N+2, ...)
-        verification_index = 0
-        if verification_game_number is not None:
-             verification_index = verification_game_number - game_number
-
-        if new_status == '✅':
-            # Utilise l'emoji basé sur l'index de vérification
-            status_emoji = VERIFICATION_EMOJIS.get(verification_index, '✅')
-            
-            # Correction: Simplification du message de succès comme demandé
-            updated_msg = f"📲Game:{game_number}:{display_suit} statut :{status_emoji}"
-            
-        elif new_status == '❌':
-            # Message de statut SIMPLE pour l'échec
-            updated_msg = f"📲Game:{game_number}:{display_suit} statut :{new_status}"
-        else:
-            updated_msg = f"📲Game:{game_number}:{display_suit} statut :{new_status}"
-
-
-        if PREDICTION_CHANNEL_ID and pred['message_id'] > 0 and prediction_channel_ok:
-            try:
-                await client.edit_message(PREDICTION_CHANNEL_ID, pred['message_id'], updated_msg)
-                logger.info(f"✅ Prédiction #{game_number} mise à jour: {new_status} (Essai N+{verification_index})")
-            except Exception as e:
-                logger.error(f"❌ Erreur mise à jour dans le canal: {e}")
-
-        pred['status'] = new_status
-
-        if new_status in ['✅', '❌']:
-            # La prédiction est terminée
-            del pending_predictions[game_number]
-            logger.info(f"Prédiction #{game_number} terminée: {new_status}")
+        _RECEIVED_NEW.inc()
+        loop_monitor.source_seen()
+        received_at = time_module.perf_counter()
+        engine = registry.route(event.chat_id)
+        if engine is None:
+            return
+        message = event.message
+        last_seen = engine.source_message_seen(message.id)
+        if last_seen:
+            # Trou dans les ids: messages publiés pendant une coupure
+            logger.warning("⏪ Messages source manqués entre #%d et #%d: rattrapage", last_seen, message.id, extra={'table': engine.name})
+            engine.start_catch_up(client, after_id=last_seen, until_id=message.id)
+        message_text = message.message
+        parsed = parse_game(message_text)
+        engine.recorder.record(message, parsed)
+        if parsed is None:
+            return
+        _PARSED_NEW.inc()
+        engine.edits.remember(message.id, message.edit_date, message_text, parsed.game_number, parsed.finalized)
 
-        return True
+        await engine.submit(parsed, message_text, received_at)
 
     except Exception as e:
-        logger.error(f"Erreur mise à jour prédiction: {e}")
-        return False
-
-# --- Traitement des Messages ---
+        logger.error("Erreur handle_message: %s", e, exc_info=True)
 
-async def process_prediction(message_text: str):
-    """
-    PRÉDICTION: Se fait immédiatement dès qu'un numéro est détecté.
-    Gère la logique de blocage /time et la logique de séquence /ec.
-    """
-    global current_game_number, A_OFFSET, prediction_block_until, ec_active, ec_gaps, ec_gap_index, ec_last_source_game, ec_first_trigger_done
+@client.on(events.MessageEdited(chats=registry.source_chats()))
+async def handle_edited_message(event):
+    """Gère les messages édités des canaux source."""
     try:
-        current_time = datetime.now()
-        should_trigger = False
-        log_mode = ""
-        
-        game_number = extract_game_number(message_text)
-        if game_number is None:
+        _RECEIVED_EDITED.inc()
+        loop_monitor.source_seen()
+        received_at = time_module.perf_counter()
+        engine = registry.route(event.chat_id)
+        if engine is None:
             return
-
-        current_game_number = game_number
-
-        # Éviter les doublons de prédiction
-        if game_number in processed_predictions:
+        message = event.message
+        message_text = message.message
+
+        # Filtre en temps constant (sans analyse): édition en retard, texte
+        # inchangé (message finalisé ou non), édition ⏰ sans effet (les
+        # éditions ne prédisent pas et la vérification attend la version
+        # finale). Une correction d'un jeu finalisé est analysée.
+        verdict, game_number = engine.edits.classify(message.id, message.edit_date, message_text,
+                                                     is_message_finalized(message_text))
+        if verdict != EDIT_PARSE:
+            _EDITS_FILTERED[verdict].inc()
+            engine.recorder.record(message, edited=True, game_number=game_number)
             return
-        processed_predictions.add(game_number)
-
-        # Nettoyer l'historique
-        if len(processed_predictions) > 500:
-            old_predictions = sorted(processed_predictions)[:250]
-            for p in old_predictions:
-                processed_predictions.discard(p)
 
-        groups = extract_parentheses_groups(message_text)
-        if len(groups) < 2:
-            logger.info(f"Jeu #{game_number}: Pas assez de groupes pour prédiction")
+        parsed = parse_game(message_text)
+        engine.recorder.record(message, parsed, edited=True)
+        if parsed is None:
             return
-
-        second_group = groups[1]
-        
-        # Extraction de la valeur ET de la couleur
-        card_value, base_suit = extract_first_card_details(second_group)
-
-        if not base_suit:
-            logger.info(f"Jeu #{game_number}: Pas de couleur trouvée dans le 2nd groupe.")
+        _PARSED_EDITED.inc()
+        engine.edits.remember(message.id, message.edit_date, message_text, parsed.game_number, parsed.finalized)
+        if not parsed.finalized:
             return
-            
-        predicted_suit = get_predicted_suit(base_suit, card_value, game_number)
-        
-        # --- LOGIQUE DE DÉCLENCHEMENT DE LA PRÉDICTION ---
-
-        if ec_active and ec_gaps:
-            # Mode EC activé: Priorité, ignore le blocage /time
-            
-            if not ec_first_trigger_done:
-                # P1: Première prédiction après /ec activation. Déclenchement immédiat.
-                should_trigger = True 
-                log_mode = "EC (P1 Initial) N + A_OFFSET"
-
-                # Mise à jour de l'état pour P2 après succès
-                ec_last_source_game = game_number # N=100 est l'ancre
-                # ec_gap_index reste 0 (P2 utilisera G1=3)
-                ec_first_trigger_done = True
-                
-            else:
-                # Subsequent predictions (P2, P3, P4, ...)
-                
-                # Le gap à utiliser (G1, G2, G3, ...)
-                current_gap = ec_gaps[ec_gap_index]
-                
-                # Le numéro de jeu source requis pour déclencher (e.g., 100 + 3 = 103)
-                required_source_game = ec_last_source_game + current_gap
-                
-                if game_number >= required_source_game:
-                    # Déclenchement! N_current a atteint ou dépassé le requis.
-                    should_trigger = True
-                    
-                    # --- Mise à jour de l'état pour la *prochaine* prédiction ---
-                    
-                    # Avance l'index pour la prochaine rotation (P3 utilisera G2=4)
-                    ec_gap_index = (ec_gap_index + 1) % len(ec_gaps)
-                    
-                    # L'actuel game_number (e.g., 103, 107, 112) devient la nouvelle ancre
-                    ec_last_source_game = game_number 
-                    
-                    log_mode = f"EC (Next P) N + A_OFFSET, Gap {current_gap} satisfied by N={game_number}"
-                    
-                else:
-                    # Sauter: N_current est trop bas, attendre.
-                    logger.info(f"EC: Skip prediction for #{game_number}. Waiting for source game #{required_source_game} (Gap {current_gap}). Last anchor: #{ec_last_source_game}")
-                    return # Sauter la prédiction
-                    
-            if should_trigger:
-                # Sauvegarde l'état EC avant l'envoi, juste au cas où l'envoi échoue
-                save_config()
-
-        else:
-            # Mode A_OFFSET standard (et vérification du blocage /time)
-            
-            if prediction_block_until and prediction_block_until > current_time:
-                remaining_seconds = (prediction_block_until - current_time).total_seconds()
-                logger.info(f"⏳ PRÉDICTION BLOQUÉE par /time: Reste {remaining_seconds:.1f} secondes. Ignoré pour Jeu #{game_number}")
-                return
-            
-            # Si le temps de blocage est passé, on réinitialise la variable
-            if prediction_block_until and prediction_block_until <= current_time:
-                prediction_block_until = None
-                logger.warning("Blocage des prédictions /time levé automatiquement.")
 
-            should_trigger = True
-            log_mode = f"A_OFFSET (N+{A_OFFSET})"
-
-
-        # --- Déclenchement de la Prédiction ---
-        if should_trigger:
-            target_game = game_number + A_OFFSET
-            
-            if target_game not in pending_predictions and target_game > current_game_number:
-                
-                parity = "impair" if is_odd(game_number) else "pair"
-                card_info = f"{card_value or ''}{SUIT_DISPLAY.get(base_suit, base_suit)}"
-                
-                logger.info(f"🎯 Jeu #{game_number} ({parity}): Carte {card_info} -> Prédiction #{target_game}: {predicted_suit} ({log_mode})")
-                
-                await send_prediction_to_channel(target_game, predicted_suit, game_number, base_suit)
-                
-            else:
-                logger.info(f"Prédiction #{target_game} déjà active ou cible trop proche de l'actuel ({current_game_number})")
+        # Vérification sur messages édités (attend la finalisation)
+        await engine.submit(parsed, message_text, received_at, edited=True)
 
     except Exception as e:
-        logger.error(f"Erreur traitement prédiction: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
+        logger.error("Erreur handle_edited_message: %s", e, exc_info=True)
 
-async def process_verification(message_text: str):
-    """
-    VÉRIFICATION: Attend que le message soit finalisé.
-    Vérifie si le costume prédit est dans le PREMIER groupe.
-    Gère la vérification sur N+0 à N+R_OFFSET.
-    """
+@client.on(events.NewMessage(incoming=True, func=lambda e: e.is_private))
+async def handle_command(event):
+    """Routeur unique des commandes privées (recherche par dictionnaire)."""
     try:
-        if not is_message_finalized(message_text):
+        text = event.message.message
+        if not text or text[0] != '/':
             return
 
-        current_game_number = extract_game_number(message_text)
-        if current_game_number is None:
+        name, _, arg = text.partition(' ')
+        entry = COMMANDS.get(name.split('@', 1)[0].lower())
+        if entry is None:
             return
 
-        # Éviter les doublons de vérification
-        message_hash = f"{current_game_number}_{message_text[:80]}"
-        if message_hash in processed_verifications:
+        handler, admin_only = entry
+        if admin_only and not is_admin(event.sender_id):
+            reply(event, "Commande réservée à l'administrateur")
             return
-        processed_verifications.add(message_hash)
 
-        # Nettoyer l'historique
-        if len(processed_verifications) > 500:
-            processed_verifications.clear()
-        
-        groups = extract_parentheses_groups(message_text)
-        if len(groups) < 1:
-            return
-
-        first_group = groups[0]
-        
-        # --- LOGIQUE DE VÉRIFICATION SUR R_OFFSET ESSAIS ---
-        
-        # Parcourir les prédictions en attente (pending_predictions)
-        for pred_game_number, pred in list(pending_predictions.items()):
-            target_suit = pred['suit']
-            r_offset = pred['r_offset']
-            
-            # Si le jeu actuel est dans la fenêtre de vérification (de N+0 à N+r_offset)
-            # La fenêtre va de pred_game_number (N+0) à pred_game_number + r_offset
-            if pred_game_number <= current_game_number <= pred_game_number + r_offset:
-                
-                # Vérifier si la couleur prédite est dans le PREMIER groupe
-                if suit_in_group(first_group, target_suit):
-                    # SUCCÈS
-                    logger.info(f"✅ Jeu #{current_game_number}: {SUIT_DISPLAY.get(target_suit, target_suit)} trouvé dans le 1er groupe! (Prédiction #{pred_game_number})")
-                    await update_prediction_status(pred_game_number, '✅', current_game_number)
-                
-                elif current_game_number == pred_game_number + r_offset:
-                    # ÉCHEC (Dernier essai atteint)
-                    logger.info(f"❌ Jeu #{current_game_number}: {SUIT_DISPLAY.get(target_suit, target_suit)} NON trouvé après {r_offset} essais. (Prédiction #{pred_game_number})")
-                    await update_prediction_status(pred_game_number, '❌')
-                
-                else:
-                    # ÉCHEC (Essai non final), on incrémente le compteur pour le prochain jeu
-                    pred['verification_attempt'] += 1
-                    # Note: On ne met pas à jour le statut du message ici, on attend soit le succès, soit l'échec final.
-                    logger.info(f"⏳ Jeu #{current_game_number}: {SUIT_DISPLAY.get(target_suit, target_suit)} non trouvé. Continue vérification pour #{pred_game_number} (Essai: {pred['verification_attempt']})")
+        await handler(event, arg.strip())
 
     except Exception as e:
-        logger.error(f"Erreur traitement vérification: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
+        logger.error("Erreur handle_command: %s", e, exc_info=True)
 
-async def transfer_to_admin(message_text: str):
-    """Transfère le message à l'admin si activé."""
-    if transfer_enabled and ADMIN_ID and ADMIN_ID != 0:
-        try:
-            await client.send_message(ADMIN_ID, f"📨 Message:\n\n{message_text}")
-        except Exception as e:
-            logger.error(f"❌ Erreur transfert admin: {e}")
+# --- Rattrapage ---
 
-# --- Gestion des Messages Telegram ---
+async def catch_up_all():
+    """Rattrape les messages source manqués de toutes les tables (en parallèle)."""
+    await asyncio.gather(*(engine.start_catch_up(client) for engine in registry))
 
-@client.on(events.NewMessage())
-async def handle_message(event):
-    """Gère les nouveaux messages dans le canal source."""
-    try:
-        chat = await event.get_chat()
-        chat_id = chat.id if hasattr(chat, 'id') else event.chat_id
+def watch_connection():
+    """Rattrapage après chaque reconnexion de Telegram (tâche périodique du planificateur)."""
+    connected = bool(client.is_connected())
 
-        if chat_id > 0 and hasattr(chat, 'broadcast') and chat.broadcast:
-            chat_id = -1000000000000 - chat_id
+    def check():
+        nonlocal connected
+        now_connected = bool(client.is_connected())
+        if now_connected and not connected:
+            logger.info("🔌 Reconnexion à Telegram: rattrapage des canaux source")
+            for engine in registry:
+                engine.start_catch_up(client)
+        connected = now_connected
 
-        if chat_id == SOURCE_CHANNEL_ID:
-            message_text = event.message.message
-            
-            # Prédiction immédiate (n'attend pas la finalisation)
-            await process_prediction(message_text)
-            
-            # Vérification (attend la finalisation)
-            await process_verification(message_text)
+    scheduler.every('watch_connection', check, CATCHUP_POLL_INTERVAL)
 
-    except Exception as e:
-        logger.error(f"Erreur handle_message: {e}")
+# --- Reset et expiration ---
 
-@client.on(events.MessageEdited())
-async def handle_edited_message(event):
-    """Gère les messages édités dans le canal source."""
-    try:
-        chat = await event.get_chat()
-        chat_id = chat.id if hasattr(chat, 'id') else event.chat_id
+async def reset_all_data(engine=None):
+    """Efface les données stockées d'une table (de toutes les tables par défaut)."""
+    engines = [engine] if engine is not None else list(registry)
+    counts = [(engine.name, engine.reset()) for engine in engines]
+    count = sum(table_count for _, table_count in counts)
 
-        if chat_id > 0 and hasattr(chat, 'broadcast') and chat.broadcast:
-            chat_id = -1000000000000 - chat_id
+    if ADMIN_ID and ADMIN_ID != 0:
+        details = ""
+        if len(registry) > 1:
+            details = "\n" + "\n".join(f"• {name}: {table_count}" for name, table_count in counts)
+        outbox.send(ADMIN_ID, f"🔄 **Reset effectué**\n\n{count} prédictions effacées.{details}", PRIORITY_ADMIN)
+
+async def sweep_all():
+    """Expiration incrémentale: petit balayage de chaque table (tâche périodique)."""
+    for engine in registry:
+        try:
+            await engine.sweep()
+        except Exception as e:
+            logger.error("Erreur balayage d'expiration (%s): %s", engine.name, e)
 
-        if chat_id == SOURCE_CHANNEL_ID:
-            message_text = event.message.message
-            
-            # Vérification sur messages édités (attend la finalisation)
-            await process_verification(message_text)
+# --- Blocage /time ---
 
-    except Exception as e:
-        logger.error(f"Erreur handle_edited_message: {e}")
+def block_job(engine) -> str:
+    """Nom de la tâche qui lève le blocage /time d'une table."""
+    return f"unblock:{engine.name}"
 
-# --- Reset Automatique ---
+def unblock_predictions(table: str):
+    """Fin du blocage /time (tâche ponctuelle persistante)."""
+    engine = registry.get(table)
+    if engine is None or not engine.prediction_blocked:
+        return
+    engine.prediction_blocked = False
+    logger.warning("Blocage des prédictions /time levé automatiquement.", extra={'table': table})
 
-async def reset_all_data():
-    """Efface toutes les données stockées."""
-    global pending_predictions, processed_predictions, processed_verifications, current_game_number
-    
-    count = len(pending_predictions)
-    pending_predictions.clear()
-    processed_predictions.clear()
-    processed_verifications.clear()
-    current_game_number = 0
-    
-    logger.info(f"🔄 Reset effectué - {count} prédictions effacées")
-    
-    if ADMIN_ID and ADMIN_ID != 0:
-        try:
-            await client.send_message(ADMIN_ID, f"🔄 **Reset automatique effectué**\n\n{count} prédictions effacées.")
-        except:
-            pass
-
-async def schedule_periodic_reset():
-    """Reset automatique toutes les 2 heures."""
-    while True:
-        await asyncio.sleep(2 * 60 * 60)  # 2 heures
-        logger.info("⏰ Reset périodique (2h)...")
-        await reset_all_data()
-
-async def schedule_daily_reset():
-    """Reset quotidien à 00h59 WAT (UTC+1)."""
-    wat_tz = timezone(timedelta(hours=1))
-    
-    while True:
-        now = datetime.now(wat_tz)
-        reset_time = now.replace(hour=0, minute=59, second=0, microsecond=0)
-        
-        if now >= reset_time:
-            reset_time += timedelta(days=1)
-        
-        wait_seconds = (reset_time - now).total_seconds()
-        logger.info(f"⏰ Prochain reset quotidien dans {wait_seconds/3600:.1f} heures")
-        
-        await asyncio.sleep(wait_seconds)
-        
-        logger.info("🌙 Reset quotidien à 00h59 WAT...")
-        await reset_all_data()
-        
-        # Petite pause pour éviter les doubles déclenchements
-        await asyncio.sleep(60)
+scheduler.handler('unblock_predictions', unblock_predictions)
 
 # --- Commandes Administrateur ---
 
 def is_admin(sender_id):
     return ADMIN_ID and ADMIN_ID != 0 and sender_id == ADMIN_ID
 
-@client.on(events.NewMessage(pattern='/start'))
-async def cmd_start(event):
-    if event.is_group or event.is_channel:
-        return
-    await event.respond("🤖 **Bot de Prédiction Baccarat**\n\nCommandes: `/status`, `/help`, `/debug`, `/deploy`, `/reset`, `/a`, `/r`, `/time`, `/ec`")
+def reply(event, text: str):
+    """Répond à une commande via la file d'envoi (priorité admin)."""
+    return outbox.send(event.chat_id, text, PRIORITY_ADMIN)
 
-@client.on(events.NewMessage(pattern='/status'))
-async def cmd_status(event):
-    if event.is_group or event.is_channel:
-        return
-    if not is_admin(event.sender_id):
-        await event.respond("Commande réservée à l'administrateur")
-        return
+# Table des commandes: nom -> (gestionnaire, réservé à l'admin)
+COMMANDS = {}
 
-    status_msg = f"📊 **État des prédictions:**\n\n🎮 Jeu actuel: #{current_game_number}\n\n"
+def command(*names, admin: bool = False):
+    """Enregistre un gestionnaire de commande dans le routeur."""
+    def decorator(func):
+        for name in names:
+            COMMANDS[name] = (func, admin)
+        return func
+    return decorator
+
+def select_engine(arg: str):
+    """
+    Table visée par une commande: le premier mot de l'argument s'il nomme
+    une table, sinon la table par défaut. Retourne (moteur, reste de l'argument).
+    """
+    name, _, rest = arg.partition(' ')
+    engine = registry.get(name)
+    if engine is not None:
+        return engine, rest.strip()
+    return registry.default, arg
+
+@command('/start')
+async def cmd_start(event, arg):
+    reply(event, "🤖 **Bot de Prédiction Baccarat**\n\nCommandes: `/status`, `/help`, `/debug`, `/deploy`, `/reset`, `/a`, `/r`, `/time`, `/ec`, `/tables`")
+
+@command('/status', admin=True)
+async def cmd_status(event, arg):
+    engine, _ = select_engine(arg)
+    status_msg = f"📊 **État des prédictions ({engine.name}):**\n\n🎮 Jeu actuel: #{engine.current_game_number}\n\n"
     
-    if pending_predictions:
-        status_msg += f"**🔮 Actives ({len(pending_predictions)}):**\n"
-        for game_num, pred in sorted(pending_predictions.items()):
+    if engine.pending_predictions:
+        status_msg += f"**🔮 Actives ({len(engine.pending_predictions)}):**\n"
+        for game_num, pred in sorted(engine.pending_predictions.items()):
             display_suit = SUIT_DISPLAY.get(pred['suit'], pred['suit'])
             status_msg += f"• Jeu #{game_num}: {display_suit} - Statut: {pred['status']} (Base #{pred['base_game']}, R={pred['r_offset']}, Essai {pred['verification_attempt']})\n"
     else:
         status_msg += "**🔮 Aucune prédiction active**\n"
 
-    await event.respond(status_msg)
+    reply(event, status_msg)
 
-@client.on(events.NewMessage(pattern='/reset'))
-async def cmd_reset(event):
-    if event.is_group or event.is_channel:
+@command('/reset', admin=True)
+async def cmd_reset(event, arg):
+    # Sans argument: toutes les tables; `/reset [table]`: une seule
+    engine = registry.get(arg) if arg else None
+    if arg and engine is None:
+        reply(event, f"❌ Table inconnue: {arg}. Tables: {', '.join(registry.names())}")
         return
-    if not is_admin(event.sender_id):
-        await event.respond("Commande réservée à l'administrateur")
-        return
-    
-    await reset_all_data()
-    await event.respond("🔄 **Reset manuel effectué!**\n\nToutes les prédictions ont été effacées.")
+    await reset_all_data(engine)
+    reply(event, "🔄 **Reset manuel effectué!**\n\nToutes les prédictions ont été effacées.")
 
-@client.on(events.NewMessage(pattern='/debug'))
-async def cmd_debug(event):
-    if event.is_group or event.is_channel:
-        return
-    if not is_admin(event.sender_id):
-        await event.respond("Commande réservée à l'administrateur")
-        return
-    
-    emojis = ", ".join([f"{VERIFICATION_EMOJIS[i]}" for i in range(R_OFFSET + 1)])
+@command('/debug', admin=True)
+async def cmd_debug(event, arg):
+    engine, _ = select_engine(arg)
+    emojis = ", ".join([f"{VERIFICATION_EMOJIS[i]}" for i in range(engine.r_offset + 1)])
 
     # Statut /time
     time_status = "Inactif"
-    if prediction_block_until and prediction_block_until > datetime.now():
-        remaining_seconds = (prediction_block_until - datetime.now()).total_seconds()
-        time_status = f"Bloqué ({remaining_seconds:.1f}s restantes)"
+    block = scheduler.get(block_job(engine))
+    if engine.prediction_blocked and block is not None:
+        time_status = f"Bloqué ({block.remaining():.1f}s restantes)"
     
     # Statut /ec
     ec_status = "Inactif"
     ec_info = ""
-    if ec_active and ec_gaps:
-        gaps_str_display = ", ".join(map(str, ec_gaps))
-        current_gap = ec_gaps[ec_gap_index] if ec_gaps else 'N/A'
+    if engine.ec_active and engine.ec_gaps:
+        gaps_str_display = ", ".join(map(str, engine.ec_gaps))
+        current_gap = engine.ec_gaps[engine.ec_gap_index] if engine.ec_gaps else 'N/A'
         
         ec_status = f"ACTIF (Écarts: {gaps_str_display})"
         
-        if ec_last_source_game == 0:
+        if engine.ec_last_source_game == 0:
              ec_next_anchor = "En attente de P1..."
-        elif not ec_first_trigger_done:
-            ec_next_anchor = f"Prochaine ancre pour P2: #{ec_last_source_game} + Gap {current_gap} = #{ec_last_source_game + current_gap}"
+        elif not engine.ec_first_trigger_done:
+            ec_next_anchor = f"Prochaine ancre pour P2: #{engine.ec_last_source_game} + Gap {current_gap} = #{engine.ec_last_source_game + current_gap}"
         else:
-             ec_next_anchor = f"Prochaine ancre: #{ec_last_source_game} + Gap {current_gap} = #{ec_last_source_game + current_gap}"
+             ec_next_anchor = f"Prochaine ancre: #{engine.ec_last_source_game} + Gap {current_gap} = #{engine.ec_last_source_game + current_gap}"
 
 
-        ec_info = f"• Ancre Source Précédente: #{ec_last_source_game}\n• Écart/Index Actuel: {current_gap}/{ec_gap_index}\n• {ec_next_anchor}"
+        ec_info = f"• Ancre Source Précédente: #{engine.ec_last_source_game}\n• Écart/Index Actuel: {current_gap}/{engine.ec_gap_index}\n• {ec_next_anchor}"
 
 
+    pipeline_stats = engine.pipeline.stats()
+    jobs_report = "\n".join(f"• {job.name}: {job.describe()}, dans {job.remaining():.0f}s" for job in scheduler) or "• Aucune"
+
     debug_msg = f"""🔍 **Informations de débogage:**
 
 **Configuration:**
-• Source Channel: {SOURCE_CHANNEL_ID}
-• Prediction Channel: {PREDICTION_CHANNEL_ID}
+• Table: {engine.name} ({len(registry)} servie(s): {', '.join(registry.names())})
+• Source Channel: {engine.source_channel_id}
+• Prediction Channels: {', '.join(map(str, engine.prediction_channel_ids))}
 • Admin ID: {ADMIN_ID}
 
 **Accès aux canaux:**
-• Canal source: {'✅ OK' if source_channel_ok else '❌ Non accessible'}
-• Canal prédiction: {'✅ OK' if prediction_channel_ok else '❌ Non accessible'}
+• Canal source: {'✅ OK' if engine.source_channel_ok else '❌ Non accessible'}
+• Canaux prédiction: {len(engine.reachable_destinations)}/{len(engine.prediction_channel_ids)} accessibles
 
 **Offsets (Persistants):**
-• A_OFFSET (/a): N + {A_OFFSET} (Utilisé par défaut ou si /ec actif)
-• R_OFFSET (/r): {R_OFFSET}
+• A_OFFSET (/a): N + {engine.a_offset} (Utilisé par défaut ou si /ec actif)
+• R_OFFSET (/r): {engine.r_offset}
 
 **Modes Spéciaux:**
 • Blocage /time: {time_status} (Ignoré si /ec actif)
@@ -687,17 +368,30 @@ async def cmd_debug(event):
 {ec_info}
 
 **État:**
-• Jeu actuel: #{current_game_number}
-• Prédictions actives: {len(pending_predictions)}
+• Jeu actuel: #{engine.current_game_number}
+• Prédictions actives: {len(engine.pending_predictions)}
+• Magasin d'état: {'✅ OK' if engine.state_store.error is None else '❌ ' + engine.state_store.error}
+
+**Pipeline:**
+• Profondeur: {pipeline_stats['depth']} (reçus {pipeline_stats['received']}, traités {pipeline_stats['processed']})
+• Attente: dernière {pipeline_stats['last_wait']*1000:.1f}ms, moyenne {pipeline_stats['avg_wait']*1000:.1f}ms, max {pipeline_stats['max_wait']*1000:.1f}ms
+• Abandonnés: {pipeline_stats['dropped']} - Jeux périmés: {pipeline_stats['stale']}
+• File d'envoi: {outbox.backlog} en attente
+
+**Boucle asyncio:**
+• Retard: dernier {loop_monitor.last_lag*1000:.1f}ms, max récent {loop_monitor.recent_max_lag()*1000:.1f}ms, max {loop_monitor.max_lag*1000:.1f}ms
+• Silence des canaux source: {loop_monitor.source_silence():.0f}s
+• Blocages récents:
+{loop_monitor.slow_report()}
+
+**Tâches planifiées:**
+{jobs_report}
 """
-    await event.respond(debug_msg)
-
-@client.on(events.NewMessage(pattern='/help'))
-async def cmd_help(event):
-    if event.is_group or event.is_channel:
-        return
+    reply(event, debug_msg)
 
-    await event.respond("""📖 **Aide - Bot de Prédiction Baccarat**
+@command('/help')
+async def cmd_help(event, arg):
+    reply(event, """📖 **Aide - Bot de Prédiction Baccarat**
 
 **Règles de prédiction (Mise à jour):**
 La transformation dépend **UNIQUEMENT** de la parité du jeu (N) et applique un mapping simple (♠️<->♣️, ❤️<->♦️ si N est pair, ou ♠️<->❤️, ♦️<->♣️ si N est impair). La prédiction est TOUJOURS pour le jeu **N + A_OFFSET** (où N est le jeu source).
@@ -706,6 +400,8 @@ La transformation dépend **UNIQUEMENT** de la parité du jeu (N) et applique un
 Vérifie si le costume prédit est dans le PREMIER groupe pour les jeux **N+0 à N+R_OFFSET**.
 
 **Commandes Administrateur:**
+Avec plusieurs tables, les commandes de table acceptent son nom en premier argument (ex: `/a vip 3`, `/status vip`); sans nom, la table par défaut est utilisée.
+• `/tables` - Tables servies (canaux, jeu actuel, prédictions actives)
 • `/a [valeur]` - Offset de prédiction standard (défaut: 1)
 • `/r [valeur]` - Nombre d'essais de vérification (0 à 10, défaut: 0)
 • `/time [secondes]` - **BLOQUE** temporairement l'envoi de nouvelles prédictions (mode standard uniquement). (`/time 0` pour débloquer).
@@ -713,138 +409,168 @@ Vérifie si le costume prédit est dans le PREMIER groupe pour les jeux **N+0 à
 • `/status` - Voir les prédictions actives
 • `/debug` - Informations système
 • `/reset` - Reset manuel des prédictions
+• `/trace [jeu]` - Chronologie du traitement d'un jeu récent
+• `/log [level|format|limit ...]` - Journalisation (niveau, json/text, limite d'une catégorie)
+• `/history [jeu]` - Historique enregistré (statistiques ou cartes d'un jeu du jour)
 • `/deploy` - Télécharger le bot pour Render.com
 """)
 
-@client.on(events.NewMessage(pattern='/a(?: (\d+))?'))
-async def cmd_a_offset(event):
-    if event.is_group or event.is_channel:
+@command('/history', '/historique', admin=True)
+async def cmd_history(event, arg):
+    engine, arg = select_engine(arg)
+    await engine.history.flush()
+    if not os.path.exists(engine.history.path):
+        reply(event, "📚 Historique vide.")
+        return
+    reader = HistoryReader(engine.history.path)
+    try:
+        if not arg:
+            reply(event, f"📚 **Historique:** {len(reader)} enregistrements sur {len(reader.days())} jour(s) ({engine.history.path})")
+            return
+        if not arg.isdigit():
+            reply(event, "❌ Usage: `/history [numéro de jeu]`")
+            return
+        indexes = reader.find(int(arg))
+        if not indexes:
+            reply(event, f"📚 Jeu #{arg} absent de l'historique du jour.")
+            return
+        lines = [f"📚 **Jeu #{arg}:**"]
+        for index in indexes:
+            record = reader.record(index)
+            moment = datetime.fromtimestamp(record.timestamp, tz=timezone.utc).strftime('%H:%M:%S')
+            first = ' '.join(value + suit for value, suit in record.first_group)
+            second = ' '.join(value + suit for value, suit in record.second_group)
+            lines.append(f"• {moment} UTC {'✅ finalisé' if record.finalized else '⏳ en cours'}: ({first}) - ({second})")
+        reply(event, "\n".join(lines))
+    finally:
+        reader.close()
+
+@command('/trace', admin=True)
+async def cmd_trace(event, arg):
+    engine, arg = select_engine(arg)
+    if not arg.isdigit():
+        reply(event, "❌ Usage: `/trace [numéro de jeu]`")
         return
-    if not is_admin(event.sender_id):
-        await event.respond("Commande réservée à l'administrateur")
+    trace = engine.tracer.find(int(arg))
+    if trace is None:
+        reply(event, f"🧭 Aucune trace récente pour le jeu #{arg}.")
         return
-    
-    global A_OFFSET
-    match = re.match(r'/a (\d+)', event.message.message)
-    
-    if match:
-        new_a = int(match.group(1))
-        A_OFFSET = new_a
-        save_config()
-        await event.respond(f"✅ **Offset de prédiction (/a)** mis à jour.\n\nLa prédiction sera lancée pour le jeu **N + {A_OFFSET}**.")
+    reply(event, f"```\n{trace.timeline()}\n```")
+
+@command('/log', admin=True)
+async def cmd_log(event, arg):
+    parts = arg.split()
+    try:
+        if len(parts) == 2 and parts[0] == 'level':
+            log_setup.set_level(parts[1])
+        elif len(parts) == 2 and parts[0] == 'format':
+            log_setup.set_format(parts[1])
+        elif len(parts) == 3 and parts[0] == 'limit':
+            log_setup.set_interval(parts[1], float(parts[2]))
+        elif parts:
+            reply(event, "❌ Usage: `/log`, `/log level [debug|info|warning]`, `/log format [json|text]`, `/log limit [catégorie] [secondes]`")
+            return
+    except ValueError as e:
+        reply(event, f"❌ {e}")
+        return
+    reply(event, f"📝 **Journalisation**\n{log_setup.status()}")
+
+@command('/a', admin=True)
+async def cmd_a_offset(event, arg):
+    engine, arg = select_engine(arg)
+    if arg.isdigit():
+        new_a = int(arg)
+        engine.a_offset = new_a
+        engine.save_config()
+        reply(event, f"✅ **Offset de prédiction (/a)** mis à jour.\n\nLa prédiction sera lancée pour le jeu **N + {engine.a_offset}**.")
     else:
-        await event.respond(f"ℹ️ **Offset de prédiction actuel (/a): N + {A_OFFSET}**\n\nUtilisation: `/a [valeur]` (ex: `/a 3`)")
+        reply(event, f"ℹ️ **Offset de prédiction actuel (/a): N + {engine.a_offset}**\n\nUtilisation: `/a [valeur]` (ex: `/a 3`)")
 
 
-@client.on(events.NewMessage(pattern='/r(?: (\d+))?'))
-async def cmd_r_offset(event):
-    if event.is_group or event.is_channel:
-        return
-    if not is_admin(event.sender_id):
-        await event.respond("Commande réservée à l'administrateur")
-        return
-    
-    global R_OFFSET
-    match = re.match(r'/r (\d+)', event.message.message)
-    
-    if match:
-        new_r = int(match.group(1))
-        if 0 <= new_r <= 10:
-            R_OFFSET = new_r
-            save_config()
+@command('/r', admin=True)
+async def cmd_r_offset(event, arg):
+    engine, arg = select_engine(arg)
+    if arg.isdigit():
+        new_r = int(arg)
+        if 0 <= new_r <= R_OFFSET_MAX:
+            engine.r_offset = new_r
+            engine.save_config()
             emojis = ", ".join([f"{VERIFICATION_EMOJIS[i]}" for i in range(new_r + 1)])
-            await event.respond(f"""✅ **Offset de vérification (/r)** mis à jour: **{R_OFFSET}** essais supplémentaires.
-La vérification se fera de N+0 à N+{R_OFFSET}.
+            reply(event, f"""✅ **Offset de vérification (/r)** mis à jour: **{engine.r_offset}** essais supplémentaires.
+La vérification se fera de N+0 à N+{engine.r_offset}.
 \n**Émojis de succès:** {emojis}""")
         else:
-            await event.respond("❌ La valeur de /r doit être comprise entre **0** et **10**.")
+            reply(event, f"❌ La valeur de /r doit être comprise entre **0** et **{R_OFFSET_MAX}**.")
     else:
-        emojis = ", ".join([f"{VERIFICATION_EMOJIS[i]}" for i in range(R_OFFSET + 1)])
-        await event.respond(f"""ℹ️ **Offset de vérification actuel (/r): {R_OFFSET}**
-La vérification se fait sur **{R_OFFSET + 1}** jeux (N+0 à N+{R_OFFSET}).
+        emojis = ", ".join([f"{VERIFICATION_EMOJIS[i]}" for i in range(engine.r_offset + 1)])
+        reply(event, f"""ℹ️ **Offset de vérification actuel (/r): {engine.r_offset}**
+La vérification se fait sur **{engine.r_offset + 1}** jeux (N+0 à N+{engine.r_offset}).
 \n**Émojis de succès:** {emojis}
 \nUtilisation: `/r [valeur]` (ex: `/r 2`)""")
         
-@client.on(events.NewMessage(pattern='/time(?: (\d+))?'))
-async def cmd_time(event):
+@command('/time', admin=True)
+async def cmd_time(event, arg):
     """
     Bloque la génération de nouvelles prédictions pendant une durée spécifiée.
     """
-    if event.is_group or event.is_channel:
-        return
-    if not is_admin(event.sender_id):
-        await event.respond("Commande réservée à l'administrateur")
-        return
-    
-    global prediction_block_until, ec_active
+    engine, arg = select_engine(arg)
     
-    match = re.match(r'/time (\d+)', event.message.message)
-    current_time = datetime.now()
-    wat_tz = timezone(timedelta(hours=1)) # Pour l'affichage à l'utilisateur
-
-    if ec_active:
-        await event.respond("❌ **Le mode `/ec` est actif et a la priorité.** Le blocage `/time` est ignoré.")
+    if engine.ec_active:
+        reply(event, "❌ **Le mode `/ec` est actif et a la priorité.** Le blocage `/time` est ignoré.")
         return
 
-    if match:
-        duration_seconds = int(match.group(1))
+    if arg.isdigit():
+        duration_seconds = int(arg)
         
         if duration_seconds == 0:
-            prediction_block_until = None
-            await event.respond("✅ **Blocage des prédictions levé.**\n\nLe bot reprendra les prédictions au prochain jeu.")
+            scheduler.cancel(block_job(engine))
+            engine.prediction_blocked = False
+            reply(event, "✅ **Blocage des prédictions levé.**\n\nLe bot reprendra les prédictions au prochain jeu.")
             logger.warning("Blocage des prédictions levé manuellement.")
             return
 
         if duration_seconds > 7200: # Limite à 2 heures (7200 secondes)
-            await event.respond("❌ La durée maximale autorisée pour le blocage est de 7200 secondes (2 heures).")
+            reply(event, "❌ La durée maximale autorisée pour le blocage est de 7200 secondes (2 heures).")
             return
 
-        block_end_time = current_time + timedelta(seconds=duration_seconds)
-        prediction_block_until = block_end_time
+        # Levée du blocage planifiée (remplace un blocage en cours, survit à un redémarrage)
+        block = scheduler.once(block_job(engine), 'unblock_predictions', duration_seconds, args=(engine.name,), persist=True)
+        engine.prediction_blocked = True
         
-        end_time_wat = block_end_time.astimezone(wat_tz).strftime("%H:%M:%S WAT")
+        end_time_wat = block.due_at().strftime("%H:%M:%S WAT")
         
-        await event.respond(f"⛔ **Blocage des prédictions activé.**\n\nDurée: **{duration_seconds} secondes** ({duration_seconds/60:.2f} minutes).\nReprise des prédictions à **{end_time_wat}**.")
-        logger.warning(f"Prédictions bloquées pendant {duration_seconds} secondes. Reprise à {prediction_block_until.isoformat()}")
+        reply(event, f"⛔ **Blocage des prédictions activé.**\n\nDurée: **{duration_seconds} secondes** ({duration_seconds/60:.2f} minutes).\nReprise des prédictions à **{end_time_wat}**.")
+        logger.warning("Prédictions bloquées pendant %d secondes. Reprise à %s", duration_seconds, block.due_at().isoformat())
         
     else:
         # Vérifier le statut actuel si aucun argument n'est fourni
-        if prediction_block_until and prediction_block_until > current_time:
-            remaining_seconds = (prediction_block_until - current_time).total_seconds()
-            end_time_wat = prediction_block_until.astimezone(wat_tz).strftime("%H:%M:%S WAT")
+        block = scheduler.get(block_job(engine))
+        if engine.prediction_blocked and block is not None:
+            end_time_wat = block.due_at().strftime("%H:%M:%S WAT")
             
-            await event.respond(f"ℹ️ **Statut actuel: BLOQUÉ**\n\nFin du blocage à **{end_time_wat}** (Reste {remaining_seconds:.1f} secondes).\n\nPour débloquer: `/time 0`. Pour bloquer: `/time [secondes]`.")
+            reply(event, f"ℹ️ **Statut actuel: BLOQUÉ**\n\nFin du blocage à **{end_time_wat}** (Reste {block.remaining():.1f} secondes).\n\nPour débloquer: `/time 0`. Pour bloquer: `/time [secondes]`.")
         else:
-            prediction_block_until = None
-            await event.respond("ℹ️ **Statut actuel: ACTIF**\n\nUtilisation: `/time [secondes]` (ex: `/time 120` pour bloquer 2 minutes). Utilisez `/time 0` pour débloquer immédiatement.")
+            reply(event, "ℹ️ **Statut actuel: ACTIF**\n\nUtilisation: `/time [secondes]` (ex: `/time 120` pour bloquer 2 minutes). Utilisez `/time 0` pour débloquer immédiatement.")
 
-@client.on(events.NewMessage(pattern='/ec(?: (.+))?'))
-async def cmd_ec(event):
+@command('/ec', admin=True)
+async def cmd_ec(event, arg):
     """
     Active le mode Écart Personnalisé (ec) et désactive le blocage /time.
     """
-    if event.is_group or event.is_channel:
-        return
-    if not is_admin(event.sender_id):
-        await event.respond("Commande réservée à l'administrateur")
-        return
-    
-    global ec_active, ec_gaps, ec_gap_index, ec_last_source_game, ec_first_trigger_done, prediction_block_until, current_game_number
-    
-    match = re.match(r'/ec (.+)', event.message.message)
+    engine, arg = select_engine(arg)
     
-    if match:
-        gap_str = match.group(1).strip()
+    if arg:
+        gap_str = arg
         
         # Commande /ec 0 ou /ec OFF pour désactiver
         if gap_str.upper() in ['0', 'OFF', 'STOP']:
-            ec_active = False
-            ec_gaps = []
-            ec_gap_index = 0
-            ec_last_source_game = 0
-            ec_first_trigger_done = False
-            save_config()
-            await event.respond("✅ **Mode Écart Personnalisé (/ec) désactivé.**\n\nLe bot revient à l'offset de prédiction standard (`/a`).")
+            engine.ec_active = False
+            engine.ec_gaps = []
+            engine.ec_gap_index = 0
+            engine.ec_last_source_game = 0
+            engine.ec_first_trigger_done = False
+            engine.save_config()
+            reply(event, "✅ **Mode Écart Personnalisé (/ec) désactivé.**\n\nLe bot revient à l'offset de prédiction standard (`/a`).")
             return
 
         # Parse les écarts (doivent être des entiers positifs)
@@ -853,84 +579,79 @@ async def cmd_ec(event):
             if not gaps or any(g <= 0 for g in gaps):
                 raise ValueError("Les écarts doivent être des entiers positifs (séparés par des virgules).")
         except ValueError as e:
-            await event.respond(f"❌ Erreur de format: {e}. Format attendu: `/ec 3,4,5` (entiers positifs).")
+            reply(event, f"❌ Erreur de format: {e}. Format attendu: `/ec 3,4,5` (entiers positifs).")
             return
 
-        ec_active = True
-        ec_gaps = gaps
-        ec_gap_index = 0
-        ec_last_source_game = 0 # Reset l'ancre pour forcer le P1 initial
-        ec_first_trigger_done = False # Doit lancer P1 d'abord
+        engine.ec_active = True
+        engine.ec_gaps = gaps
+        engine.ec_gap_index = 0
+        engine.ec_last_source_game = 0 # Reset l'ancre pour forcer le P1 initial
+        engine.ec_first_trigger_done = False # Doit lancer P1 d'abord
         
         # Le blocage /time n'est pas nécessaire, car la logique /ec l'ignore, mais on le clear pour la clarté.
-        if prediction_block_until:
-            prediction_block_until = None
-            await event.respond("⚠️ Le blocage `/time` a été levé automatiquement (priorité à `/ec`).")
+        if engine.prediction_blocked:
+            scheduler.cancel(block_job(engine))
+            engine.prediction_blocked = False
+            reply(event, "⚠️ Le blocage `/time` a été levé automatiquement (priorité à `/ec`).")
 
-        save_config()
+        engine.save_config()
         
-        gaps_str_display = ", ".join(map(str, ec_gaps))
-        await event.respond(f"""✅ **Mode Écart Personnalisé (/ec) activé!**
-\n**Écarts définis ({len(ec_gaps)}):** {gaps_str_display}
-\n**Prochaine prédiction (P1):** Se déclenchera sur le prochain jeu source reçu (N) et prédira pour **N + A_OFFSET** (`/a {A_OFFSET}`).
+        gaps_str_display = ", ".join(map(str, engine.ec_gaps))
+        reply(event, f"""✅ **Mode Écart Personnalisé (/ec) activé!**
+\n**Écarts définis ({len(engine.ec_gaps)}):** {gaps_str_display}
+\n**Prochaine prédiction (P1):** Se déclenchera sur le prochain jeu source reçu (N) et prédira pour **N + A_OFFSET** (`/a {engine.a_offset}`).
 \n**P2 et suivants:** Se déclencheront lorsque le numéro source sera le **dernier N + le prochain écart** (Ex: 100 + {gaps[0]}).
 \nPour désactiver: `/ec 0` ou `/ec off`""")
 
     else:
         # Afficher le statut actuel
-        if ec_active and ec_gaps:
-            gaps_str_display = ", ".join(map(str, ec_gaps))
-            current_gap = ec_gaps[ec_gap_index] if ec_gaps else 'N/A'
+        if engine.ec_active and engine.ec_gaps:
+            gaps_str_display = ", ".join(map(str, engine.ec_gaps))
+            current_gap = engine.ec_gaps[engine.ec_gap_index] if engine.ec_gaps else 'N/A'
             
             status_msg = f"ℹ️ **Mode Écart Personnalisé (/ec) ACTIF**\n"
             status_msg += f"**Écarts définis:** {gaps_str_display}\n"
 
-            if not ec_first_trigger_done:
+            if not engine.ec_first_trigger_done:
                 status_msg += "**Statut:** En attente de la première prédiction (P1) sur le prochain jeu source (N)."
             else:
-                next_required = ec_last_source_game + current_gap
-                status_msg += f"**Prochain écart utilisé:** {current_gap} (Index {ec_gap_index} / {len(ec_gaps)})\n"
-                status_msg += f"**Ancre du dernier N prédit:** #{ec_last_source_game}\n"
+                next_required = engine.ec_last_source_game + current_gap
+                status_msg += f"**Prochain écart utilisé:** {current_gap} (Index {engine.ec_gap_index} / {len(engine.ec_gaps)})\n"
+                status_msg += f"**Ancre du dernier N prédit:** #{engine.ec_last_source_game}\n"
                 status_msg += f"**Jeu source minimum requis pour la prochaine prédiction:** **#{next_required}**"
             
             status_msg += "\n\nUtilisation: `/ec 3,4,5` ou `/ec 0` pour désactiver."
         else:
             status_msg = "ℹ️ **Mode Écart Personnalisé (/ec) INACTIF**\n\nUtilisation: `/ec 3,4,5` pour définir la séquence d'écarts. Le bot se base sur le dernier numéro source (N) pour calculer le numéro source minimum pour la prédiction suivante (N + écart)."
             
-        await event.respond(status_msg)
-
-@client.on(events.NewMessage(pattern='/transfert|/activetransfert'))
-async def cmd_active_transfert(event):
-    if event.is_group or event.is_channel:
-        return
-    if not is_admin(event.sender_id):
-        await event.respond("Commande réservée à l'administrateur")
-        return
+        reply(event, status_msg)
+
+@command('/tables', admin=True)
+async def cmd_tables(event, arg):
+    lines = [f"🎰 **Tables servies ({len(registry)}):**"]
+    for engine in registry:
+        default = " (défaut)" if engine is registry.default else ""
+        lines.append(f"• **{engine.name}**{default}: source {engine.source_channel_id} -> prédiction {', '.join(map(str, engine.prediction_channel_ids))}, "
+                     f"jeu #{engine.current_game_number}, {len(engine.pending_predictions)} active(s), A={engine.a_offset} R={engine.r_offset}"
+                     f"{', /ec' if engine.ec_active else ''}")
+    reply(event, "\n".join(lines))
+
+@command('/transfert', '/activetransfert', admin=True)
+async def cmd_active_transfert(event, arg):
     global transfer_enabled
     transfer_enabled = True
-    await event.respond("✅ Transfert des messages activé!")
+    reply(event, "✅ Transfert des messages activé!")
 
-@client.on(events.NewMessage(pattern='/stoptransfert'))
-async def cmd_stop_transfert(event):
-    if event.is_group or event.is_channel:
-        return
-    if not is_admin(event.sender_id):
-        await event.respond("Commande réservée à l'administrateur")
-        return
+@command('/stoptransfert', admin=True)
+async def cmd_stop_transfert(event, arg):
     global transfer_enabled
     transfer_enabled = False
-    await event.respond("⛔ Transfert des messages désactivé.")
+    reply(event, "⛔ Transfert des messages désactivé.")
 
-@client.on(events.NewMessage(pattern='/deploy'))
-async def cmd_deploy(event):
+@command('/deploy', admin=True)
+async def cmd_deploy(event, arg):
     """Génère un fichier ZIP deployable sur Render.com"""
-    if event.is_group or event.is_channel:
-        return
-    if not is_admin(event.sender_id):
-        await event.respond("Commande réservée à l'administrateur")
-        return
-
-    await event.respond("📦 Préparation du fichier de déploiement...")
+    reply(event, "📦 Préparation du fichier de déploiement...")
 
     try:
         deploy_dir = '/tmp/deploy_package'
@@ -938,68 +659,12 @@ async def cmd_deploy(event):
             shutil.rmtree(deploy_dir)
         os.makedirs(deploy_dir)
 
-        # Création de config.py
-        config_content = '''"""
-Configuration du bot Telegram de prédiction Baccarat
-"""
-import os
-import json
-
-def parse_channel_id(env_var: str, default: str) -> int:
-    value = os.getenv(env_var) or default
-    if value.startswith('-100'):
-        return int(value)
-    try:
-        channel_id = int(value)
-        if channel_id > 0 and len(str(channel_id)) >= 10:
-            return int(f"-100{channel_id}") 
-        return channel_id
-    except ValueError:
-        return 0
-
-SOURCE_CHANNEL_ID = parse_channel_id('SOURCE_CHANNEL_ID', '-1002682552255')
-PREDICTION_CHANNEL_ID = parse_channel_id('PREDICTION_CHANNEL_ID', '-1003343276131')
-ADMIN_ID = int(os.getenv('ADMIN_ID') or '0')
-API_ID = int(os.getenv('API_ID') or '0')
-API_HASH = os.getenv('API_HASH') or ''
-BOT_TOKEN = os.getenv('BOT_TOKEN') or ''
-PORT = int(os.getenv('PORT') or '10000')
-
-# Mappings simplifiés pour le code qui utilise la logique complexe
-# Ces mappings ne sont plus utilisés dans get_predicted_suit, mais peuvent l'être ailleurs ou pour la compatibilité
-SUIT_MAPPING_EVEN = {'♠': '♣', '♣': '♠', '♦': '♥', '♥': '♦'}
-SUIT_MAPPING_ODD = {'♠': '♥', '♣': '♦', '♦': '♣', '♥': '♠'}
-ALL_SUITS = ['♥', '♠', '♦', '♣']
-SUIT_DISPLAY = {'♠': '♠️', '♥': '❤️', '♦': '♦️', '♣': '♣️'}
-SUIT_NORMALIZE = {'❤️': '♥', '❤': '♥', '♥️': '♥', '♠️': '♠', '♦️': '♦', '♣️': '♣'}
-
-# --- NOUVELLES CONFIGURATIONS ---
-
-A_OFFSET_DEFAULT = 1
-R_OFFSET_DEFAULT = 0
-
-VERIFICATION_EMOJIS = {
-    0: "✅0️⃣",
-    1: "✅1️⃣",
-    2: "✅2️⃣",
-    3: "✅3️⃣",
-    4: "✅4️⃣",
-    5: "✅5️⃣",
-    6: "✅6️⃣",
-    7: "✅7️⃣",
-    8: "✅8️⃣",
-    9: "✅9️⃣",
-    10: "✅🔟"
-}
-'''
-        with open(os.path.join(deploy_dir, 'config.py'), 'w', encoding='utf-8') as f:
-            f.write(config_content)
-
-        # Copie de main.py
-        with open('main.py', 'r', encoding='utf-8') as f:
-            main_content = f.read()
-        with open(os.path.join(deploy_dir, 'main.py'), 'w', encoding='utf-8') as f:
-            f.write(main_content)
+        # Copie de main.py, de config.py et des modules du bot
+        for module_file in DEPLOY_MODULES:
+            with open(module_file, 'r', encoding='utf-8') as f:
+                module_content = f.read()
+            with open(os.path.join(deploy_dir, module_file), 'w', encoding='utf-8') as f:
+                f.write(module_content)
 
         # Création de requirements.txt
         requirements_content = '''telethon==1.35.0
@@ -1066,9 +731,9 @@ openpyxl==3.1.2
 - Les prédictions suivantes (P2, P3...) se font seulement lorsque le numéro source atteint **[Ancre N précédente + Écart actuel]**.
 - La prédiction cible reste toujours **N_source + A_OFFSET**.
 
-**Reset automatique:**
-- Toutes les 2 heures
-- Quotidien à 00h59 WAT
+**Expiration:**
+- Prédiction sans vérification après 1 heure: statut ❌
+- Pas de reset global (`/reset` reste disponible)
 '''
         with open(os.path.join(deploy_dir, 'README.md'), 'w', encoding='utf-8') as f:
             f.write(readme_content)
@@ -1097,11 +762,18 @@ openpyxl==3.1.2
                     arcname = os.path.relpath(file_path, deploy_dir)
                     zipf.write(file_path, arcname)
 
-        await client.send_file(
-            event.chat_id,
-            zip_path,
-            caption=f"📦 **ren.zip**\n\nFichier prêt pour déploiement sur Render.com (port 10000)\n\n**Mise à jour majeure:**\n• **Réintégration de la règle de prédiction complexe** (Parité Jeu + Parité Carte).\n• **Format du message de succès simplifié** (`📲Game:N:S statut :✅0️⃣`).\n• Réintégration des commandes `/time` et `/ec` avec persistance et logique de rotation."
-        )
+        started = time_module.perf_counter()
+        try:
+            await client.send_file(
+                event.chat_id,
+                zip_path,
+                caption=f"📦 **ren.zip**\n\nFichier prêt pour déploiement sur Render.com (port 10000)\n\n**Mise à jour majeure:**\n• **Réintégration de la règle de prédiction complexe** (Parité Jeu + Parité Carte).\n• **Format du message de succès simplifié** (`📲Game:N:S statut :✅0️⃣`).\n• Réintégration des commandes `/time` et `/ec` avec persistance et logique de rotation."
+            )
+        except Exception:
+            TELEGRAM_ERRORS.labels('send_file', 'other').inc()
+            raise
+        finally:
+            TELEGRAM_CALL_SECONDS.labels('send_file').observe(time_module.perf_counter() - started)
 
         shutil.rmtree(deploy_dir)
         os.remove(zip_path)
@@ -1109,21 +781,24 @@ openpyxl==3.1.2
         logger.info("✅ Fichier ren.zip envoyé")
 
     except Exception as e:
-        logger.error(f"Erreur création deploy: {e}")
-        await event.respond(f"❌ Erreur: {e}")
+        logger.error("Erreur création deploy: %s", e)
+        reply(event, f"❌ Erreur: {e}")
 
 # --- Serveur Web ---
 
 async def index(request):
+    tables = "\n".join(
+        f"<p><strong>{engine.name}:</strong> jeu actuel #{engine.current_game_number}, "
+        f"{len(engine.pending_predictions)} prédiction(s) active(s), A={engine.a_offset}, R={engine.r_offset}</p>"
+        for engine in registry
+    )
     html = f"""<!DOCTYPE html>
 <html>
 <head><title>Bot Prédiction Baccarat</title></head>
 <body>
 <h1>🎯 Bot de Prédiction Baccarat</h1>
 <p>Le bot est en ligne et surveille les canaux.</p>
-<p><strong>Jeu actuel:</strong> #{current_game_number}</p>
-<p><strong>Prédictions actives:</strong> {len(pending_predictions)}</p>
-<p><strong>Config:</strong> A={A_OFFSET}, R={R_OFFSET}</p>
+{tables}
 </body>
 </html>"""
     return web.Response(text=html, content_type='text/html', status=200)
@@ -1131,65 +806,83 @@ async def index(request):
 async def health_check(request):
     return web.Response(text="OK", status=200)
 
+async def ready_check(request):
+    # Disponibilité réelle: boucle réactive, Telegram connecté, source active, file d'envoi raisonnable
+    ready, checks = loop_monitor.readiness()
+    return web.json_response({'ready': ready, 'checks': checks}, status=200 if ready else 503)
+
+async def metrics_endpoint(request):
+    # Texte construit uniquement au scrape
+    return web.Response(body=REGISTRY.render().encode('utf-8'),
+                        headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
 async def start_web_server():
     app = web.Application()
     app.router.add_get('/', index)
     app.router.add_get('/health', health_check)
+    app.router.add_get('/metrics', metrics_endpoint)
+    app.router.add_get('/ready', ready_check)
     runner = web.AppRunner(app)
     await runner.setup()
     site = web.TCPSite(runner, '0.0.0.0', PORT)
     await site.start()
-    logger.info(f"🌐 Serveur web démarré sur le port {PORT}")
+    logger.info("🌐 Serveur web démarré sur le port %s", PORT)
 
 # --- Démarrage Principal ---
 
 async def verify_channels():
-    """Vérifie l'accès aux canaux."""
-    global source_channel_ok, prediction_channel_ok
-
+    """Vérifie l'accès aux canaux de toutes les tables."""
     try:
-        if SOURCE_CHANNEL_ID and SOURCE_CHANNEL_ID != 0:
-            try:
-                entity = await client.get_entity(SOURCE_CHANNEL_ID)
-                source_channel_ok = True
-                logger.info(f"✅ Accès au canal source: {getattr(entity, 'title', SOURCE_CHANNEL_ID)}")
-            except Exception as e:
-                logger.error(f"❌ Impossible d'accéder au canal source: {e}")
-
-        if PREDICTION_CHANNEL_ID and PREDICTION_CHANNEL_ID != 0:
-            try:
-                entity = await client.get_entity(PREDICTION_CHANNEL_ID)
-                prediction_channel_ok = True
-                logger.info(f"✅ Accès au canal de prédiction: {getattr(entity, 'title', PREDICTION_CHANNEL_ID)}")
-            except Exception as e:
-                logger.error(f"❌ Impossible d'accéder au canal de prédiction: {e}")
-
+        for engine in registry:
+            await engine.verify_channels(client)
     except Exception as e:
-        logger.error(f"Erreur vérification canaux: {e}")
+        logger.error("Erreur vérification canaux: %s", e)
 
 async def main():
     """Fonction principale."""
     try:
-        load_config() # Chargement de la config A, R et EC au démarrage
-        
+        for engine in registry:
+            engine.load_config() # Chargement de la config A, R et EC au démarrage
+            engine.restore_state() # Prédictions en attente et jeu actuel (reprise de la vérification)
+            engine.pipeline.pause() # Messages en direct mis en file jusqu'à la fin du rattrapage
+
+        # Tâches planifiées persistées (blocages /time en cours avant l'arrêt)
+        scheduler.load()
+        for engine in registry:
+            engine.prediction_blocked = block_job(engine) in scheduler
+
         await client.start(bot_token=BOT_TOKEN)
         me = await client.get_me()
-        logger.info(f"✅ Bot connecté: @{me.username}")
+        logger.info("✅ Bot connecté: @%s", me.username)
 
         await verify_channels()
         await start_web_server()
 
-        # Lancer les tâches de reset automatique
-        asyncio.create_task(schedule_periodic_reset())
-        asyncio.create_task(schedule_daily_reset())
+        # Écritures par lots et consommateur ordonné de chaque table
+        for engine in registry:
+            engine.start()
+        loop_monitor.start()
+
+        # Tâches périodiques (reconnexions, expiration incrémentale) et
+        # blocages /time restaurés, échus pendant l'arrêt compris
+        watch_connection()
+        scheduler.every('expiry_sweep', sweep_all, EXPIRY_SWEEP_INTERVAL)
+        scheduler.start()
+
+        # Messages publiés ou édités pendant l'arrêt, avant le traitement en direct
+        await catch_up_all()
 
-        logger.info("🚀 Bot opérationnel - En attente de messages...")
+        logger.info("🚀 Bot opérationnel (%d table(s)) - En attente de messages...", len(registry))
         await client.run_until_disconnected()
 
     except Exception as e:
-        logger.error(f"Erreur principale: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
+        logger.error("Erreur principale: %s", e, exc_info=True)
+    finally:
+        loop_monitor.stop()
+        await scheduler.stop()
+        for engine in registry:
+            await engine.close()
+        log_setup.stop()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,189 @@
+"""
+Métriques au format texte Prometheus (route /metrics).
+
+Sur le chemin critique, une mise à jour est une simple addition sur un
+attribut ou une case de liste préallouée (boucle asyncio unique: aucun
+verrou). Les séries étiquetées sont créées à l'import et les appelants
+gardent une référence directe. Le texte n'est construit qu'au moment du
+scrape; les valeurs déjà tenues ailleurs (taille des prédictions en
+attente, doublons) sont lues par des fonctions à ce moment-là.
+"""
+from bisect import bisect_left
+
+# Bornes des histogrammes de latence (secondes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        if value == float('inf'):
+            return '+Inf'
+        return repr(value)
+    return str(value)
+
+class Counter:
+    """Compteur monotone."""
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+class Histogram:
+    """Histogramme à cases préallouées (non cumulées; cumul au rendu)."""
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: tuple = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1) # dernière case: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class _Family:
+    """Série (éventuellement étiquetée) d'un même type."""
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), presets=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._children = {}
+        if not self.label_names:
+            self._children[()] = self._new_child()
+        for values in presets:
+            self.labels(*values if isinstance(values, tuple) else (values,))
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Série d'une combinaison d'étiquettes (à garder en référence sur le chemin critique)."""
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class CounterFamily(_Family):
+    kind = 'counter'
+
+    def _new_child(self):
+        return Counter()
+
+    def inc(self, amount=1):
+        self._children[()].value += amount
+
+    def render(self) -> list:
+        lines = self._header()
+        for values, child in self._children.items():
+            lines.append(f"{self.name}{_format_labels(self.label_names, values)} {_format_value(child.value)}")
+        return lines
+
+class HistogramFamily(_Family):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), presets=(), buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        super().__init__(name, help_text, labels, presets)
+
+    def _new_child(self):
+        return Histogram(self.buckets)
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def render(self) -> list:
+        lines = self._header()
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), child.counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, values, f'le="{_format_value(float(bound))}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+class CallbackMetric:
+    """Valeur lue au moment du scrape (jauge ou compteur tenu ailleurs)."""
+
+    def __init__(self, name: str, help_text: str, func, kind: str = 'gauge'):
+        self.name = name
+        self.help = help_text
+        self.func = func
+        self.kind = kind
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}",
+                f"{self.name} {_format_value(self.func())}"]
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: tuple = (), presets=()) -> CounterFamily:
+        return self.register(CounterFamily(name, help_text, labels, presets))
+
+    def histogram(self, name: str, help_text: str, labels: tuple = (), presets=(), buckets: tuple = LATENCY_BUCKETS) -> HistogramFamily:
+        return self.register(HistogramFamily(name, help_text, labels, presets, buckets))
+
+    def gauge_func(self, name: str, help_text: str, func) -> CallbackMetric:
+        return self.register(CallbackMetric(name, help_text, func, 'gauge'))
+
+    def counter_func(self, name: str, help_text: str, func) -> CallbackMetric:
+        return self.register(CallbackMetric(name, help_text, func, 'counter'))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+# --- Métriques du bot ---
+
+TELEGRAM_METHODS = ('send_message', 'edit_message', 'send_file')
+
+MESSAGES_RECEIVED = REGISTRY.counter(
+    'bot_source_messages_received_total', "Messages du canal source reçus", ('kind',), ('new', 'edited'))
+MESSAGES_PARSED = REGISTRY.counter(
+    'bot_source_messages_parsed_total', "Messages du canal source reconnus comme jeux", ('kind',), ('new', 'edited'))
+EDITS_FILTERED = REGISTRY.counter(
+    'bot_source_edits_filtered_total', "Éditions source écartées sans analyse", ('reason',),
+    ('unchanged', 'finalized', 'outdated', 'intermediate'))
+PREDICTIONS_SENT = REGISTRY.counter(
+    'bot_predictions_sent_total', "Prédictions publiées dans le canal")
+VERIFICATION_HITS = REGISTRY.counter(
+    'bot_verification_hits_total', "Prédictions réussies par index de vérification (N+i)", ('index',), range(11))
+VERIFICATION_MISSES = REGISTRY.counter(
+    'bot_verification_misses_total', "Prédictions échouées", ('reason',), ('final', 'expired', 'abandoned'))
+TELEGRAM_CALL_SECONDS = REGISTRY.histogram(
+    'bot_telegram_call_seconds', "Latence des appels à l'API Telegram", ('method',), TELEGRAM_METHODS)
+TELEGRAM_ERRORS = REGISTRY.counter(
+    'bot_telegram_errors_total', "Erreurs des appels à l'API Telegram", ('method', 'error'),
+    [(method, error) for method in TELEGRAM_METHODS for error in ('flood_wait', 'not_modified', 'other')])
+FLOOD_WAIT_SECONDS = REGISTRY.counter(
+    'bot_telegram_flood_wait_seconds_total', "Secondes d'attente imposées par FloodWait")
+PIPELINE_WAIT_SECONDS = REGISTRY.histogram(
+    'bot_pipeline_wait_seconds', "Attente des messages source dans le pipeline")
@@ -0,0 +1,306 @@
+"""
+File d'envoi Telegram centralisée.
+
+Tous les send_message / edit_message passent par ici: une voie par chat
+avec seau à jetons (débit réglable par chat), classes de priorité, nouvelle tentative sur
+FloodWait et fusion des éditions en attente d'un même message. Les
+éditions d'un même lot (ex: toutes les prédictions réglées par un
+message source) partent ensemble, chacune avec ses propres essais.
+Les gestionnaires n'attendent jamais un aller-retour Telegram.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from telethon.errors import FloodWaitError, MessageNotModifiedError
+from config import OUTBOX_CHAT_RATE, OUTBOX_CHAT_BURST, OUTBOX_MAX_RETRIES
+from metrics import TELEGRAM_CALL_SECONDS, TELEGRAM_ERRORS, FLOOD_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Classes de priorité (plus petit = plus urgent)
+PRIORITY_PREDICTION = 0 # Publication des prédictions
+PRIORITY_STATUS = 1     # Éditions de statut
+PRIORITY_ADMIN = 2      # Messages à l'administrateur
+
+# Séries de métriques par type de tâche (références directes, aucune recherche d'étiquette)
+_METHODS = {'send': 'send_message', 'edit': 'edit_message'}
+_CALL_SECONDS = {kind: TELEGRAM_CALL_SECONDS.labels(method) for kind, method in _METHODS.items()}
+_ERRORS = {kind: {error: TELEGRAM_ERRORS.labels(method, error) for error in ('flood_wait', 'not_modified', 'other')}
+           for kind, method in _METHODS.items()}
+
+class SentMessage:
+    """Référence vers un message publié par la file (id connu après l'envoi)."""
+    __slots__ = ('id', '_done')
+
+    def __init__(self, message_id: int = 0):
+        self.id = message_id
+        self._done = None
+
+    @property
+    def done(self) -> bool:
+        return self._done is None or self._done.is_set()
+
+    def _resolve(self, message_id: int):
+        self.id = message_id
+        if self._done is not None:
+            self._done.set()
+
+    async def wait(self) -> int:
+        """Attend la fin de l'envoi et retourne l'id (0 en cas d'échec)."""
+        if self._done is not None:
+            await self._done.wait()
+        return self.id
+
+class TokenBucket:
+    """Seau à jetons: `rate` envois par seconde, rafale de `capacity`."""
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Consomme un jeton et retourne le délai d'attente nécessaire (secondes)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+class _Job:
+    __slots__ = ('kind', 'chat_id', 'text', 'message', 'priority', 'attempts',
+                 'key', 'kwargs', 'on_sent', 'batch')
+
+    def __init__(self, kind, chat_id, text, message, priority, key=None, kwargs=None, on_sent=None, batch=None):
+        self.kind = kind          # 'send' ou 'edit'
+        self.chat_id = chat_id
+        self.text = text
+        self.message = message    # SentMessage (envoi) ou id/SentMessage (édition)
+        self.priority = priority
+        self.attempts = 0
+        self.key = key            # clé de fusion des éditions
+        self.kwargs = kwargs or {}
+        self.on_sent = on_sent
+        self.batch = batch        # lot d'éditions exécutées en parallèle
+
+class _Lane:
+    """File ordonnée d'un chat, vidée par une seule tâche."""
+
+    def __init__(self, chat_id, rate: float, burst: float):
+        self.chat_id = chat_id
+        self.heap = []
+        self.bucket = TokenBucket(rate, burst)
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.inflight = {}     # clé d'édition -> tâche d'un lot en cours
+        self.resume_at = 0.0   # pause demandée par une édition d'un lot (FloodWait, erreur)
+
+class Outbox:
+    """File d'envoi asynchrone avec limitation par chat."""
+
+    def __init__(self, client, rate: float = OUTBOX_CHAT_RATE, burst: float = OUTBOX_CHAT_BURST,
+                 max_retries: int = OUTBOX_MAX_RETRIES):
+        self.client = client
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self._lanes = {}
+        self._chat_limits = {}  # chat -> (débit, rafale) propres à ce chat
+        self._pending_edits = {}
+        self._seq = itertools.count()
+        self._batches = itertools.count(1)
+        self.sent = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.flood_wait_seconds = 0
+
+    # --- API publique (non bloquante) ---
+
+    def send(self, chat_id, text: str, priority: int = PRIORITY_ADMIN, on_sent=None, **kwargs) -> SentMessage:
+        """Met un message en file et retourne sa référence immédiatement."""
+        message = SentMessage()
+        message._done = asyncio.Event()
+        self._push(_Job('send', chat_id, text, message, priority, kwargs=kwargs, on_sent=on_sent))
+        return message
+
+    def new_batch(self) -> int:
+        """Identifiant d'un lot d'éditions à envoyer ensemble."""
+        return next(self._batches)
+
+    def edit(self, chat_id, message, text: str, priority: int = PRIORITY_STATUS, on_sent=None, batch: int = None):
+        """
+        Met une édition en file. Si une édition du même message attend
+        encore, seul le dernier texte (et son rappel) sera envoyé.
+        Les éditions d'un même lot (new_batch) d'un chat partent en parallèle.
+        """
+        key = (chat_id, message if isinstance(message, int) else id(message))
+        job = self._pending_edits.get(key)
+        if job is not None:
+            job.text = text
+            if on_sent is not None:
+                job.on_sent = on_sent
+            self.coalesced += 1
+            return
+        job = _Job('edit', chat_id, text, message, priority, key=key, on_sent=on_sent, batch=batch)
+        self._pending_edits[key] = job
+        self._push(job)
+
+    def set_chat_rate(self, chat_id, rate: float, burst: float = None):
+        """Débit propre à un chat (ex: groupe limité à 20 messages/minute)."""
+        burst = burst if burst is not None else max(1.0, rate)
+        self._chat_limits[chat_id] = (rate, burst)
+        lane = self._lanes.get(chat_id)
+        if lane is not None:
+            lane.bucket = TokenBucket(rate, burst)
+
+    @property
+    def backlog(self) -> int:
+        """Nombre de messages en attente dans toutes les voies."""
+        return sum(len(lane.heap) + len(lane.inflight) for lane in self._lanes.values())
+
+    # --- Traitement ---
+
+    def _push(self, job: _Job):
+        lane = self._lanes.get(job.chat_id)
+        if lane is None:
+            rate, burst = self._chat_limits.get(job.chat_id, (self.rate, self.burst))
+            lane = _Lane(job.chat_id, rate, burst)
+            self._lanes[job.chat_id] = lane
+        heapq.heappush(lane.heap, (job.priority, next(self._seq), job))
+        if lane.task is None or lane.task.done():
+            lane.task = asyncio.create_task(self._run_lane(lane))
+        lane.wakeup.set()
+
+    async def _run_lane(self, lane: _Lane):
+        while True:
+            if not lane.heap:
+                lane.wakeup.clear()
+                await lane.wakeup.wait()
+                continue
+
+            loop = asyncio.get_running_loop()
+            if lane.resume_at > loop.time():
+                await asyncio.sleep(lane.resume_at - loop.time())
+
+            delay = lane.bucket.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            job = self._pop(lane)
+            batch = job.batch
+            if batch is not None and lane.heap and lane.heap[0][2].batch == batch:
+                # Reste du lot en tête de file: un jeton chacun, éditions lancées
+                # ensemble sans bloquer la voie (un seul aller-retour pour le lot)
+                jobs = [job]
+                while lane.heap and lane.heap[0][2].batch == batch:
+                    delay = lane.bucket.reserve()
+                    jobs.append(self._pop(lane))
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                for job in jobs:
+                    self._start(lane, job)
+                continue
+
+            previous = lane.inflight.get(job.key) if job.key is not None else None
+            if previous is not None:
+                # Une édition du même message est en cours: conserver l'ordre
+                await asyncio.wait((previous,))
+            pause = await self._attempt(lane, job)
+            if pause > 0:
+                await asyncio.sleep(pause)
+
+    def _start(self, lane: _Lane, job: _Job):
+        """Lance une édition d'un lot en tâche propre (essais indépendants)."""
+        previous = lane.inflight.get(job.key)
+        task = asyncio.create_task(self._attempt_after(lane, job, previous))
+        lane.inflight[job.key] = task
+
+        def done(task):
+            if lane.inflight.get(job.key) is task:
+                del lane.inflight[job.key]
+        task.add_done_callback(done)
+
+    async def _attempt_after(self, lane: _Lane, job: _Job, previous):
+        if previous is not None:
+            await asyncio.wait((previous,))
+        pause = await self._attempt(lane, job)
+        if pause > 0:
+            # Fixée avant que la voie ne reprenne la tâche remise en file
+            lane.resume_at = max(lane.resume_at, asyncio.get_running_loop().time() + pause)
+
+    def _pop(self, lane: _Lane) -> _Job:
+        _, _, job = heapq.heappop(lane.heap)
+        if job.key is not None:
+            self._pending_edits.pop(job.key, None)
+        return job
+
+    async def _attempt(self, lane: _Lane, job: _Job) -> float:
+        """Exécute une tâche; retourne la pause à observer avant la suivante (secondes)."""
+        try:
+            await self._execute(job)
+        except FloodWaitError as e:
+            self.flood_wait_seconds += e.seconds
+            FLOOD_WAIT_SECONDS.inc(e.seconds)
+            _ERRORS[job.kind]['flood_wait'].inc()
+            logger.warning("⏳ FloodWait %ds sur le chat %s, nouvelle tentative après attente", e.seconds, lane.chat_id)
+            self._requeue(lane, job)
+            return e.seconds
+        except MessageNotModifiedError:
+            _ERRORS[job.kind]['not_modified'].inc()
+        except Exception as e:
+            _ERRORS[job.kind]['other'].inc()
+            job.attempts += 1
+            if job.attempts <= self.max_retries:
+                logger.warning("⚠️ Erreur Telegram (%s) sur %s: %s - essai %d/%d",
+                               job.kind, lane.chat_id, e, job.attempts, self.max_retries)
+                self._requeue(lane, job)
+                return min(2 ** job.attempts, 30)
+            self.failed += 1
+            logger.error("❌ Abandon %s sur %s après %d essais: %s", job.kind, lane.chat_id, job.attempts, e)
+            if job.kind == 'send':
+                job.message._resolve(0)
+        return 0
+
+    def _requeue(self, lane: _Lane, job: _Job):
+        if job.key is not None:
+            newer = self._pending_edits.get(job.key)
+            if newer is not None:
+                # Une édition plus récente attend déjà: elle remplace celle-ci
+                return
+            self._pending_edits[job.key] = job
+        heapq.heappush(lane.heap, (job.priority, next(self._seq), job))
+        lane.wakeup.set() # la voie peut être en attente (édition d'un lot)
+
+    async def _execute(self, job: _Job):
+        if job.kind == 'send':
+            started = time.perf_counter()
+            try:
+                result = await self.client.send_message(job.chat_id, job.text, **job.kwargs)
+            finally:
+                _CALL_SECONDS['send'].observe(time.perf_counter() - started)
+            self.sent += 1
+            job.message._resolve(result.id)
+            if job.on_sent is not None:
+                job.on_sent(result.id)
+            return
+
+        message_id = job.message
+        if isinstance(message_id, SentMessage):
+            message_id = await message_id.wait()
+        if not message_id:
+            logger.warning("⚠️ Édition ignorée sur %s: message jamais publié", job.chat_id)
+            return
+        started = time.perf_counter()
+        try:
+            await self.client.edit_message(job.chat_id, message_id, job.text)
+        finally:
+            _CALL_SECONDS['edit'].observe(time.perf_counter() - started)
+        self.sent += 1
+        if job.on_sent is not None:
+            job.on_sent(message_id)
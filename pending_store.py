@@ -0,0 +1,127 @@
+"""
+Stockage des prédictions en attente.
+
+Chaque prédiction (jeu cible N) est rangée dans un seau pour chaque jeu
+qu'elle couvre (N+0 à N+r_offset). Un tas min sur le dernier jeu
+vérifiable permet de balayer les fenêtres expirées dans l'ordre; un
+second tas sur la date limite ('expires_at', horloge murale) retire les
+prédictions abandonnées même si plus aucun jeu n'arrive.
+"""
+import heapq
+
+class PendingPredictions:
+    """Prédictions en attente indexées par jeu couvert (interface de type dict)."""
+
+    def __init__(self):
+        self._preds = {}    # jeu cible -> prédiction
+        self._by_game = {}  # jeu couvert -> [jeux cibles]
+        self._expiry = []   # tas de (dernier jeu vérifiable, jeu cible)
+        self._aging = []    # tas de (date limite, jeu cible)
+
+    # --- Interface dict ---
+
+    def __setitem__(self, game_number: int, pred: dict):
+        if game_number in self._preds:
+            self._unindex(game_number, self._preds[game_number])
+        self._preds[game_number] = pred
+        last_game = game_number + pred['r_offset']
+        for covered in range(game_number, last_game + 1):
+            self._by_game.setdefault(covered, []).append(game_number)
+        heapq.heappush(self._expiry, (last_game, game_number))
+        expires_at = pred.get('expires_at')
+        if expires_at is not None:
+            heapq.heappush(self._aging, (expires_at, game_number))
+
+    def __getitem__(self, game_number: int) -> dict:
+        return self._preds[game_number]
+
+    def __delitem__(self, game_number: int):
+        pred = self._preds.pop(game_number)
+        self._unindex(game_number, pred)
+
+    def __contains__(self, game_number) -> bool:
+        return game_number in self._preds
+
+    def __len__(self) -> int:
+        return len(self._preds)
+
+    def __iter__(self):
+        return iter(self._preds)
+
+    def get(self, game_number: int, default=None):
+        return self._preds.get(game_number, default)
+
+    def pop(self, game_number: int, default=None):
+        pred = self._preds.pop(game_number, None)
+        if pred is None:
+            return default
+        self._unindex(game_number, pred)
+        return pred
+
+    def items(self):
+        return self._preds.items()
+
+    def values(self):
+        return self._preds.values()
+
+    def clear(self):
+        self._preds.clear()
+        self._by_game.clear()
+        self._expiry.clear()
+        self._aging.clear()
+
+    # --- Index ---
+
+    def _unindex(self, game_number: int, pred: dict):
+        """Retire un jeu cible de tous les seaux qu'il couvre."""
+        for covered in range(game_number, game_number + pred['r_offset'] + 1):
+            bucket = self._by_game.get(covered)
+            if bucket is None:
+                continue
+            try:
+                bucket.remove(game_number)
+            except ValueError:
+                pass
+            if not bucket:
+                del self._by_game[covered]
+
+    def covering(self, game_number: int) -> list:
+        """Retourne [(jeu cible, prédiction)] dont la fenêtre couvre ce jeu."""
+        bucket = self._by_game.get(game_number)
+        if not bucket:
+            return []
+        return [(target, self._preds[target]) for target in sorted(bucket)]
+
+    def pop_expired(self, game_number: int) -> list:
+        """
+        Retire et retourne [(jeu cible, prédiction)] dont la fenêtre
+        se termine avant ce jeu, dans l'ordre d'expiration.
+        """
+        expired = []
+        heap = self._expiry
+        while heap and heap[0][0] < game_number:
+            last_game, target = heapq.heappop(heap)
+            pred = self._preds.get(target)
+            # Entrée obsolète (prédiction déjà terminée ou remplacée)
+            if pred is None or target + pred['r_offset'] != last_game:
+                continue
+            del self[target]
+            expired.append((target, pred))
+        return expired
+
+    def pop_aged(self, now: float, limit: int = None) -> list:
+        """
+        Retire et retourne au plus `limit` prédictions [(jeu cible, prédiction)]
+        dont la date limite est dépassée, les plus anciennes d'abord.
+        """
+        aged = []
+        heap = self._aging
+        while heap and heap[0][0] <= now and (limit is None or len(aged) < limit):
+            expires_at, target = heapq.heappop(heap)
+            pred = self._preds.get(target)
+            # Entrée obsolète (prédiction déjà terminée ou remplacée)
+            if pred is None or pred.get('expires_at') != expires_at:
+                continue
+            del self[target]
+            aged.append((target, pred))
+        return aged
@@ -0,0 +1,162 @@
+"""
+Pipeline d'ingestion des messages source.
+
+Les gestionnaires Telethon déposent les messages analysés dans une file
+bornée; un consommateur unique les traite dans l'ordre des numéros de
+jeu. En cas de rafale, les messages intermédiaires des jeux déjà reçus
+sont abandonnés (jamais la première apparition d'un jeu) et les jeux
+trop anciens ne déclenchent plus de prédiction.
+
+Le canal source remet ses numéros de jeu à zéro chaque jour: une chute de
+plus de GAME_WRAP_GAP ouvre une nouvelle série, et la file est ordonnée
+par (série, numéro de jeu).
+"""
+import asyncio
+import itertools
+import logging
+import time
+from config import PIPELINE_MAX_SIZE, PIPELINE_STALE_GAMES, PIPELINE_WAIT_WARN, GAME_WRAP_GAP
+from metrics import PIPELINE_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+def wrapped(game_number: int, reference: int, gap: int = GAME_WRAP_GAP) -> bool:
+    """Vrai si game_number précède la remise à zéro des numéros qui a mené à reference."""
+    return game_number > reference + gap
+
+class GamePipeline:
+    """File ordonnée par numéro de jeu, vidée par un seul consommateur."""
+
+    def __init__(self, process, maxsize: int = PIPELINE_MAX_SIZE,
+                 stale_games: int = PIPELINE_STALE_GAMES, wait_warn: float = PIPELINE_WAIT_WARN):
+        # process(parsed, message_text, edited, predict) -> coroutine
+        self.process = process
+        self.maxsize = maxsize
+        self.stale_games = stale_games
+        self.wait_warn = wait_warn
+        self._queue = None
+        self._seq = itertools.count()
+        self._task = None
+        self._running = asyncio.Event() # effacé pendant un rattrapage
+        self._running.set()
+        self.latest_game = 0
+        self.series = 0 # incrémenté à chaque remise à zéro des numéros de jeu
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.stale = 0
+        self.last_wait = 0.0
+        self.max_wait = 0.0
+        self.total_wait = 0.0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        """Démarre le consommateur (dans la boucle asyncio courante)."""
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue(self.maxsize)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._consume())
+
+    async def submit(self, parsed, message_text: str, edited: bool = False):
+        """
+        Dépose un message analysé. Un message final, ou la première
+        apparition d'un nouveau jeu, attend une place (contre-pression);
+        si la file est pleine, une édition intermédiaire ou un message
+        intermédiaire d'un jeu déjà reçu est abandonné.
+        """
+        if self._queue is None:
+            self.start()
+        self.received += 1
+        latest, current = self.latest_game, self.series
+        series = self.advance(parsed.game_number)
+        # Nouveau jeu: au-delà du dernier jeu reçu, ou premier jeu d'une nouvelle série
+        new_game = series > current or (series == current and parsed.game_number > latest)
+
+        item = (series, parsed.game_number, next(self._seq), time.monotonic(), parsed, message_text, edited)
+        if self._queue.full() and not parsed.finalized and (edited or not new_game):
+            self.dropped += 1
+            logger.warning("⚠️ Pipeline plein (%d): message intermédiaire du jeu #%d abandonné",
+                           self._queue.qsize(), parsed.game_number)
+            return
+        await self._queue.put(item)
+
+    def advance(self, game_number: int) -> int:
+        """Avance le dernier jeu reçu et retourne la série du jeu."""
+        latest = self.latest_game
+        if game_number < latest - GAME_WRAP_GAP:
+            # Numéros remis à zéro par le canal source: nouvelle série
+            self.series += 1
+            self.latest_game = game_number
+            logger.info("🔁 Numéros de jeu remis à zéro: #%d -> #%d", latest, game_number)
+        elif latest and wrapped(game_number, latest):
+            # Message en retard de la série précédente
+            return self.series - 1
+        elif game_number > latest:
+            self.latest_game = game_number
+        return self.series
+
+    def reset(self):
+        """Oublie le dernier jeu reçu (reset de la table)."""
+        self.latest_game = 0
+
+    def pause(self):
+        """Suspend le traitement (les messages reçus restent en file)."""
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    async def _consume(self):
+        while True:
+            await self._running.wait()
+            item = await self._queue.get()
+            if not self._running.is_set():
+                # Suspendu pendant l'attente (rattrapage): le message retourne en
+                # file, sans attendre (la place libérée ne peut pas être reprise
+                # avant), et sera traité après les jeux rejoués
+                self._queue.put_nowait(item)
+                self._queue.task_done()
+                continue
+            series, game_number, _, enqueued_at, parsed, message_text, edited = item
+            wait = time.monotonic() - enqueued_at
+            PIPELINE_WAIT_SECONDS.observe(wait)
+            self.last_wait = wait
+            self.total_wait += wait
+            if wait > self.max_wait:
+                self.max_wait = wait
+            if wait > self.wait_warn:
+                logger.warning("🐢 Pipeline: jeu #%d traité après %.2fs d'attente (profondeur %d)",
+                               game_number, wait, self._queue.qsize())
+
+            # Un jeu trop en retard sur le dernier jeu reçu ne déclenche plus de prédiction
+            predict = series == self.series and game_number >= self.latest_game - self.stale_games
+            if not predict and not edited:
+                self.stale += 1
+
+            try:
+                await self.process(parsed, message_text, edited, predict)
+            except Exception as e:
+                logger.error("Erreur pipeline (jeu #%d): %s", game_number, e, exc_info=True)
+            finally:
+                self.processed += 1
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        """Instantané des compteurs (profondeur, attentes, abandons)."""
+        return {
+            'depth': self.depth,
+            'received': self.received,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'stale': self.stale,
+            'last_wait': self.last_wait,
+            'max_wait': self.max_wait,
+            'avg_wait': self.total_wait / self.processed if self.processed else 0.0,
+        }
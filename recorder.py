@@ -0,0 +1,350 @@
+"""
+Enregistreur des événements bruts du canal source.
+
+Chaque NewMessage / MessageEdited reçu (y compris les éditions ⏰
+intermédiaires) est ajouté à une file en mémoire; un thread dédié les
+compresse par blocs (un membre gzip par bloc) dans des segments tournants.
+Un index JSON par segment donne, pour chaque bloc, sa position dans le
+fichier et ses plages de jeux et d'horodatages: une plage se relit sans
+décompresser tout le segment.
+
+Utilisation:
+    python recorder.py info recordings
+    python recorder.py export recordings --from 2024-05-01T10:00 --to 2024-05-01T11:00 > incident.jsonl
+    python recorder.py replay recordings --game-from 120 --game-to 180 --speed 1
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from config import (
+    RECORDER_DIR, RECORDER_FLUSH_INTERVAL, RECORDER_SEGMENT_BYTES,
+    RECORDER_SEGMENT_SECONDS, RECORDER_MAX_SEGMENTS
+)
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = '.jsonl.gz'
+INDEX_SUFFIX = '.idx.json'
+
+class EventRecorder:
+    """File en mémoire (chemin critique) + thread d'écriture des segments."""
+
+    def __init__(self, directory: str = RECORDER_DIR, flush_interval: float = RECORDER_FLUSH_INTERVAL,
+                 segment_bytes: int = RECORDER_SEGMENT_BYTES, segment_seconds: float = RECORDER_SEGMENT_SECONDS,
+                 max_segments: int = RECORDER_MAX_SEGMENTS):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.max_segments = max_segments
+        self._queue = deque() # append/popleft atomiques entre la boucle et le thread
+        self._stop = threading.Event()
+        self._thread = None
+        self._segment = None # chemin du segment courant
+        self._segment_started = 0.0
+        self._blocks = []
+        self.recorded = 0
+        self.written = 0
+
+    # --- Chemin critique ---
+
+    def record(self, message, parsed=None, edited: bool = False, game_number: int = None):
+        """
+        Note un événement source (aucune E/S, aucune sérialisation).
+        game_number: numéro déjà connu d'un message non analysé (édition intermédiaire).
+        """
+        if self._thread is None:
+            return
+        self._queue.append((
+            time.time(), message.id, message.edit_date, edited,
+            message.message or '', parsed.game_number if parsed is not None else game_number
+        ))
+        self.recorded += 1
+
+    # --- Thread d'écriture ---
+
+    def start(self):
+        if self._thread is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name='event-recorder', daemon=True)
+        self._thread.start()
+        logger.info("🎥 Enregistreur actif (%s)", self.directory)
+
+    def stop(self):
+        """Écrit les événements restants et arrête le thread."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self._write_pending()
+        self._write_pending()
+
+    def _write_pending(self):
+        queue = self._queue
+        items = []
+        while queue:
+            items.append(queue.popleft())
+        if not items:
+            return
+        try:
+            self._write_block(items)
+            self.written += len(items)
+        except Exception as e:
+            logger.error("Erreur enregistreur: %s", e)
+
+    def _write_block(self, items: list):
+        now = time.time()
+        if (self._segment is None
+                or now - self._segment_started >= self.segment_seconds
+                or os.path.getsize(self._segment) >= self.segment_bytes):
+            self._rotate(items[0][0])
+
+        lines = []
+        games = []
+        for received, msg_id, edit_date, edited, text, game in items:
+            lines.append(json.dumps({
+                'received': received,
+                'id': msg_id,
+                'edit_date': edit_date.timestamp() if edit_date else None,
+                'edited': edited,
+                'game': game,
+                'text': text,
+            }, ensure_ascii=False))
+            if game is not None:
+                games.append(game)
+        data = gzip.compress(("\n".join(lines) + "\n").encode('utf-8'), mtime=0)
+
+        with open(self._segment, 'ab') as f:
+            offset = f.tell()
+            f.write(data)
+        self._blocks.append({
+            'offset': offset,
+            'length': len(data),
+            'count': len(items),
+            'first_time': items[0][0],
+            'last_time': items[-1][0],
+            'first_game': min(games) if games else None,
+            'last_game': max(games) if games else None,
+        })
+        self._write_index()
+
+    def _write_index(self):
+        index_path = self._segment[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'segment': os.path.basename(self._segment), 'blocks': self._blocks}, f)
+        os.replace(tmp_path, index_path)
+
+    def _rotate(self, first_time: float):
+        stamp = datetime.fromtimestamp(first_time, tz=timezone.utc).strftime('%Y%m%d-%H%M%S')
+        # Suffixe numérique: plusieurs segments dans la même seconde restent triés
+        n = 0
+        while True:
+            path = os.path.join(self.directory, f"events-{stamp}-{n:03d}{SEGMENT_SUFFIX}")
+            if not os.path.exists(path):
+                break
+            n += 1
+        self._segment = path
+        self._segment_started = time.time()
+        self._blocks = []
+        self._prune()
+
+    def _prune(self):
+        segments = list_segments(self.directory)
+        for path in segments[:max(0, len(segments) + 1 - self.max_segments)]:
+            for name in (path, path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX):
+                try:
+                    os.remove(name)
+                except FileNotFoundError:
+                    pass
+
+# --- Lecture ---
+
+def list_segments(directory: str) -> list:
+    """Segments du répertoire, du plus ancien au plus récent."""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.endswith(SEGMENT_SUFFIX))
+
+def load_index(segment_path: str) -> list:
+    """Blocs indexés d'un segment; sans index (arrêt brutal), un bloc couvrant tout le fichier."""
+    index_path = segment_path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            blocks = json.load(f)['blocks']
+    except (FileNotFoundError, ValueError, KeyError):
+        blocks = []
+    indexed = blocks[-1]['offset'] + blocks[-1]['length'] if blocks else 0
+    size = os.path.getsize(segment_path)
+    if size > indexed:
+        # Données écrites après le dernier index: bloc sans plages connues
+        blocks.append({'offset': indexed, 'length': size - indexed, 'count': None,
+                       'first_time': None, 'last_time': None, 'first_game': None, 'last_game': None})
+    return blocks
+
+def _overlaps(low, high, start, end) -> bool:
+    if low is None:
+        return True
+    return (start is None or high >= start) and (end is None or low <= end)
+
+def iter_events(directory: str, start_time: float = None, end_time: float = None,
+                first_game: int = None, last_game: int = None):
+    """Produit les événements enregistrés (dicts) dans les plages demandées, dans l'ordre."""
+    game_filter = first_game is not None or last_game is not None
+    for segment_path in list_segments(directory):
+        blocks = [block for block in load_index(segment_path)
+                  if _overlaps(block['first_time'], block['last_time'], start_time, end_time)
+                  and (not game_filter or block['count'] is None or (block['first_game'] is not None
+                       and _overlaps(block['first_game'], block['last_game'], first_game, last_game)))]
+        if not blocks:
+            continue
+        with open(segment_path, 'rb') as f:
+            for block in blocks:
+                f.seek(block['offset'])
+                try:
+                    data = gzip.decompress(f.read(block['length']))
+                except (OSError, EOFError) as e:
+                    logger.warning("Bloc illisible dans %s @%s: %s", segment_path, block['offset'], e)
+                    continue
+                for line in data.decode('utf-8').splitlines():
+                    event = json.loads(line)
+                    received, game = event['received'], event['game']
+                    if start_time is not None and received < start_time:
+                        continue
+                    if end_time is not None and received > end_time:
+                        continue
+                    if game_filter and (game is None
+                                        or (first_game is not None and game < first_game)
+                                        or (last_game is not None and game > last_game)):
+                        continue
+                    yield event
+
+def _replay_event(record: dict, chat_id: int = None):
+    """Objet minimal compatible avec handle_message / handle_edited_message."""
+    edit_date = record['edit_date']
+    return SimpleNamespace(chat_id=chat_id, message=SimpleNamespace(
+        id=record['id'],
+        message=record['text'],
+        edit_date=datetime.fromtimestamp(edit_date, tz=timezone.utc) if edit_date else None,
+    ))
+
+async def replay(records, on_new, on_edit, speed: float = 0.0, chat_id: int = None) -> int:
+    """
+    Réinjecte des événements enregistrés dans les gestionnaires.
+    speed = 0: le plus vite possible; 1: vitesse d'origine; 2: deux fois plus vite.
+    chat_id: canal source attribué aux événements (aiguillage vers la table).
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    first_received = None
+    count = 0
+    for record in records:
+        if speed > 0:
+            if first_received is None:
+                first_received = record['received']
+            delay = (record['received'] - first_received) / speed - (loop.time() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        handler = on_edit if record['edited'] else on_new
+        await handler(_replay_event(record, chat_id))
+        count += 1
+    return count
+
+# --- Ligne de commande ---
+
+def parse_time(value: str) -> float:
+    """Horodatage Unix ou date ISO (UTC si sans fuseau)."""
+    try:
+        return float(value)
+    except ValueError:
+        moment = datetime.fromisoformat(value)
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment.timestamp()
+
+def _format_time(timestamp) -> str:
+    if timestamp is None:
+        return '?'
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+def cmd_info(args):
+    for segment_path in list_segments(args.directory):
+        blocks = load_index(segment_path)
+        times = [b[k] for b in blocks for k in ('first_time', 'last_time') if b[k] is not None]
+        games = [b[k] for b in blocks for k in ('first_game', 'last_game') if b[k] is not None]
+        count = sum(b['count'] or 0 for b in blocks)
+        print(f"{os.path.basename(segment_path)}: {count} événements, {len(blocks)} blocs, "
+              f"{_format_time(min(times) if times else None)} -> {_format_time(max(times) if times else None)} UTC, "
+              f"jeux #{min(games) if games else '?'}-#{max(games) if games else '?'}")
+    return 0
+
+def _selected(args):
+    return iter_events(args.directory, args.start, args.end, args.game_from, args.game_to)
+
+def cmd_export(args):
+    # Format JSONL lu par backtest.py et sweep.py
+    for event in _selected(args):
+        sys.stdout.write(json.dumps(event, ensure_ascii=False) + "\n")
+    return 0
+
+def cmd_replay(args):
+    # Import tardif: main crée le client et enregistre les gestionnaires
+    import main as bot
+
+    engine = bot.registry.get(args.table) if args.table else bot.registry.default
+    if engine is None:
+        print(f"Table inconnue: {args.table}", file=sys.stderr)
+        return 1
+
+    async def run():
+        engine.pipeline.start()
+        count = await replay(_selected(args), bot.handle_message, bot.handle_edited_message, args.speed,
+                             engine.source_channel_id)
+        while engine.pipeline.stats()['depth']:
+            await asyncio.sleep(0.05)
+        print(f"{count} événements rejoués")
+
+    asyncio.run(run())
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Enregistrements du canal source: inventaire, export et rejeu.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name, func, help_text in (
+        ('info', cmd_info, "Liste les segments et leurs plages"),
+        ('export', cmd_export, "Exporte une plage en JSONL (backtest.py, sweep.py)"),
+        ('replay', cmd_replay, "Réinjecte une plage dans les gestionnaires du bot"),
+    ):
+        command = sub.add_parser(name, help=help_text)
+        command.set_defaults(func=func)
+        command.add_argument('directory', nargs='?', default=RECORDER_DIR, help="Répertoire des segments")
+        if name == 'info':
+            continue
+        command.add_argument('--from', dest='start', type=parse_time, help="Début (ISO UTC ou horodatage Unix)")
+        command.add_argument('--to', dest='end', type=parse_time, help="Fin (ISO UTC ou horodatage Unix)")
+        command.add_argument('--game-from', type=int, help="Premier numéro de jeu")
+        command.add_argument('--game-to', type=int, help="Dernier numéro de jeu")
+        if name == 'replay':
+            command.add_argument('--speed', type=float, default=0.0,
+                                 help="0 = le plus vite possible (défaut), 1 = vitesse d'origine")
+            command.add_argument('--table', help="Table visée (défaut: la première de tables.json)")
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""
+Planificateur unique des tâches temporelles du bot.
+
+Une seule tâche asyncio et un tas min sur l'horloge monotone de la boucle
+portent toutes les échéances: tâches ponctuelles (fin d'un blocage
+/time), périodiques (balayage d'expiration, surveillance de la
+connexion) et à heure fixe en heure WAT (style cron quotidien).
+
+Les tâches persistantes désignent leur action par un nom de gestionnaire
+enregistré (les fonctions ne se sérialisent pas); leur échéance est
+sauvegardée en heure murale dans SCHEDULE_FILE et reconvertie en horloge
+monotone au redémarrage. Une échéance dépassée pendant l'arrêt est
+exécutée dès le démarrage.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from config import SCHEDULE_FILE
+from config_store import ConfigWriter
+
+logger = logging.getLogger(__name__)
+
+WAT = timezone(timedelta(hours=1)) # Heure d'Afrique de l'Ouest (UTC+1)
+
+ONCE = 'once'
+INTERVAL = 'interval'
+DAILY = 'daily'
+
+class Job:
+    """Tâche planifiée (ponctuelle, périodique ou quotidienne)."""
+    __slots__ = ('name', 'kind', 'callback', 'args', 'interval', 'at', 'persist', 'due', 'seq', 'runs')
+
+    def __init__(self, name: str, kind: str, callback, args: tuple, interval: float = None,
+                 at: tuple = None, persist: bool = False):
+        self.name = name
+        self.kind = kind
+        self.callback = callback # fonction, ou nom de gestionnaire enregistré
+        self.args = tuple(args)
+        self.interval = interval # secondes (INTERVAL)
+        self.at = at             # (heure, minute) WAT (DAILY)
+        self.persist = persist
+        self.due = 0.0           # échéance sur l'horloge monotone de la boucle
+        self.seq = 0             # ordre d'ajout (égalités, entrées obsolètes du tas)
+        self.runs = 0
+
+    def remaining(self) -> float:
+        """Secondes avant la prochaine exécution."""
+        return max(0.0, self.due - time.monotonic())
+
+    def due_at(self) -> datetime:
+        """Prochaine exécution en heure murale (WAT, pour l'affichage)."""
+        return datetime.now(WAT) + timedelta(seconds=self.remaining())
+
+    def describe(self) -> str:
+        if self.kind == INTERVAL:
+            return f"toutes les {self.interval:g}s"
+        if self.kind == DAILY:
+            return f"chaque jour à {self.at[0]:02d}h{self.at[1]:02d} WAT"
+        return "une fois"
+
+def _next_daily(hour: int, minute: int) -> float:
+    """Secondes avant la prochaine occurrence de hh:mm en heure WAT."""
+    now = datetime.now(WAT)
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+class Scheduler:
+    """Tas d'échéances servi par une seule tâche."""
+
+    def __init__(self, path: str = SCHEDULE_FILE):
+        self._jobs = {}       # nom -> tâche active
+        self._heap = []       # (échéance, seq, nom)
+        self._handlers = {}   # nom de gestionnaire -> fonction (tâches persistantes)
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.writer = ConfigWriter(path, self._snapshot)
+
+    # --- Enregistrement ---
+
+    def handler(self, name: str, callback):
+        """Enregistre l'action d'une tâche persistante (appelée avec ses arguments)."""
+        self._handlers[name] = callback
+
+    def once(self, name: str, callback, delay: float, args: tuple = (), persist: bool = False) -> Job:
+        """Exécute `callback(*args)` dans `delay` secondes (remplace une tâche du même nom)."""
+        job = Job(name, ONCE, callback, args, persist=persist)
+        return self._add(job, delay)
+
+    def every(self, name: str, callback, interval: float, args: tuple = (), first_delay: float = None,
+              persist: bool = False) -> Job:
+        """Exécute `callback(*args)` toutes les `interval` secondes."""
+        job = Job(name, INTERVAL, callback, args, interval=interval, persist=persist)
+        return self._add(job, interval if first_delay is None else first_delay)
+
+    def daily(self, name: str, callback, hour: int, minute: int = 0, args: tuple = (), persist: bool = False) -> Job:
+        """Exécute `callback(*args)` chaque jour à hh:mm (heure WAT)."""
+        job = Job(name, DAILY, callback, args, at=(hour, minute), persist=persist)
+        return self._add(job, _next_daily(hour, minute))
+
+    def _add(self, job: Job, delay: float) -> Job:
+        if job.persist and not isinstance(job.callback, str):
+            raise ValueError(f"Tâche persistante {job.name}: gestionnaire nommé requis")
+        self._jobs[job.name] = job
+        self._push(job, time.monotonic() + max(0.0, delay))
+        if job.persist:
+            self.writer.mark_dirty()
+        return job
+
+    def _push(self, job: Job, due: float):
+        job.due = due
+        job.seq = next(self._seq)
+        heapq.heappush(self._heap, (due, job.seq, job.name))
+        self._wakeup.set()
+
+    # --- Consultation et modification ---
+
+    def get(self, name: str):
+        return self._jobs.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._jobs
+
+    def __iter__(self):
+        return iter(sorted(self._jobs.values(), key=lambda job: job.due))
+
+    def cancel(self, name: str) -> bool:
+        """Annule une tâche; son entrée dans le tas est ignorée à l'échéance."""
+        job = self._jobs.pop(name, None)
+        if job is None:
+            return False
+        if job.persist:
+            self.writer.mark_dirty()
+        return True
+
+    def reschedule(self, name: str, delay: float) -> bool:
+        """Déplace la prochaine exécution d'une tâche à dans `delay` secondes."""
+        job = self._jobs.get(name)
+        if job is None:
+            return False
+        self._push(job, time.monotonic() + max(0.0, delay))
+        if job.persist:
+            self.writer.mark_dirty()
+        return True
+
+    # --- Persistance ---
+
+    def _snapshot(self) -> dict:
+        # Échéances converties en heure murale (l'horloge monotone repart au redémarrage)
+        offset = time.time() - time.monotonic()
+        return {'jobs': [
+            {'name': job.name, 'kind': job.kind, 'handler': job.callback, 'args': list(job.args),
+             'interval': job.interval, 'at': job.at, 'due': job.due + offset}
+            for job in self._jobs.values() if job.persist
+        ]}
+
+    def load(self):
+        """Recharge les tâches persistées (avant start(), gestionnaires enregistrés)."""
+        try:
+            saved = self.writer.load()
+        except Exception as e:
+            logger.error("Erreur chargement des tâches planifiées: %s", e, exc_info=True)
+            return
+        if not saved:
+            return
+        offset = time.time() - time.monotonic()
+        for entry in saved.get('jobs', []):
+            if entry.get('handler') not in self._handlers:
+                logger.warning("Tâche planifiée %s ignorée: gestionnaire %s inconnu", entry.get('name'), entry.get('handler'))
+                continue
+            at = tuple(entry['at']) if entry.get('at') else None
+            job = Job(entry['name'], entry['kind'], entry['handler'], entry.get('args', ()),
+                      interval=entry.get('interval'), at=at, persist=True)
+            self._jobs[job.name] = job
+            if job.kind == DAILY:
+                # L'heure fixe est recalculée (occurrence manquée pendant l'arrêt: exécutée maintenant)
+                due = min(entry['due'] - offset, time.monotonic() + _next_daily(*at))
+            else:
+                due = entry['due'] - offset
+            self._push(job, due)
+            logger.info("⏰ Tâche planifiée restaurée: %s (%s, dans %.0fs)", job.name, job.describe(), job.remaining())
+
+    # --- Exécution ---
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.writer.close()
+
+    async def _run(self):
+        heap = self._heap
+        while True:
+            # Entrées obsolètes (tâche annulée, remplacée ou déplacée)
+            while heap and self._stale(heap[0]):
+                heapq.heappop(heap)
+            self._wakeup.clear()
+            if not heap:
+                await self._wakeup.wait()
+                continue
+            delay = heap[0][0] - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, seq, name = heapq.heappop(heap)
+            job = self._jobs[name]
+            if job.kind == ONCE:
+                del self._jobs[name]
+            elif job.kind == INTERVAL:
+                self._push(job, max(job.due + job.interval, time.monotonic()))
+            else:
+                self._push(job, time.monotonic() + _next_daily(*job.at))
+            if job.persist:
+                self.writer.mark_dirty()
+            await self._execute(job)
+
+    def _stale(self, entry) -> bool:
+        _, seq, name = entry
+        job = self._jobs.get(name)
+        return job is None or job.seq != seq
+
+    async def _execute(self, job: Job):
+        callback = job.callback
+        if isinstance(callback, str):
+            callback = self._handlers[callback]
+        job.runs += 1
+        try:
+            result = callback(*job.args)
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            logger.error("Erreur tâche planifiée %s: %s", job.name, e, exc_info=True)
@@ -0,0 +1,181 @@
+"""
+Magasin d'état persistant (SQLite en mode WAL).
+
+Chaque changement d'état d'une prédiction est noté en mémoire puis écrit
+par lots (une transaction, donc un fsync, par lot) dans un thread dédié.
+Au démarrage, l'état est rechargé pour reprendre la vérification.
+Si la base ne peut pas être ouverte ou écrite, les changements restent
+en mémoire, l'ouverture est retentée et l'erreur est exposée (`error`)
+pour /debug et /ready.
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import STATE_DB_FILE, STATE_FLUSH_INTERVAL, STATE_REOPEN_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Champs non sérialisables (référence de la file d'envoi)
+_TRANSIENT_FIELDS = ('messages',)
+
+class StateStore:
+    """État des prédictions, compteurs et ensembles de déduplication."""
+
+    def __init__(self, path: str = STATE_DB_FILE, flush_interval: float = STATE_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._conn = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='state-store')
+        self._dirty_predictions = {} # jeu -> prédiction (None = suppression)
+        self._dirty_values = {}      # clé -> valeur ou fonction (évaluée à l'écriture)
+        self._clear_predictions = False
+        self._task = None
+        self._reopen_at = 0.0
+        self.batches = 0
+        self.error = None # Dernière erreur d'ouverture ou d'écriture (None = persistance active)
+
+    # --- Ouverture et chargement (synchrones, au démarrage) ---
+
+    def open(self):
+        """Ouvre la base; en cas d'échec, note l'erreur et la relève."""
+        try:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # FULL en WAL: un fsync par transaction, donc un par lot
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute("CREATE TABLE IF NOT EXISTS predictions (game INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        except Exception as e:
+            self.error = f"ouverture de {self.path}: {e}"
+            self._reopen_at = time.monotonic() + STATE_REOPEN_INTERVAL
+            logger.error("❌ Magasin d'état indisponible (%s): changements gardés en mémoire, nouvel essai dans %.0fs",
+                         self.error, STATE_REOPEN_INTERVAL)
+            raise
+        self._conn = conn
+        self.error = None
+
+    def load(self):
+        """Retourne (prédictions {jeu: dict}, valeurs {clé: valeur})."""
+        if self._conn is None:
+            self.open()
+        predictions = {}
+        for game, data in self._conn.execute("SELECT game, data FROM predictions"):
+            pred = json.loads(data)
+            pred['messages'] = None
+            predictions[game] = pred
+        values = {key: json.loads(value) for key, value in self._conn.execute("SELECT key, value FROM kv")}
+        return predictions, values
+
+    # --- Marquage (chemin critique: aucune E/S) ---
+
+    def put_prediction(self, game_number: int, pred: dict):
+        self._dirty_predictions[game_number] = pred
+
+    def delete_prediction(self, game_number: int):
+        self._dirty_predictions[game_number] = None
+
+    def clear_predictions(self):
+        self._dirty_predictions.clear()
+        self._clear_predictions = True
+
+    def set(self, key: str, value):
+        """Enregistre une valeur; une fonction est évaluée au moment de l'écriture."""
+        self._dirty_values[key] = value
+
+    # --- Écriture par lots ---
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self._conn is None:
+                # Base non ouverte (échec au démarrage): nouvel essai périodique
+                if time.monotonic() < self._reopen_at:
+                    continue
+                try:
+                    self.open()
+                    logger.info("✅ Magasin d'état %s ouvert: écriture des changements en attente", self.path)
+                except Exception:
+                    continue
+            try:
+                await self.flush()
+            except Exception as e:
+                self.error = f"écriture: {e}"
+                logger.error("Erreur écriture état: %s", e, exc_info=True)
+
+    def _snapshot(self):
+        """Sérialise les changements en attente (sur la boucle, sans E/S)."""
+        predictions = []
+        for game, pred in self._dirty_predictions.items():
+            if pred is None:
+                predictions.append((game, None))
+            else:
+                data = {k: v for k, v in pred.items() if k not in _TRANSIENT_FIELDS}
+                predictions.append((game, json.dumps(data, ensure_ascii=False)))
+        values = []
+        for key, value in self._dirty_values.items():
+            if callable(value):
+                value = value()
+            values.append((key, json.dumps(value, ensure_ascii=False)))
+        clear = self._clear_predictions
+        self._dirty_predictions = {}
+        self._dirty_values = {}
+        self._clear_predictions = False
+        return clear, predictions, values
+
+    def _write_batch(self, clear, predictions, values):
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            if clear:
+                conn.execute("DELETE FROM predictions")
+            for game, data in predictions:
+                if data is None:
+                    conn.execute("DELETE FROM predictions WHERE game = ?", (game,))
+                else:
+                    conn.execute("INSERT OR REPLACE INTO predictions (game, data) VALUES (?, ?)", (game, data))
+            conn.executemany("INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)", values)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def flush(self):
+        """Écrit le lot en attente dans le thread du magasin."""
+        if self._conn is None or not (self._dirty_predictions or self._dirty_values or self._clear_predictions):
+            return
+        pending = (self._dirty_predictions, self._dirty_values, self._clear_predictions)
+        batch = self._snapshot()
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._write_batch, *batch)
+        except Exception:
+            # Lot remis en attente (sous les changements plus récents) pour le prochain essai
+            predictions, values, clear = pending
+            if not self._clear_predictions: # un reset entre-temps efface l'ancien lot
+                predictions.update(self._dirty_predictions)
+                self._dirty_predictions = predictions
+                self._clear_predictions = clear
+            values.update(self._dirty_values)
+            self._dirty_values = values
+            raise
+        self.batches += 1
+        self.error = None
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error("Erreur écriture état à l'arrêt: %s", e, exc_info=True)
+        if self._conn is None and (self._dirty_predictions or self._dirty_values or self._clear_predictions):
+            logger.error("❌ Magasin d'état %s indisponible à l'arrêt: changements perdus (%s)", self.path, self.error)
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,42 @@
+"""
+Règles de décision partagées par le bot et les outils hors ligne.
+
+Déclenchement /ec (écarts sur le numéro source) et issue d'une
+prédiction dans sa fenêtre de vérification (N+0 à N+r_offset).
+"""
+
+# Issues d'une vérification
+SETTLE_HIT = 'hit'           # Couleur trouvée: ✅ selon l'index
+SETTLE_MISS = 'miss'         # Dernier essai sans la couleur: ❌
+SETTLE_CONTINUE = 'continue' # Essai intermédiaire sans la couleur
+
+def ec_decide(game_number: int, gaps: list, gap_index: int, last_source_game: int, first_trigger_done: bool):
+    """
+    Décision du mode /ec pour un jeu source.
+    Retourne (déclencher, gap_index, last_source_game, first_trigger_done, écart utilisé).
+    L'écart utilisé vaut None pour la première prédiction (P1).
+    """
+    if not first_trigger_done:
+        # P1: Première prédiction après /ec activation. Déclenchement immédiat.
+        # N devient l'ancre; ec_gap_index reste 0 (P2 utilisera G1)
+        return True, gap_index, game_number, True, None
+
+    # Le gap à utiliser (G1, G2, G3, ...)
+    current_gap = gaps[gap_index]
+    # Le numéro de jeu source requis pour déclencher (e.g., 100 + 3 = 103)
+    required_source_game = last_source_game + current_gap
+
+    if game_number >= required_source_game:
+        # Déclenchement: avance l'index, l'actuel game_number devient la nouvelle ancre
+        return True, (gap_index + 1) % len(gaps), game_number, True, current_gap
+
+    # Sauter: N_current est trop bas, attendre.
+    return False, gap_index, last_source_game, True, current_gap
+
+def settle(pred_game_number: int, r_offset: int, game_number: int, suit_found: bool) -> str:
+    """Issue d'une prédiction pour un jeu de sa fenêtre de vérification."""
+    if suit_found:
+        return SETTLE_HIT
+    if game_number == pred_game_number + r_offset:
+        return SETTLE_MISS
+    return SETTLE_CONTINUE
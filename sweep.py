@@ -0,0 +1,210 @@
+"""
+Balayage parallèle des paramètres A, R et des séquences d'écarts /ec.
+
+L'historique est analysé une seule fois puis encodé en événements de
+taille fixe (jeu, code) dans un fichier temporaire; chaque processus du
+pool le projette en mémoire (mmap, lecture seule) au lieu de recevoir
+une copie sérialisée. Chaque combinaison est évaluée par la même
+simulation que backtest.py.
+
+Utilisation:
+    python sweep.py historique.jsonl --a 1-3 --r 0-3 --ec none --ec 3,4,5 --ec 2,3
+"""
+import argparse
+import itertools
+import json
+import mmap
+import os
+import sys
+import tempfile
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from config import DEDUP_CAPACITY
+from game_parser import parse_game, get_predicted_suit, SUITS
+from dedup import BoundedDedup
+from pipeline import GamePipeline
+from backtest import Backtest, iter_source_messages, parse_gaps
+from history_store import HistoryReader, FLAG_FIRST, FLAG_FINALIZED, CARDS_PER_GROUP, decode_card
+
+# Code d'événement: bit VERIFY = jeu finalisé (masque des couleurs du 1er groupe),
+# sinon premier message d'un jeu (index de la couleur prédite + 1, 0 = aucune)
+EVENT_VERIFY = 1 << 8
+
+def encode_history(path: str) -> array:
+    """
+    Analyse l'historique et retourne les événements [jeu, code, jeu, code, ...]
+    déjà dédupliqués (indépendants des paramètres balayés).
+    """
+    if path.endswith('.bin'):
+        return encode_history_store(path)
+    events = array('i')
+    append = events.append
+    processed_predictions = BoundedDedup(DEDUP_CAPACITY)
+    processed_verifications = BoundedDedup(DEDUP_CAPACITY)
+    suit_index = {suit: i for i, suit in enumerate(SUITS)}
+    series = GamePipeline(None) # remise à zéro quotidienne des numéros (advance seulement)
+
+    for message_text, edited, _ in iter_source_messages(path):
+        parsed = parse_game(message_text)
+        if parsed is None:
+            continue
+        game_number = parsed.game_number
+        current = series.series
+        if series.advance(game_number) > current:
+            # Numéros de la veille oubliés (Backtest ouvre aussi la nouvelle série)
+            processed_predictions.clear()
+            processed_verifications.clear()
+
+        if not edited and processed_predictions.add(game_number):
+            code = 0
+            if parsed.group_count >= 2:
+                card_value, base_suit = parsed.first_card(parsed.second_group)
+                if base_suit:
+                    code = suit_index[get_predicted_suit(base_suit, card_value, game_number)] + 1
+            append(game_number)
+            append(code)
+
+        if (parsed.finalized
+                and processed_verifications.add((game_number, parsed.fingerprint()))
+                and parsed.group_count >= 1):
+            append(game_number)
+            append(EVENT_VERIFY | parsed.first_group_mask())
+    return events
+
+def encode_history_store(path: str) -> array:
+    """Même encodage depuis l'historique binaire du bot (déjà dédupliqué, sans texte)."""
+    events = array('i')
+    append = events.append
+    reader = HistoryReader(path)
+    try:
+        for game_number, _, flags, group_count, *codes in reader.raw():
+            if flags & FLAG_FIRST:
+                code = 0
+                second_code = codes[CARDS_PER_GROUP]
+                if group_count >= 2 and second_code:
+                    card_value, base_suit = decode_card(second_code)
+                    code = SUITS.index(get_predicted_suit(base_suit, card_value, game_number)) + 1
+                append(game_number)
+                append(code)
+            elif flags & FLAG_FINALIZED and group_count >= 1:
+                # Les enregistrements de vérification sont ajoutés séparément (après déduplication)
+                mask = 0
+                for card in codes[:CARDS_PER_GROUP]:
+                    if card:
+                        mask |= 1 << ((card - 1) % 4)
+                append(game_number)
+                append(EVENT_VERIFY | mask)
+    finally:
+        reader.close()
+    return events
+
+def simulate(events, a_offset: int, r_offset: int, ec_gaps: list) -> dict:
+    """Rejoue des événements encodés pour une combinaison de paramètres."""
+    backtest = Backtest(a_offset, r_offset, ec_gaps)
+    predict_game = backtest.predict_game
+    verify_game = backtest.verify_game
+    for game_number, code in zip(events[0::2], events[1::2]):
+        if code & EVENT_VERIFY:
+            verify_game(game_number, code & 0xF)
+        else:
+            predict_game(game_number, SUITS[code - 1] if code else None)
+    backtest.finish()
+    return backtest.result()
+
+# --- Processus du pool ---
+
+_worker_events = None
+
+def _init_worker(events_path: str):
+    """Projette le fichier d'événements en mémoire partagée (lecture seule)."""
+    global _worker_events
+    if os.path.getsize(events_path) == 0:
+        _worker_events = array('i')
+        return
+    with open(events_path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    _worker_events = memoryview(mapped).cast('i')
+
+def _run_chunk(configs: list) -> list:
+    return [simulate(_worker_events, a, r, gaps) for a, r, gaps in configs]
+
+def run_sweep(path: str, a_values: list, r_values: list, gap_sequences: list, workers: int = None) -> list:
+    """Évalue toutes les combinaisons et retourne les résultats classés."""
+    events = encode_history(path)
+    configs = list(itertools.product(a_values, r_values, gap_sequences))
+    workers = workers or os.cpu_count() or 1
+
+    fd, events_path = tempfile.mkstemp(prefix='sweep-', suffix='.events')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            events.tofile(f)
+        del events
+
+        # Plusieurs lots par processus pour équilibrer la charge
+        chunk_size = max(1, len(configs) // (workers * 4))
+        chunks = [configs[i:i + chunk_size] for i in range(0, len(configs), chunk_size)]
+        results = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(events_path,)) as pool:
+            for chunk_results in pool.map(_run_chunk, chunks):
+                results.extend(chunk_results)
+    finally:
+        os.remove(events_path)
+
+    results.sort(key=lambda r: (-r['hit_rate'], r['max_loss_streak'], -r['settled']))
+    return results
+
+def parse_range(value: str) -> list:
+    """'1-3' -> [1, 2, 3]; '1,4,6' -> [1, 4, 6]."""
+    values = []
+    for part in value.split(','):
+        part = part.strip()
+        if '-' in part:
+            low, high = part.split('-', 1)
+            values.extend(range(int(low), int(high) + 1))
+        elif part:
+            values.append(int(part))
+    return values
+
+def parse_gap_sequence(value: str) -> list:
+    """'none' -> [] (mode /a standard), sinon '3,4,5' -> [3, 4, 5]."""
+    if value.strip().lower() in ('none', '0', 'off'):
+        return []
+    return parse_gaps(value)
+
+def format_table(results: list, top: int) -> str:
+    lines = [f"{'#':>4} {'A':>3} {'R':>3} {'EC':<14} {'Réussite':>9} {'Réglées':>8} {'Pertes max':>10}"]
+    for rank, result in enumerate(results[:top], 1):
+        gaps = ','.join(map(str, result['ec_gaps'])) or '-'
+        lines.append(f"{rank:>4} {result['a_offset']:>3} {result['r_offset']:>3} {gaps:<14} "
+                     f"{result['hit_rate'] * 100:>8.2f}% {result['settled']:>8} {result['max_loss_streak']:>10}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Balayage parallèle des paramètres /a, /r et /ec.")
+    parser.add_argument('history', help="Fichier d'historique (JSONL ou texte, .gz accepté, ou historique binaire .bin du bot)")
+    parser.add_argument('--a', type=parse_range, default=[1], help="Offsets /a (ex: 1-3 ou 1,2,5)")
+    parser.add_argument('--r', type=parse_range, default=[0], help="Essais /r (ex: 0-3)")
+    parser.add_argument('--ec', type=parse_gap_sequence, action='append', help="Séquence d'écarts (répétable, 'none' = sans /ec)")
+    parser.add_argument('--workers', type=int, default=None, help="Nombre de processus (défaut: nombre de cœurs)")
+    parser.add_argument('--top', type=int, default=20, help="Nombre de lignes affichées")
+    parser.add_argument('--json', action='store_true', help="Sortie JSON (tous les résultats)")
+    args = parser.parse_args(argv)
+
+    if any(not 0 <= r <= 10 for r in args.r):
+        parser.error("Les valeurs de --r doivent être comprises entre 0 et 10.")
+    gap_sequences = args.ec or [[]]
+
+    started = time.perf_counter()
+    results = run_sweep(args.history, args.a, args.r, gap_sequences, args.workers)
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print(format_table(results, args.top))
+        print(f"\n{len(results)} combinaisons évaluées en {elapsed:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""
+Générateur de messages réalistes du canal source et test de charge.
+
+Chaque jeu est tiré d'un sabot de 8 jeux avec les règles de tirage du
+baccarat, puis publié comme sur le canal: un premier message ⏰, des
+éditions intermédiaires (cartes révélées, troisièmes cartes) et une
+édition finale ✅ (ou 🔰 en cas d'égalité).
+
+Utilisation:
+    python synthetic_source.py --games 10000 > synthetique.jsonl
+    python synthetic_source.py --load --games 50000
+    python synthetic_source.py --load --games 2000 --rate 50 --latency 0.05 --flood 0.01
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+VALUES = ('A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K')
+SUIT_TEXT = ('♠️', '❤️', '♦️', '♣️')
+POINTS = {value: (i + 1 if i < 9 else 0) for i, value in enumerate(VALUES)}
+
+def _banker_draws(banker_total: int, player_third) -> bool:
+    """Règle de tirage de la banque (player_third: points de la 3e carte du joueur ou None)."""
+    if player_third is None:
+        return banker_total <= 5
+    if banker_total <= 2:
+        return True
+    if banker_total == 3:
+        return player_third != 8
+    if banker_total == 4:
+        return 2 <= player_third <= 7
+    if banker_total == 5:
+        return 4 <= player_third <= 7
+    if banker_total == 6:
+        return 6 <= player_third <= 7
+    return False
+
+class SyntheticSource:
+    """Coups de baccarat et séquences de messages du canal source."""
+
+    def __init__(self, seed: int = None, decks: int = 8, start_game: int = 1, edits: bool = True):
+        self._random = random.Random(seed)
+        self.decks = decks
+        self.game_number = start_game
+        self.edits = edits
+        self._shoe = []
+
+    def _draw(self):
+        if len(self._shoe) < 6:
+            self._shoe = [(v, s) for v in VALUES for s in SUIT_TEXT] * self.decks
+            self._random.shuffle(self._shoe)
+        return self._shoe.pop()
+
+    def deal(self):
+        """Retourne (cartes du joueur, cartes de la banque)."""
+        player = [self._draw(), self._draw()]
+        banker = [self._draw(), self._draw()]
+        player_total = sum(POINTS[v] for v, _ in player) % 10
+        banker_total = sum(POINTS[v] for v, _ in banker) % 10
+        if player_total >= 8 or banker_total >= 8:
+            return player, banker
+
+        player_third = None
+        if player_total <= 5:
+            card = self._draw()
+            player.append(card)
+            player_third = POINTS[card[0]]
+        if _banker_draws(banker_total, player_third):
+            banker.append(self._draw())
+        return player, banker
+
+    def game_messages(self, game_number: int = None) -> list:
+        """Messages successifs d'un jeu: [(texte, édité), ...] (le premier est nouveau)."""
+        if game_number is None:
+            game_number = self.game_number
+            self.game_number += 1
+        player, banker = self.deal()
+        points_p = sum(POINTS[v] for v, _ in player) % 10
+        points_b = sum(POINTS[v] for v, _ in banker) % 10
+
+        def cards(group):
+            return ''.join(v + s for v, s in group)
+
+        # Premier message: une carte visible par main, la seconde sans couleur
+        messages = [(f"⏰#N{game_number}. 0({cards(player[:1])}{player[1][0]}) - ({cards(banker[:1])}{banker[1][0]})", False)]
+        if self.edits:
+            messages.append((f"⏰#N{game_number}. {sum(POINTS[v] for v, _ in player[:2]) % 10}({cards(player[:2])}) - "
+                             f"{sum(POINTS[v] for v, _ in banker[:2]) % 10}({cards(banker[:2])})", True))
+            if len(player) == 3 and len(banker) == 3:
+                messages.append((f"⏰#N{game_number}. {points_p}({cards(player)}) - "
+                                 f"{sum(POINTS[v] for v, _ in banker[:2]) % 10}({cards(banker[:2])})", True))
+        flag = '🔰' if points_p == points_b else '✅'
+        messages.append((f"#N{game_number}. {flag}{points_p}({cards(player)}) - {points_b}({cards(banker)}) "
+                         f"#T{points_p + points_b}", True))
+        return messages
+
+    def iter_games(self, count: int):
+        """Produit (jeu, messages) pour `count` jeux consécutifs."""
+        for _ in range(count):
+            game_number = self.game_number
+            yield game_number, self.game_messages()
+
+async def feed_client(client, chat_id: int, source: SyntheticSource, games: int, rate: float = 0.0):
+    """
+    Publie `games` jeux dans le client local (FakeTelegramClient).
+    rate: jeux par seconde (0 = le plus vite possible).
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for i, (_, messages) in enumerate(source.iter_games(games)):
+        if rate > 0:
+            delay = i / rate - (loop.time() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        text, _ = messages[0]
+        message = await client.inject_message(chat_id, text)
+        for text, _ in messages[1:]:
+            await client.inject_edit(message, text)
+
+# --- Test de charge ---
+
+def import_bot(verbose: bool = False):
+    """
+    Importe main.py avec le client local et des fichiers d'état temporaires.
+    Doit être appelé avant tout autre import de main dans le processus.
+    """
+    workdir = tempfile.mkdtemp(prefix='loadtest-')
+    os.environ['TELEGRAM_CLIENT'] = 'fake'
+    os.environ['STATE_DB_FILE'] = os.path.join(workdir, 'state.db')
+    os.environ['HISTORY_FILE'] = os.path.join(workdir, 'history.bin')
+    os.environ['BOT_CONFIG_FILE'] = os.path.join(workdir, 'bot_config.json')
+    os.environ['TRACE_FILE'] = os.path.join(workdir, 'traces.jsonl')
+    os.environ['TABLES_FILE'] = os.path.join(workdir, 'tables.json') # absent: table unique
+    os.environ['RECORDER_ENABLED'] = '0'
+    import logging
+    logging.disable(logging.NOTSET if verbose else logging.WARNING)
+    import main as bot
+    return bot
+
+async def start_bot(bot):
+    """Démarre les composants du bot nécessaires au traitement (sans serveur web)."""
+    await bot.client.start()
+    await bot.verify_channels()
+    for engine in bot.registry:
+        engine.restore_state()
+        engine.start()
+
+async def stop_bot(bot):
+    for engine in bot.registry:
+        await engine.close()
+
+def _load_test(args):
+    bot = import_bot(args.verbose)
+
+    bot.client.latency = args.latency
+    bot.client.flood_probability = args.flood
+    if args.unthrottled:
+        # Mesure du code du bot, pas de la limite Telegram
+        bot.outbox.rate = bot.outbox.burst = 1e9
+    engine = bot.registry.default
+    engine.r_offset = args.r
+    # Tous les jeux passent par la prédiction, même injectés plus vite que le temps réel
+    engine.pipeline.stale_games = args.games
+
+    async def run():
+        await start_bot(bot)
+        source = SyntheticSource(seed=args.seed)
+
+        started = time.perf_counter()
+        await feed_client(bot.client, engine.source_channel_id, source, args.games, args.rate)
+        while engine.pipeline.stats()['depth']:
+            await asyncio.sleep(0.01)
+        handled = time.perf_counter() - started
+        while bot.outbox.backlog:
+            await asyncio.sleep(0.01)
+        drained = time.perf_counter() - started
+
+        await stop_bot(bot)
+        stats = engine.pipeline.stats()
+        return {
+            'games': args.games,
+            'handled_seconds': handled,
+            'games_per_second': args.games / handled if handled else 0.0,
+            'outbox_drained_seconds': drained,
+            'sent': bot.client.sent,
+            'edited': bot.client.edited,
+            'floods': bot.client.floods,
+            'outbox_failed': bot.outbox.failed,
+            'outbox_coalesced': bot.outbox.coalesced,
+            'pipeline_max_wait_ms': stats['max_wait'] * 1000,
+            'pipeline_dropped': stats['dropped'],
+        }
+
+    result = asyncio.run(run())
+    print(json.dumps(result, indent=2))
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Messages synthétiques du canal source et test de charge.")
+    parser.add_argument('--games', type=int, default=1000, help="Nombre de jeux")
+    parser.add_argument('--seed', type=int, default=None, help="Graine (reproductible)")
+    parser.add_argument('--no-edits', action='store_true', help="Sans éditions intermédiaires ⏰")
+    parser.add_argument('--load', action='store_true', help="Pousse les jeux dans le bot (client local)")
+    parser.add_argument('--rate', type=float, default=0.0, help="Jeux par seconde (0 = maximum)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Latence simulée par appel Telegram (s)")
+    parser.add_argument('--flood', type=float, default=0.0, help="Probabilité de FloodWait par appel")
+    parser.add_argument('--r', type=int, default=0, help="R_OFFSET utilisé pendant le test")
+    parser.add_argument('--throttled', dest='unthrottled', action='store_false',
+                        help="Garde la limite d'envoi par chat de la file d'envoi")
+    parser.add_argument('--verbose', action='store_true', help="Garde les logs du bot")
+    args = parser.parse_args(argv)
+
+    if args.load:
+        return _load_test(args)
+
+    source = SyntheticSource(seed=args.seed, edits=not args.no_edits)
+    write = sys.stdout.write
+    for _, messages in source.iter_games(args.games):
+        for text, edited in messages:
+            write(json.dumps({'text': text, 'edited': edited}, ensure_ascii=False) + "\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+"""Backtest: remise à zéro quotidienne des numéros et abandon après PENDING_MAX_AGE."""
+from backtest import Backtest
+from config import PENDING_MAX_AGE
+from game_parser import SUITS, SUIT_BITS
+
+SPADE = SUITS[0]
+
+def test_daily_wrap_abandons_open_predictions_and_forgets_numbers():
+    backtest = Backtest(a_offset=1, r_offset=2)
+    backtest.predict_game(1439, SPADE)
+    backtest.verify_game(1440, SUIT_BITS[SPADE]) # ✅0️⃣ pour #1440
+    backtest.predict_game(1440, SPADE)           # #1441 ne viendra pas
+    backtest.predict_game(1, SPADE)
+    backtest.verify_game(1439, SUIT_BITS[SPADE]) # en retard: série précédente
+    backtest.verify_game(2, SUIT_BITS[SPADE])
+    result = backtest.result()
+    assert backtest.series.series == 1
+    assert result['hits_by_index'] == {0: 2, 1: 0, 2: 0}
+    assert result['abandoned'] == 1
+    assert result['misses'] == 1
+    assert result['open'] == 0
+
+def test_timestamped_prediction_is_abandoned_after_max_age():
+    backtest = Backtest(a_offset=1, r_offset=0)
+    backtest.predict_game(10, SPADE, received=1000.0)
+    backtest.feed("message sans jeu", received=1000.0 + PENDING_MAX_AGE - 1)
+    assert backtest.result()['open'] == 1
+    backtest.feed("message sans jeu", received=1000.0 + PENDING_MAX_AGE)
+    result = backtest.result()
+    assert result['open'] == 0
+    assert result['abandoned'] == 1
+    assert backtest.max_loss_streak == 0 and backtest.loss_streak == 1
@@ -0,0 +1,80 @@
+"""Écriture différée de la configuration: fusion, génération et nouvel essai."""
+import asyncio
+import json
+
+from config_store import ConfigWriter
+
+async def _until(condition, timeout: float = 1.0):
+    """Attend qu'une condition devienne vraie (échoue après timeout)."""
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.005)
+    await asyncio.wait_for(poll(), timeout)
+
+def test_nearby_writes_are_merged_with_increasing_generation(tmp_path):
+    path = tmp_path / 'cfg.json'
+    state = {'a_offset': 1}
+
+    async def scenario():
+        writer = ConfigWriter(str(path), lambda: state, delay=0.01)
+        writer.mark_dirty()
+        state['a_offset'] = 2
+        writer.mark_dirty() # fusionnée avec la précédente
+        await _until(path.exists)
+        state['a_offset'] = 3
+        writer.mark_dirty()
+        await _until(lambda: json.loads(path.read_text())['generation'] == 2)
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert json.loads(path.read_text()) == {'a_offset': 3, 'generation': 2}
+    reloaded = ConfigWriter(str(path), dict)
+    assert reloaded.load()['a_offset'] == 3
+    assert reloaded.generation == writer.generation == 2
+
+def test_failed_write_is_retried_without_new_change(tmp_path):
+    path = tmp_path / 'absent' / 'cfg.json'
+
+    async def scenario():
+        writer = ConfigWriter(str(path), lambda: {'r_offset': 2}, delay=0.01)
+        writer.mark_dirty()
+        # Premier essai échoué (dossier absent): écriture réarmée
+        await _until(lambda: writer.generation == 1 and writer._dirty)
+        assert not path.exists()
+        path.parent.mkdir()
+        await _until(path.exists)
+        return writer
+
+    asyncio.run(scenario())
+    assert json.loads(path.read_text()) == {'r_offset': 2, 'generation': 2}
+
+def test_mark_dirty_without_loop_writes_immediately(tmp_path):
+    path = tmp_path / 'cfg.json'
+    ConfigWriter(str(path), lambda: {'ec_active': True}).mark_dirty()
+    assert json.loads(path.read_text()) == {'ec_active': True, 'generation': 1}
+
+def test_close_writes_pending_change_without_waiting(tmp_path):
+    path = tmp_path / 'cfg.json'
+
+    async def scenario():
+        writer = ConfigWriter(str(path), lambda: {'a_offset': 4}, delay=60)
+        writer.mark_dirty()
+        await writer.close()
+        return writer._handle
+
+    assert asyncio.run(scenario()) is None
+    assert json.loads(path.read_text()) == {'a_offset': 4, 'generation': 1}
+
+def test_failed_deferred_flush_is_logged(tmp_path, caplog):
+    def snapshot():
+        raise ValueError("instantané invalide")
+
+    async def scenario():
+        writer = ConfigWriter(str(tmp_path / 'cfg.json'), snapshot, delay=0.01)
+        writer.mark_dirty()
+        await _until(lambda: writer.generation == 1)
+        await asyncio.sleep(0.01)
+        return writer._flush_task
+
+    assert asyncio.run(scenario()) is None
+    assert "instantané invalide" in caplog.text
@@ -0,0 +1,69 @@
+"""Déduplication bornée (LRU + durée de vie) et filtre des éditions source."""
+from types import SimpleNamespace
+
+import dedup
+from dedup import (
+    BoundedDedup, EditCache,
+    EDIT_PARSE, EDIT_INTERMEDIATE, EDIT_UNCHANGED, EDIT_FINALIZED, EDIT_OUTDATED
+)
+
+def _clock(monkeypatch, start: float = 1000.0):
+    """Horloge murale contrôlée par le test (dedup.time.time)."""
+    now = [start]
+    monkeypatch.setattr(dedup, 'time', SimpleNamespace(time=lambda: now[0]))
+    return now
+
+def test_lru_evicts_least_recently_used():
+    seen = BoundedDedup(2)
+    assert seen.add('a')
+    assert seen.add('b')
+    assert not seen.add('a') # doublon: 'a' redevient la plus récente
+    assert seen.add('c')     # évince 'b'
+    assert list(seen) == ['a', 'c']
+    assert seen.hits == 1
+
+def test_ttl_entry_counts_as_absent_once_stale(monkeypatch):
+    now = _clock(monkeypatch)
+    seen = BoundedDedup(10, ttl=60)
+    seen.add('a')
+    now[0] += 50
+    assert not seen.add('a') # utilisation: la durée de vie repart
+    now[0] += 50
+    assert not seen.add('a')
+    now[0] += 61
+    assert seen.add('a')
+    assert seen.expired == 1
+
+def test_expire_removes_stale_entries_in_batches(monkeypatch):
+    now = _clock(monkeypatch)
+    seen = BoundedDedup(10, ttl=60)
+    for key in range(5):
+        seen.add(key)
+        now[0] += 1
+    now[0] = 1063 # clés 0 à 3 périmées
+    assert seen.expire(limit=2) == 2
+    assert list(seen) == [2, 3, 4]
+    assert seen.expire() == 2
+    assert list(seen) == [4]
+    assert BoundedDedup(10).expire() == 0 # sans durée de vie
+
+def test_edit_cache_parses_only_finalized_corrections():
+    cache = EditCache(10)
+    cache.remember(1, 10, '⏰#N5. 0(5♠️8)', 5, False)
+    assert cache.classify(1, 11, '⏰#N5. 3(5♠️8♣️)', False) == (EDIT_INTERMEDIATE, 5)
+    assert cache.classify(1, 11, '⏰#N5. 3(5♠️8♣️)', False) == (EDIT_UNCHANGED, 5)
+    assert cache.classify(1, 9, '⏰#N5. 0(5♠️)', False) == (EDIT_OUTDATED, 5)
+    assert cache.classify(1, 12, '#N5. ✅3(5♠️8♣️)', True) == (EDIT_PARSE, 5)
+    cache.remember(1, 12, '#N5. ✅3(5♠️8♣️)', 5, True)
+    assert cache.classify(1, 12, '#N5. ✅3(5♠️8♣️)', True) == (EDIT_FINALIZED, 5)
+    assert cache.classify(1, 13, '#N5. ✅3(5♦️8♣️)', True) == (EDIT_PARSE, 5)
+
+def test_edit_cache_unknown_message_and_eviction():
+    cache = EditCache(2)
+    assert cache.classify(7, None, '⏰', False) == (EDIT_INTERMEDIATE, None)
+    assert cache.classify(7, None, '✅', True) == (EDIT_PARSE, None)
+    for message_id in (1, 2, 3):
+        cache.remember(message_id, None, 'texte', message_id, True)
+    assert len(cache) == 2
+    assert cache.classify(1, None, 'texte', True) == (EDIT_PARSE, None) # évincé
+    assert cache.classify(3, None, 'texte', True) == (EDIT_FINALIZED, 3)
@@ -0,0 +1,75 @@
+"""File d'envoi: priorités, fusion des éditions d'un même message et lots parallèles."""
+import asyncio
+import time
+
+from fake_telegram import FakeTelegramClient
+from outbox import Outbox, PRIORITY_ADMIN, PRIORITY_PREDICTION
+
+CHAT = -100
+
+def _client(latency: float = 0.0):
+    client = FakeTelegramClient(latency=latency)
+    calls = []
+    client.on_call = lambda kind, chat, message: calls.append((kind, message.id, message.message))
+    return client, calls
+
+def test_sends_follow_priority():
+    async def scenario():
+        client, calls = _client()
+        outbox = Outbox(client, rate=100, burst=10)
+        admin = outbox.send(CHAT, 'admin', priority=PRIORITY_ADMIN)
+        prediction = outbox.send(CHAT, 'prédiction', priority=PRIORITY_PREDICTION)
+        await asyncio.wait_for(admin.wait(), 1)
+        return calls, await prediction.wait()
+
+    calls, prediction_id = asyncio.run(scenario())
+    assert [text for _, _, text in calls] == ['prédiction', 'admin']
+    assert prediction_id == 1
+
+def test_pending_edits_to_same_message_are_coalesced():
+    async def scenario():
+        client, calls = _client()
+        outbox = Outbox(client, rate=100, burst=10)
+        message = client._new_message(CHAT, '⌛', out=True)
+        confirmed = []
+        outbox.edit(CHAT, message.id, '✅0️⃣', on_sent=lambda _: confirmed.append('first'))
+        outbox.edit(CHAT, message.id, '✅1️⃣')
+        outbox.edit(CHAT, message.id, '❌', on_sent=lambda _: confirmed.append('last'))
+        await asyncio.sleep(0.02)
+        return calls, confirmed, outbox.coalesced
+
+    calls, confirmed, coalesced = asyncio.run(scenario())
+    assert calls == [('edit', 1, '❌')]
+    assert confirmed == ['last']
+    assert coalesced == 2
+
+def test_edit_waits_for_its_send():
+    async def scenario():
+        client, calls = _client(latency=0.01)
+        outbox = Outbox(client, rate=100, burst=10)
+        sent = outbox.send(CHAT, '⌛', priority=PRIORITY_PREDICTION)
+        outbox.edit(CHAT, sent, '✅0️⃣')
+        await asyncio.sleep(0.05)
+        return calls
+
+    assert asyncio.run(scenario()) == [('send', 1, '⌛'), ('edit', 1, '✅0️⃣')]
+
+def test_batch_edits_run_in_parallel():
+    async def scenario():
+        client, calls = _client()
+        messages = [client._new_message(CHAT, '⌛', out=True) for _ in range(5)]
+        client.latency = 0.05
+        outbox = Outbox(client, rate=100, burst=10)
+        batch = outbox.new_batch()
+        started = time.perf_counter()
+        for message in messages:
+            outbox.edit(CHAT, message.id, '✅0️⃣', batch=batch)
+        while len(calls) < len(messages):
+            await asyncio.sleep(0.005)
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(0.005) # fin des tâches du lot
+        return elapsed, outbox.backlog
+
+    elapsed, backlog = asyncio.run(scenario())
+    assert elapsed < 0.15 # un seul aller-retour (0.25s en série)
+    assert backlog == 0
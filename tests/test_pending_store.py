@@ -0,0 +1,36 @@
+"""Prédictions en attente: seaux par jeu couvert, fenêtres expirées et dates limites."""
+from pending_store import PendingPredictions
+
+def _pred(r_offset: int, expires_at: float = None) -> dict:
+    return {'r_offset': r_offset, 'expires_at': expires_at}
+
+def test_covering_follows_verification_window():
+    pending = PendingPredictions()
+    pending[10] = _pred(2)
+    pending[11] = _pred(0)
+    assert [target for target, _ in pending.covering(11)] == [10, 11]
+    assert [target for target, _ in pending.covering(12)] == [10]
+    assert pending.covering(13) == []
+    del pending[10]
+    assert [target for target, _ in pending.covering(11)] == [11]
+    assert pending.covering(12) == []
+
+def test_pop_expired_in_expiry_order_skips_replaced_entries():
+    pending = PendingPredictions()
+    pending[10] = _pred(3)
+    pending[12] = _pred(0)
+    pending[10] = _pred(0) # remplacée: l'ancienne entrée du tas est obsolète
+    assert [target for target, _ in pending.pop_expired(12)] == [10]
+    assert pending.pop_expired(13) == [(12, _pred(0))]
+    assert len(pending) == 0
+    assert pending.covering(10) == []
+
+def test_pop_aged_respects_limit_and_deadline():
+    pending = PendingPredictions()
+    for target, expires_at in ((1, 100.0), (2, 50.0), (3, 300.0), (4, 75.0)):
+        pending[target] = _pred(1, expires_at)
+    assert [target for target, _ in pending.pop_aged(200.0, limit=2)] == [2, 4]
+    assert [target for target, _ in pending.pop_aged(200.0)] == [1]
+    assert list(pending) == [3]
+    assert pending.pop(3)['expires_at'] == 300.0
+    assert pending.pop_aged(1000.0) == [] # entrée d'une prédiction déjà terminée
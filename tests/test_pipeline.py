@@ -0,0 +1,107 @@
+"""Pipeline d'ingestion: ordre des jeux et remise à zéro quotidienne des numéros."""
+import asyncio
+from types import SimpleNamespace
+
+from pipeline import GamePipeline
+
+def _game(game_number: int, finalized: bool = True):
+    return SimpleNamespace(game_number=game_number, finalized=finalized)
+
+def _run(games, paused: bool = False):
+    """Dépose les jeux puis retourne [(jeu, predict)] dans l'ordre de traitement."""
+    async def scenario():
+        processed = []
+        done = asyncio.Event()
+
+        async def process(parsed, message_text, edited, predict):
+            processed.append((parsed.game_number, predict))
+            if len(processed) == len(games):
+                done.set()
+
+        pipeline = GamePipeline(process)
+        pipeline.start()
+        if paused:
+            pipeline.pause()
+        for game_number in games:
+            await pipeline.submit(_game(game_number), '')
+            if not paused:
+                await asyncio.sleep(0) # traitement en direct, un jeu à la fois
+                await asyncio.sleep(0)
+        pipeline.resume()
+        await asyncio.wait_for(done.wait(), 1)
+        return processed, pipeline
+
+    return asyncio.run(scenario())
+
+def test_daily_wrap_keeps_predicting():
+    processed, pipeline = _run([1438, 1440, 1, 3])
+    assert processed == [(1438, True), (1440, True), (1, True), (3, True)]
+    assert pipeline.latest_game == 3
+    assert pipeline.series == 1
+    assert pipeline.stale == 0
+
+def test_daily_wrap_orders_queue_by_series():
+    processed, _ = _run([1, 1438, 3, 1440], paused=True)
+    # Les jeux de la veille passent avant la nouvelle série, sans prédiction
+    assert processed == [(1438, False), (1440, False), (1, True), (3, True)]
+
+def test_late_message_from_previous_series_is_stale():
+    processed, pipeline = _run([1440, 1, 1439])
+    assert processed[-1] == (1439, False)
+    assert pipeline.latest_game == 1
+
+def test_pause_holds_message_taken_by_waiting_consumer():
+    async def scenario():
+        processed = []
+
+        async def process(parsed, message_text, edited, predict):
+            processed.append(parsed.game_number)
+
+        pipeline = GamePipeline(process)
+        pipeline.start()
+        await asyncio.sleep(0) # consommateur en attente dans get()
+        pipeline.pause()
+        await pipeline.submit(_game(12), '')
+        for _ in range(5):
+            await asyncio.sleep(0)
+        held = list(processed)
+        pipeline.resume()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        return held, processed, pipeline.depth
+
+    held, processed, depth = asyncio.run(scenario())
+    assert held == []
+    assert processed == [12]
+    assert depth == 0
+
+def test_full_queue_keeps_first_sighting_of_new_game():
+    async def scenario():
+        processed = []
+
+        async def process(parsed, message_text, edited, predict):
+            processed.append((parsed.game_number, edited))
+
+        pipeline = GamePipeline(process, maxsize=2)
+        pipeline.start()
+        pipeline.pause()
+        await pipeline.submit(_game(10, finalized=False), '')
+        await pipeline.submit(_game(11, finalized=False), '')
+        # File pleine: l'édition et le jeu déjà reçu sont abandonnés
+        await pipeline.submit(_game(11, finalized=False), '', edited=True)
+        await pipeline.submit(_game(10, finalized=False), '')
+        dropped = pipeline.dropped
+        # Le nouveau jeu attend une place
+        new_game = asyncio.create_task(pipeline.submit(_game(12, finalized=False), ''))
+        await asyncio.sleep(0)
+        waiting = not new_game.done()
+        pipeline.resume()
+        await asyncio.wait_for(new_game, 1)
+        await asyncio.wait_for(pipeline._queue.join(), 1)
+        return dropped, waiting, processed, pipeline.dropped
+
+    dropped, waiting, processed, total_dropped = asyncio.run(scenario())
+    assert dropped == 2
+    assert waiting
+    assert processed == [(10, False), (11, False), (12, False)]
+    assert total_dropped == 2
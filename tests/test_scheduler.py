@@ -0,0 +1,94 @@
+"""Planificateur: échéances quotidiennes en heure WAT, exécution et persistance."""
+import asyncio
+import json
+import time
+from datetime import datetime
+
+import scheduler
+from scheduler import Scheduler, WAT, _next_daily
+
+def _freeze(monkeypatch, *wall):
+    """Fige l'heure murale vue par le planificateur (heure WAT)."""
+    frozen = datetime(*wall, tzinfo=WAT)
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return frozen.astimezone(tz)
+
+    monkeypatch.setattr(scheduler, 'datetime', FrozenDatetime)
+
+def test_next_daily_crosses_midnight_wat(monkeypatch):
+    _freeze(monkeypatch, 2024, 5, 1, 23, 50)
+    assert _next_daily(0, 10) == 20 * 60
+    assert _next_daily(23, 55) == 5 * 60
+    assert _next_daily(23, 50) == 24 * 3600 # échéance atteinte: lendemain
+    _freeze(monkeypatch, 2024, 5, 1, 0, 10, 30)
+    assert _next_daily(0, 10) == 24 * 3600 - 30
+
+def test_jobs_run_in_due_order_and_cancel(tmp_path):
+    async def scenario():
+        sched = Scheduler(str(tmp_path / 'sch.json'))
+        runs = []
+        sched.once('b', runs.append, 0.03, args=('b',))
+        sched.once('a', runs.append, 0.01, args=('a',))
+        sched.once('c', runs.append, 0.01, args=('c',))
+        sched.cancel('c')
+        sched.every('tick', runs.append, 0.02, args=('tick',))
+        sched.reschedule('a', 0.0)
+        sched.start()
+        await asyncio.sleep(0.07)
+        await sched.stop()
+        return runs, 'a' in sched, 'tick' in sched
+
+    runs, once_left, every_left = asyncio.run(scenario())
+    assert runs[:3] == ['a', 'tick', 'b']
+    assert runs.count('tick') >= 2
+    assert 'c' not in runs
+    assert not once_left and every_left
+
+def test_persistent_job_survives_restart(tmp_path):
+    path = tmp_path / 'sch.json'
+
+    async def before_restart():
+        sched = Scheduler(str(path))
+        sched.handler('unblock', lambda table: None)
+        sched.once('block:main', 'unblock', 3600, args=('main',), persist=True)
+        sched.every('sweep', lambda: None, 10) # non persistante
+        await sched.stop()
+
+    asyncio.run(before_restart())
+    saved = json.loads(path.read_text())
+    assert [job['name'] for job in saved['jobs']] == ['block:main']
+
+    restored = Scheduler(str(path))
+    restored.handler('unblock', lambda table: None)
+    restored.load()
+    job = restored.get('block:main')
+    assert job.args == ('main',)
+    assert 3590 < job.remaining() <= 3600
+    assert restored.get('sweep') is None
+
+def test_job_due_during_shutdown_runs_at_start(tmp_path):
+    path = tmp_path / 'sch.json'
+    path.write_text(json.dumps({'jobs': [
+        {'name': 'block:main', 'kind': 'once', 'handler': 'unblock', 'args': ['main'],
+         'interval': None, 'at': None, 'due': time.time() - 60},
+        {'name': 'old', 'kind': 'once', 'handler': 'inconnu', 'args': [],
+         'interval': None, 'at': None, 'due': time.time() - 60},
+    ]}))
+
+    async def scenario():
+        unblocked = []
+        sched = Scheduler(str(path))
+        sched.handler('unblock', unblocked.append)
+        sched.load()
+        sched.start()
+        await asyncio.sleep(0.02)
+        await sched.stop()
+        return unblocked, list(sched)
+
+    unblocked, jobs = asyncio.run(scenario())
+    assert unblocked == ['main']
+    assert jobs == []
+    assert json.loads(path.read_text())['jobs'] == []
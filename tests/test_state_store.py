@@ -0,0 +1,59 @@
+"""Magasin d'état SQLite: écriture par lots et reprise après une ouverture échouée."""
+import asyncio
+import sqlite3
+
+import pytest
+
+import state_store
+from state_store import StateStore
+
+async def _until(condition, timeout: float = 1.0):
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.005)
+    await asyncio.wait_for(poll(), timeout)
+
+def test_batches_round_trip_without_transient_fields(tmp_path):
+    path = str(tmp_path / 'state.db')
+
+    async def scenario():
+        store = StateStore(path, flush_interval=0.01)
+        store.open()
+        store.put_prediction(10, {'r_offset': 1, 'messages': object()})
+        store.put_prediction(11, {'r_offset': 0})
+        store.set('current_game_number', lambda: 11) # évaluée à l'écriture
+        await store.flush()
+        store.delete_prediction(11)
+        await store.flush()
+        await store.close()
+        return store.batches
+
+    assert asyncio.run(scenario()) == 2
+    predictions, values = StateStore(path).load()
+    assert predictions == {10: {'r_offset': 1, 'messages': None}}
+    assert values == {'current_game_number': 11}
+
+def test_reopen_after_failed_open_writes_pending_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(state_store, 'STATE_REOPEN_INTERVAL', 0.0)
+    path = tmp_path / 'absent' / 'state.db'
+
+    async def scenario():
+        store = StateStore(str(path), flush_interval=0.01)
+        with pytest.raises(sqlite3.OperationalError):
+            store.open()
+        assert store.error is not None
+        store.put_prediction(10, {'r_offset': 2})
+        store.set('last_source_message_id', 42)
+        store.start()
+        await asyncio.sleep(0.05) # essais en échec: changements gardés en mémoire
+        assert store.batches == 0
+        path.parent.mkdir()
+        await _until(lambda: store.batches == 1)
+        error = store.error
+        await store.close()
+        return error
+
+    assert asyncio.run(scenario()) is None
+    predictions, values = StateStore(str(path)).load()
+    assert predictions == {10: {'r_offset': 2, 'messages': None}}
+    assert values == {'last_source_message_id': 42}
@@ -0,0 +1,195 @@
+"""
+Traces par jeu: du message source jusqu'à l'édition dans le canal.
+
+Une trace est ouverte par numéro de jeu à la réception; les spans
+(analyse, attente dans le pipeline, prédiction, vérification, envoi et
+édition Telegram) y sont ajoutés via une variable de contexte, ou
+explicitement pour les rappels de la file d'envoi. Les traces récentes
+restent dans un tampon circulaire (/trace); une tâche de fond clôt les
+traces inactives et écrit un échantillon (plus toutes les traces lentes)
+dans un fichier JSONL tournant, hors de la boucle.
+"""
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from config import (
+    TRACE_ENABLED, TRACE_FILE, TRACE_SAMPLE_RATE, TRACE_SLOW_MS, TRACE_RING_SIZE,
+    TRACE_IDLE_SECONDS, TRACE_MAX_BYTES, TRACE_BACKUP_COUNT
+)
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('trace', default=None)
+
+class Trace:
+    """Spans d'un jeu; les instants sont relatifs à l'ouverture de la trace."""
+    __slots__ = ('game_number', 'wall_start', 'start', 'last', 'spans', 'depth')
+
+    def __init__(self, game_number: int, started: float = None):
+        self.game_number = game_number
+        self.wall_start = time.time()
+        self.start = started if started is not None else time.perf_counter()
+        self.last = self.start
+        self.spans = [] # (nom, début, durée, profondeur, attributs)
+        self.depth = 0
+
+    def add(self, name: str, started: float, ended: float, attrs: dict = None, depth: int = None):
+        self.spans.append((name, started - self.start, ended - started,
+                           self.depth if depth is None else depth, attrs))
+        if ended > self.last:
+            self.last = ended
+
+    @property
+    def duration(self) -> float:
+        return self.last - self.start
+
+    def to_dict(self) -> dict:
+        return {
+            'game': self.game_number,
+            'start': self.wall_start,
+            'duration_ms': round(self.duration * 1000, 3),
+            'spans': [{'name': name, 'start_ms': round(offset * 1000, 3), 'duration_ms': round(duration * 1000, 3),
+                       'depth': depth, **({'attrs': attrs} if attrs else {})}
+                      for name, offset, duration, depth, attrs in self.spans],
+        }
+
+    def timeline(self) -> str:
+        """Chronologie lisible (commande /trace)."""
+        moment = time.strftime('%H:%M:%S', time.gmtime(self.wall_start))
+        lines = [f"🧭 Jeu #{self.game_number} ({moment} UTC, {self.duration * 1000:.1f}ms)"]
+        for name, offset, duration, depth, attrs in sorted(self.spans, key=lambda s: s[1]):
+            details = ' '.join(f"{k}={v}" for k, v in attrs.items()) if attrs else ''
+            lines.append(f"{'  ' * depth}+{offset * 1000:8.2f}ms {name} {duration * 1000:.2f}ms {details}".rstrip())
+        return "\n".join(lines)
+
+class Tracer:
+    """Traces actives, tampon circulaire et export échantillonné."""
+
+    def __init__(self, path: str = TRACE_FILE, enabled: bool = TRACE_ENABLED, sample_rate: float = TRACE_SAMPLE_RATE,
+                 slow_ms: float = TRACE_SLOW_MS, ring_size: int = TRACE_RING_SIZE, idle_seconds: float = TRACE_IDLE_SECONDS,
+                 max_bytes: int = TRACE_MAX_BYTES, backup_count: int = TRACE_BACKUP_COUNT):
+        self.path = path
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_ms / 1000
+        self.idle_seconds = idle_seconds
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._active = OrderedDict() # jeu -> Trace (ordre d'ouverture)
+        self._max_active = ring_size # au-delà (rafale), les plus anciennes sont closes
+        self._finished = []          # traces closes retenues pour l'export
+        self._ring = deque(maxlen=ring_size)
+        self._random = random.Random()
+        self._task = None
+        self.exported = 0
+
+    # --- Chemin critique ---
+
+    def begin(self, game_number: int, started: float = None):
+        """Trace active du jeu (créée au premier message); None si désactivé."""
+        if not self.enabled:
+            return None
+        trace = self._active.get(game_number)
+        if trace is None:
+            trace = self._active[game_number] = Trace(game_number, started)
+            self._ring.append(trace)
+            if len(self._active) > self._max_active:
+                self._finish(self._active.popitem(last=False)[1])
+        return trace
+
+    def _finish(self, trace: Trace):
+        # Décision d'échantillonnage à la clôture: les traces écartées ne
+        # restent pas en mémoire jusqu'au prochain export
+        if trace.duration >= self.slow_seconds or self._random.random() < self.sample_rate:
+            self._finished.append(trace)
+
+    def find(self, game_number: int):
+        """Trace la plus récente d'un jeu dans le tampon circulaire."""
+        for trace in reversed(self._ring):
+            if trace.game_number == game_number:
+                return trace
+        return None
+
+    # --- Export ---
+
+    def start(self):
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(1.0)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Erreur export des traces: %s", e)
+
+    def _collect(self, force: bool = False) -> list:
+        """Clôt les traces inactives et retourne les lignes JSON à écrire."""
+        now = time.perf_counter()
+        for game_number, trace in list(self._active.items()):
+            if not force and now - trace.last < self.idle_seconds:
+                continue
+            del self._active[game_number]
+            self._finish(trace)
+        finished, self._finished = self._finished, []
+        return [json.dumps(trace.to_dict(), ensure_ascii=False) for trace in finished]
+
+    def _write(self, lines: list):
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            for i in range(self.backup_count - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{i}"):
+                    os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+
+    async def flush(self, force: bool = False):
+        lines = self._collect(force)
+        if lines:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, lines)
+            self.exported += len(lines)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        if self.enabled:
+            await self.flush(force=True)
+
+# --- Contexte ---
+
+def activate(trace):
+    """Rend la trace courante pour la tâche; retourne le jeton pour deactivate()."""
+    return _current.set(trace)
+
+def deactivate(token):
+    _current.reset(token)
+
+def current():
+    return _current.get()
+
+def traced(name: str):
+    """Décorateur: span autour d'une coroutine."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            # Sans gestionnaire de contexte ni générateur (appelé à chaque message)
+            trace = _current.get()
+            if trace is None:
+                return await func(*args, **kwargs)
+            started = time.perf_counter()
+            depth = trace.depth
+            trace.depth = depth + 1
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                trace.depth = depth
+                trace.add(name, started, time.perf_counter(), None, depth)
+        return wrapper
+    return decorator